@@ -0,0 +1,341 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Benchmarks the search functions in search.py on every relevant layout in
+layouts/, plus the eight puzzle and pitchers instances, without graphics.
+
+Each (problem, instance, search function, heuristic) combination is run
+several times and the median time, nodes expanded, path cost and peak
+memory are recorded.  Results can be saved as a baseline and later runs
+compared against it:
+
+> python benchmark.py --save-baseline baseline.json
+> python benchmark.py --baseline baseline.json
+
+The second command exits with status 1 if any combination regressed.
+
+> python benchmark.py --per-move originalClassic
+
+instead times whole games, per move, with agents given shared snapshots of
+the state and with deep copies (pacman.py --deepCopyObservations).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import statistics
+import tracemalloc
+
+import util
+import layout
+import pacman
+import search
+import searchAgents
+import eightpuzzle_problem
+import pitchers_problem
+
+BENCHMARK_VERSION = 1
+
+SEARCH_FUNCTIONS = ['depthFirstSearch', 'breadthFirstSearch', 'uniformCostSearch', 'aStarSearch',
+                    'anytimeAStarSearch']
+
+# Heuristics tried with aStarSearch for each problem type.  Names are looked
+# up in searchAgents.py (pacman problems), the puzzle modules, or search.py.
+PACMAN_HEURISTICS = {
+    'PositionSearchProblem': ['nullHeuristic', 'manhattanHeuristic', 'euclideanHeuristic'],
+    'CornersProblem': ['nullHeuristic', 'cornersHeuristic'],
+    'FoodSearchProblem': ['nullHeuristic', 'foodHeuristic'],
+}
+EIGHT_PUZZLE_HEURISTICS = ['nullHeuristic', 'manhattanHeuristic', 'patternDatabaseHeuristic']
+PITCHERS_HEURISTICS = ['nullHeuristic']
+
+class BenchmarkCase:
+    """
+    One search problem instance.  makeProblem builds a fresh problem for every
+    run, since problems keep their own bookkeeping (e.g. _expanded).
+    """
+    def __init__(self, problemName, instanceName, makeProblem, heuristics, module):
+        self.problemName = problemName
+        self.instanceName = instanceName
+        self.makeProblem = makeProblem
+        self.heuristics = heuristics
+        self.module = module
+
+def layoutCases(layoutDir='layouts', maxFood=15):
+    """
+    Returns a BenchmarkCase for every layout and pacman problem type that
+    makes sense on it: single-food mazes for PositionSearchProblem, layouts
+    with food in exactly the four corners for CornersProblem and ghost-free
+    layouts with at most maxFood pellets for FoodSearchProblem.
+    """
+    cases = []
+    for name in sorted(os.listdir(layoutDir)):
+        if not name.endswith('.lay'): continue
+        lay = layout.getLayout(name)
+        food = lay.food.asList()
+        top, right = lay.height - 2, lay.width - 2
+        corners = [(1, 1), (1, top), (right, 1), (right, top)]
+        problems = []
+        if len(food) == 1:
+            problems.append(('PositionSearchProblem',
+                             lambda state, goal=food[0]: searchAgents.PositionSearchProblem(state, goal=goal, warn=False, visualize=False)))
+        if sorted(food) == sorted(corners):
+            problems.append(('CornersProblem', searchAgents.CornersProblem))
+        if 1 < len(food) <= maxFood and lay.getNumGhosts() == 0:
+            problems.append(('FoodSearchProblem', searchAgents.FoodSearchProblem))
+        for problemName, problemClass in problems:
+            def makeProblem(lay=lay, problemClass=problemClass):
+                state = pacman.GameState()
+                state.initialize(lay, 0)
+                return problemClass(state)
+            cases.append(BenchmarkCase(problemName, name[:-4], makeProblem,
+                                       PACMAN_HEURISTICS[problemName], searchAgents))
+    return cases
+
+def puzzleCases():
+    "Returns a BenchmarkCase for every stored eight puzzle and pitchers instance."
+    cases = []
+    for i, numbers in enumerate(eightpuzzle_problem.EIGHT_PUZZLE_DATA):
+        makeProblem = lambda i=i: eightpuzzle_problem.EightPuzzleSearchProblem(eightpuzzle_problem.loadEightPuzzle(i))
+        cases.append(BenchmarkCase('EightPuzzleSearchProblem', 'eightpuzzle%d' % i, makeProblem,
+                                   EIGHT_PUZZLE_HEURISTICS, eightpuzzle_problem))
+    for i, numbers in enumerate(pitchers_problem.PITCHERS_PUZZLE_DATA):
+        makeProblem = lambda i=i: pitchers_problem.PitchersPuzzleSearchProblem(pitchers_problem.loadPitchersPuzzle(i))
+        cases.append(BenchmarkCase('PitchersPuzzleSearchProblem', 'pitchers%d' % i, makeProblem,
+                                   PITCHERS_HEURISTICS, pitchers_problem))
+    return cases
+
+def lookupHeuristic(name, module):
+    if name in dir(module):
+        return getattr(module, name)
+    return getattr(search, name)
+
+def runOnce(case, fn, heuristic, timeout):
+    """
+    Runs one search and returns (seconds, path, problem, statistics).  Raises
+    util.TimeoutFunctionException if the search takes more than timeout
+    seconds.
+    """
+    problem = case.makeProblem()
+    stats = search.SearchStatistics()
+    func = getattr(search, fn)
+    if heuristic is None:
+        call = lambda: func(problem, observer=stats)
+    else:
+        heur = lookupHeuristic(heuristic, case.module)
+        call = lambda: func(problem, heuristic=heur, observer=stats)
+    start = time.perf_counter()
+    util.mutePrint()
+    try:
+        path = util.TimeoutFunction(call, timeout)()
+    finally:
+        util.unmutePrint()
+    return time.perf_counter() - start, path, problem, stats
+
+def runCombination(case, fn, heuristic, repeat, timeout):
+    """
+    Runs one combination repeat times, then once more under tracemalloc to
+    measure peak memory (tracing slows the search down, so that run is not
+    timed).  Returns a dictionary of results.
+    """
+    result = {'problem': case.problemName, 'instance': case.instanceName,
+              'function': fn, 'heuristic': heuristic}
+    times = []
+    try:
+        for i in range(repeat):
+            seconds, path, problem, stats = runOnce(case, fn, heuristic, timeout)
+            times.append(seconds)
+        tracemalloc.start()
+        try:
+            runOnce(case, fn, heuristic, timeout)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    except util.TimeoutFunctionException:
+        result['status'] = 'timeout'
+        return result
+    except (Exception, SystemExit) as e:
+        # util.raiseNotDefined exits instead of raising; report it like any error
+        result['status'] = 'error'
+        result['error'] = '%s: %s' % (type(e).__name__, e)
+        return result
+    result['status'] = 'ok'
+    result['time'] = statistics.median(times)
+    result['expanded'] = stats.expanded
+    result['generated'] = stats.generated
+    result['peakFrontier'] = stats.peakFrontier
+    result['pathLength'] = len(path)
+    result['cost'] = problem.getCostOfActions(path)
+    result['peakMemory'] = peak
+    return result
+
+def combinationKey(result):
+    return '%s:%s:%s:%s' % (result['problem'], result['instance'], result['function'], result['heuristic'])
+
+def combinations(cases, functions):
+    for case in cases:
+        for fn in functions:
+            if 'heuristic' in getattr(search, fn).__code__.co_varnames:
+                for heuristic in case.heuristics:
+                    yield case, fn, heuristic
+            else:
+                yield case, fn, None
+
+def runBenchmarks(cases, functions=SEARCH_FUNCTIONS, repeat=3, timeout=10, verbose=True):
+    "Runs every combination and returns a dictionary of results by key."
+    results = {}
+    for case, fn, heuristic in combinations(cases, functions):
+        result = runCombination(case, fn, heuristic, repeat, timeout)
+        results[combinationKey(result)] = result
+        if verbose: print(formatResult(result))
+    return results
+
+def formatResult(result):
+    name = '%-28s %-18s %-19s %-24s' % (result['problem'], result['instance'],
+                                         result['function'], result['heuristic'] or '')
+    if result['status'] != 'ok':
+        return '%s %s %s' % (name, result['status'].upper(), result.get('error', ''))
+    return '%s %9.4fs %8d exp %7g cost %9d B' % (name, result['time'], result['expanded'],
+                                                result['cost'], result['peakMemory'])
+
+def findRegressions(results, baseline, tolerance=0.25, minTime=0.005):
+    """
+    Compares results against a baseline and returns a list of messages, one per
+    regression.  Expanded nodes and path cost must not grow at all; time and
+    peak memory may grow by the fractional tolerance.  Times under minTime
+    seconds are too noisy to compare.
+    """
+    regressions = []
+    for key, old in sorted(baseline.items()):
+        new = results.get(key)
+        if new is None: continue
+        if old['status'] == 'ok' and new['status'] != 'ok':
+            regressions.append('%s: status %s (was ok)' % (key, new['status']))
+            continue
+        if new['status'] != 'ok' or old['status'] != 'ok': continue
+        for field in ['expanded', 'cost']:
+            if new[field] > old[field]:
+                regressions.append('%s: %s %s (was %s)' % (key, field, new[field], old[field]))
+        if new['time'] > minTime and new['time'] > old['time'] * (1 + tolerance):
+            regressions.append('%s: time %.4fs (was %.4fs)' % (key, new['time'], old['time']))
+        if new['peakMemory'] > old['peakMemory'] * (1 + tolerance):
+            regressions.append('%s: peak memory %d B (was %d B)' % (key, new['peakMemory'], old['peakMemory']))
+    return regressions
+
+def saveResults(results, filename):
+    f = open(filename, 'w')
+    try: json.dump({'version': BENCHMARK_VERSION, 'results': results}, f, indent=1, sort_keys=True)
+    finally: f.close()
+
+def loadResults(filename):
+    f = open(filename)
+    try: data = json.load(f)
+    finally: f.close()
+    if data.get('version') != BENCHMARK_VERSION:
+        raise Exception('%s is not a version %d benchmark file' % (filename, BENCHMARK_VERSION))
+    return data['results']
+
+def perMoveCosts(layoutName, numGames=3, seed='cs188'):
+    """
+    Plays numGames games of GreedyAgent against RandomGhosts on a layout,
+    once with snapshot observations and once with deep copies, and returns
+    {mode: (seconds per move, moves)}.  The seed is reset for each mode, so
+    both play the same games and only the observation cost differs.
+    """
+    import pacmanAgents, ghostAgents, textDisplay
+    lay = layout.getLayout(layoutName)
+    if lay is None: raise Exception('The layout ' + layoutName + ' cannot be found')
+    costs = {}
+    for mode, deepCopy in [('snapshot', False), ('deepCopy', True)]:
+        random.seed(seed)
+        rules = pacman.ClassicGameRules()
+        seconds, moves = 0.0, 0
+        for i in range(numGames):
+            ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(lay.getNumGhosts())]
+            game = rules.newGame(lay, pacmanAgents.GreedyAgent(), ghosts, textDisplay.NullGraphics(),
+                                 quiet=True, deepCopyObservations=deepCopy)
+            start = time.perf_counter()
+            game.run()
+            seconds += time.perf_counter() - start
+            moves += len(game.moveHistory)
+        costs[mode] = (seconds / moves, moves)
+    return costs
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('USAGE: python benchmark.py <options>')
+    parser.add_option('-n', '--repeat', dest='repeat', type='int', default=3,
+                      help='Runs per combination; the median time is reported [Default: %default]')
+    parser.add_option('--timeout', dest='timeout', type='int', default=10,
+                      help='Seconds allowed for a single run [Default: %default]')
+    parser.add_option('-l', '--layouts', dest='layouts', default=None,
+                      help='Comma separated layout or puzzle instance names to run (default: all)')
+    parser.add_option('-f', '--functions', dest='functions', default=','.join(SEARCH_FUNCTIONS),
+                      help='Comma separated search functions from search.py [Default: %default]')
+    parser.add_option('--problems', dest='problems', default=None,
+                      help='Comma separated problem types to run (default: all)')
+    parser.add_option('--max-food', dest='maxFood', type='int', default=15,
+                      help='Largest food count for FoodSearchProblem layouts [Default: %default]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write all results to this JSON file')
+    parser.add_option('--save-baseline', dest='saveBaseline', default=None,
+                      help='Write the results as a baseline file')
+    parser.add_option('-b', '--baseline', dest='baseline', default=None,
+                      help='Compare against this baseline file and report regressions')
+    parser.add_option('--tolerance', dest='tolerance', type='float', default=0.25,
+                      help='Allowed fractional growth in time and memory [Default: %default]')
+    parser.add_option('--per-move', dest='perMove', default=None, metavar='LAYOUT',
+                      help='Time game moves on LAYOUT with snapshot and deep copy observations, instead of searches')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if options.baseline and not os.path.exists(options.baseline):
+        # Checked up front so a long run is not wasted on a missing file
+        raise Exception('No baseline file %s; save one first with --save-baseline' % options.baseline)
+    return options
+
+def main(argv):
+    options = readCommand(argv)
+    if options.perMove:
+        for mode, (seconds, moves) in sorted(perMoveCosts(options.perMove).items()):
+            print('%-10s %8.1f us/move over %d moves' % (mode, seconds * 1e6, moves))
+        return 0
+    cases = layoutCases(maxFood=options.maxFood) + puzzleCases()
+    if options.layouts:
+        names = options.layouts.split(',')
+        cases = [c for c in cases if c.instanceName in names]
+    if options.problems:
+        names = options.problems.split(',')
+        cases = [c for c in cases if c.problemName in names]
+    functions = options.functions.split(',')
+    for fn in functions:
+        if fn not in dir(search):
+            raise AttributeError(fn + ' is not a search function in search.py.')
+
+    results = runBenchmarks(cases, functions, options.repeat, options.timeout)
+    if options.output: saveResults(results, options.output)
+    if options.saveBaseline: saveResults(results, options.saveBaseline)
+    if options.baseline:
+        regressions = findRegressions(results, loadResults(options.baseline), options.tolerance)
+        for message in regressions:
+            print('REGRESSION: ' + message)
+        print('%d regression(s) against %s' % (len(regressions), options.baseline))
+        if regressions: return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,162 @@
+# distanceCalculator.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Maze distances computed by flood fill over the walls grid, for agents that
+need many distances at once rather than one search per query.
+
+  bfsDistances(walls, sources)
+      the distance from every reachable cell to its closest source
+
+  descend(distances, neighbors, position)
+      a shortest path from position to the closest of those sources
+
+  FoodDistanceField(walls, food)
+      the distance and first step from every cell to its closest food,
+      kept up to date as food is eaten
+"""
+
+import heapq
+from game import Directions, Actions
+
+def legalNeighbors(walls):
+    """
+    Returns a dictionary mapping each open cell to a list of
+    (action, neighbor) pairs for the moves out of it.
+    """
+    neighbors = {}
+    for x in range(walls.width):
+        for y in range(walls.height):
+            if walls[x][y]: continue
+            moves = []
+            for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                dx, dy = Actions.directionToVector(action)
+                nextx, nexty = int(x + dx), int(y + dy)
+                if 0 <= nextx < walls.width and 0 <= nexty < walls.height and not walls[nextx][nexty]:
+                    moves.append((action, (nextx, nexty)))
+            neighbors[(x, y)] = moves
+    return neighbors
+
+def bfsDistances(walls, sources, neighbors=None):
+    """
+    Returns a dictionary mapping every cell reachable from sources to its maze
+    distance from the closest source, in a single breadth first flood fill.
+    """
+    if neighbors is None: neighbors = legalNeighbors(walls)
+    distances = dict((source, 0) for source in sources)
+    frontier = list(distances)
+    while frontier:
+        nextFrontier = []
+        for cell in frontier:
+            distance = distances[cell] + 1
+            for action, neighbor in neighbors[cell]:
+                if neighbor not in distances:
+                    distances[neighbor] = distance
+                    nextFrontier.append(neighbor)
+        frontier = nextFrontier
+    return distances
+
+def descend(distances, neighbors, position):
+    """
+    Follows a distance table from bfsDistances downhill from position to a
+    source.  Returns the list of actions, or None if position is unreachable.
+    """
+    if position not in distances: return None
+    path = []
+    while distances[position] > 0:
+        for action, neighbor in neighbors[position]:
+            if distances.get(neighbor) == distances[position] - 1:
+                path.append(action)
+                position = neighbor
+                break
+    return path
+
+class FoodDistanceField:
+    """
+    The maze distance from every cell to its closest food, computed with one
+    flood fill from all the food at once.
+
+    When food is eaten only the cells that were closest to it are repaired,
+    by flooding back in from the cells around them, so a whole game of
+    closest-dot queries costs about as much as a few searches.
+
+      walls: a Grid of walls
+      food:  a Grid of food, or a list of food positions
+    """
+    def __init__(self, walls, food):
+        self.walls = walls
+        self.neighbors = legalNeighbors(walls)
+        if hasattr(food, 'asList'): food = food.asList()
+        self.food = set(food)
+        self.distance = {}
+        self.nearest = {}
+        self.owned = dict((f, set()) for f in self.food)
+        self._flood([(0, f, f) for f in self.food])
+
+    def _flood(self, seeds):
+        "Fills unassigned cells from (distance, food, cell) seeds, closest first."
+        heapq.heapify(seeds)
+        while seeds:
+            distance, food, cell = heapq.heappop(seeds)
+            if cell in self.distance: continue
+            self.distance[cell] = distance
+            self.nearest[cell] = food
+            self.owned[food].add(cell)
+            for action, neighbor in self.neighbors[cell]:
+                if neighbor not in self.distance:
+                    heapq.heappush(seeds, (distance + 1, food, neighbor))
+
+    def removeFood(self, position):
+        "Updates the field after the food at position has been eaten."
+        if position not in self.food: return
+        self.food.remove(position)
+        orphans = self.owned.pop(position)
+        for cell in orphans:
+            del self.distance[cell]
+            del self.nearest[cell]
+        seeds = []
+        for cell in orphans:
+            for action, neighbor in self.neighbors[cell]:
+                if neighbor in self.distance:
+                    seeds.append((self.distance[neighbor] + 1, self.nearest[neighbor], cell))
+        self._flood(seeds)
+
+    def syncFood(self, food):
+        """
+        Brings the field up to date with a food Grid, removing the food that
+        has been eaten.  If food has appeared the field is rebuilt.
+        """
+        for position in [f for f in self.food if not food[f[0]][f[1]]]:
+            self.removeFood(position)
+        if len(self.food) != food.count():
+            self.__init__(self.walls, food)
+
+    def getDistance(self, position):
+        "Returns the distance to the closest food, or None if none is reachable."
+        return self.distance.get(position)
+
+    def getClosestFood(self, position):
+        return self.nearest.get(position)
+
+    def getFirstAction(self, position):
+        "Returns the first step towards the closest food, or None if at food or stuck."
+        distance = self.distance.get(position)
+        if not distance: return None
+        for action, neighbor in self.neighbors[position]:
+            if self.distance.get(neighbor) == distance - 1:
+                return action
+
+    def getPath(self, position):
+        "Returns a shortest list of actions to the closest food, or None if none is reachable."
+        return descend(self.distance, self.neighbors, position)
@@ -1,12 +1,14 @@
 # GUI for the eightpuzzle problem. Invokes the problem definition from eightpuzzle_problem.py 
-# and BFS from search.py. Can play in either 'Human' mode or 'AI' (search) mode. If 'AI' mode 
-# crashes, it's probably because there is no solution.
+# and a search from search.py. Can play in either 'Human' mode or 'AI' (search) mode. The AI
+# searches in a worker thread, showing its progress, and can be cancelled with the button.
+# If the board has no solution the window closes, unless run with --keep-open.
 
 import pygame
 import sys
 import random
 import time
-from eightpuzzle_problem import EightPuzzleSearchProblem, EightPuzzleState
+import threading
+from eightpuzzle_problem import EightPuzzleSearchProblem, EightPuzzleState, chooseSearch, isSolvable, solveByTable, loadSolutionTable
 import search
 
 # Initialize Pygame
@@ -24,6 +26,11 @@ BUTTON_COLOR = (150, 150, 150)
 BUTTON_TEXT_COLOR = (255, 255, 255)
 BUTTON_FONT_SIZE = 20
 BUTTON_X, BUTTON_Y = WIDTH//2 + BUTTON_WIDTH//2, 10 #HEIGHT - WIDTH
+MOVE_DELAY = 2000 # Milliseconds between the AI's moves
+FRAME_RATE = 30
+
+# Paths found so far, by board, so that solving a board again is instant
+_solutions = {}
 
 # Function to create the initial board state
 def create_board(size, numbers=None):
@@ -46,7 +53,7 @@ def is_solved(board):
     return True
 
 # Function to draw the board
-def draw_board(screen, board, moves, text_font, cell_font,ai_mode=False):
+def draw_board(screen, board, moves, text_font, cell_font,ai_mode=False, status=None, button_label="Toggle Mode"):
     screen.fill(WHITE)
     size = len(board)
     cell_size = (HEIGHT - 2 * BUTTON_HEIGHT) // size
@@ -56,11 +63,14 @@ def draw_board(screen, board, moves, text_font, cell_font,ai_mode=False):
     mode = "AI" if ai_mode else "Human"
     moves_text = text_font.render(f"Moves: {moves}  Mode: {mode}", True, BLACK)
     screen.blit(moves_text, (10, 10))
+    if status:
+        status_text = text_font.render(status, True, BLACK)
+        screen.blit(status_text, (10, 10 + BUTTON_HEIGHT))
 
     # Draw mode toggle button 
     button_rect = pygame.Rect(BUTTON_X, BUTTON_Y, BUTTON_WIDTH*2, BUTTON_HEIGHT)
     pygame.draw.rect(screen, BLUE, button_rect, 1)
-    cell_text = text_font.render("Toggle Mode", True, BLACK)
+    cell_text = text_font.render(button_label, True, BLACK)
     text_rect = cell_text.get_rect(center=button_rect.center)
     screen.blit(cell_text, text_rect)
     
@@ -95,14 +105,15 @@ def find_empty_cell(board):
             if board[i][j] == 0:
                 return i, j
 
-# Function to solve the puzzle using AI
-def solve_puzzle(inp_board):
-    print("Initial config:", inp_board,"\nSearching...")
+# Function to start solving the puzzle using AI, in the background
+def start_solving(inp_board):
     puzzle = EightPuzzleState(sum(inp_board, []))
-    problem = EightPuzzleSearchProblem(puzzle)
-    path = search.breadthFirstSearch(problem) #To do: Try A* with a good heuristic for 4X4 or larger
-    print('BFS found a path of %d moves: %s' % (len(path), str(path)))
+    name, function, options = chooseSearch(puzzle)
+    print("Initial config:", inp_board,"\nSearching with %s..." % name)
+    return name, search.BackgroundSearch(function, EightPuzzleSearchProblem(puzzle), **options)
 
+# Function to turn a path into the cells whose tiles to move
+def path_to_moves(inp_board, path):
     board = inp_board.copy()
     directions = {'up': (-1,0), 'down': (1,0), 'left': (0,-1), 'right': (0,1)}
     moves = []
@@ -115,56 +126,115 @@ def solve_puzzle(inp_board):
     return moves
 
 # Main function
-def main(size):
+def main(size, keep_open=False):
     # Initialize the display
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption(f"{size}x{size} Sliding Tile Puzzle")
+    clock = pygame.time.Clock()
 
     # Create fonts
     text_font = pygame.font.SysFont(None, FONT_SIZE)
     cell_font = pygame.font.SysFont(None, FONT_SIZE * 2)
 
+    # Loading (or first building) the 3x3 solution table takes seconds, so do it
+    # in a worker thread; boards are searched for as usual until it is ready
+    table_loader = None
+    if size == 3:
+        table_loader = threading.Thread(target=loadSolutionTable, daemon=True)
+        table_loader.start()
+
     # Create the initial board state
     #board = create_board(size, [4, 3, 2, 7, 0, 5, 1, 6, 8]) #Initialize with known config
-    board = create_board(size) #Initialize randomly (Beware, may have no solution)
+    board = create_board(size) #Initialize randomly (half of these have no solution)
 
     # Variables
     moves = 0
     solved = is_solved(board)
     ai_mode = False
-    draw_board(screen, board, moves, text_font, cell_font)
+    solver = None     # (search name, board key, BackgroundSearch) while searching
+    move_list = []    # The AI's moves still to be made
+    next_move_time = 0
+    status = None
 
     # Main game loop
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if solver: solver[2].cancel()
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                if not solved:
-                    x, y = pygame.mouse.get_pos()
+                x, y = pygame.mouse.get_pos()
+                on_button = BUTTON_X <= x <= BUTTON_X+BUTTON_WIDTH*2 and BUTTON_Y <= y <= BUTTON_Y+BUTTON_WIDTH
+                if solver:
+                    # While searching the button cancels the search
+                    if on_button: solver[2].cancel()
+                elif not solved and not move_list:
                     if x >= BUTTON_WIDTH and y >= BUTTON_HEIGHT:
                         row = (y - BUTTON_HEIGHT) // ((HEIGHT - BUTTON_HEIGHT) // size)
                         col = (x - BUTTON_WIDTH) // ((WIDTH - BUTTON_WIDTH) // size)
                         if move_tile(board, row, col): 
                             moves += 1
                             solved = is_solved(board)
-                    elif BUTTON_X <= x <= BUTTON_X+BUTTON_WIDTH*2 and BUTTON_Y <= y <= BUTTON_Y+BUTTON_WIDTH:
+                    elif on_button:
                         ai_mode = not ai_mode
+                        status = None
                         if ai_mode:
                             moves = 0
-                            draw_board(screen, board, moves, text_font, cell_font, ai_mode)
-                            move_list = solve_puzzle(board)
-                            if len(move_list)<=0:
-                                print("No solution!")
-                                sys.exit()
-                            for m in move_list:
-                                move_tile(board, m[0], m[1])
-                                moves += 1
-                                draw_board(screen, board, moves, text_font, cell_font, ai_mode)
-                                time.sleep(2)
-                            solved = is_solved(board)
-                draw_board(screen, board, moves, text_font, cell_font, ai_mode)
+                            key = tuple(sum(board, []))
+                            puzzle = EightPuzzleState(list(key))
+                            if not isSolvable(puzzle):
+                                status = "No solution!"
+                                print(status)
+                                if not keep_open:
+                                    pygame.quit()
+                                    sys.exit()
+                                ai_mode = False
+                            elif key in _solutions or (table_loader and not table_loader.is_alive()):
+                                # 3x3 boards are looked up in the solution table instead of searched
+                                if key not in _solutions: _solutions[key] = solveByTable(puzzle)
+                                print('Found a path of %d moves: %s' % (len(_solutions[key]), _solutions[key]))
+                                move_list = path_to_moves(board, _solutions[key])
+                                next_move_time = pygame.time.get_ticks()
+                            else:
+                                name, background = start_solving(board)
+                                solver = (name, key, background)
+
+        # Collect the search's result once it is done
+        if solver and solver[2].done():
+            name, key, background = solver
+            solver = None
+            if background.error is not None:
+                # The search itself failed; fail as loudly as a direct call would
+                raise background.error
+            path = background.result
+            if not path.solved:
+                status = "Cancelled" if path.reason == 'cancelled' else "No solution!"
+                print(status)
+                if status == "No solution!" and not keep_open:
+                    pygame.quit()
+                    sys.exit()
+                ai_mode = False
+            else:
+                print('%s found a path of %d moves in %.1f seconds: %s' % (name, len(path), background.elapsed(), str(list(path))))
+                _solutions[key] = list(path)
+                move_list = path_to_moves(board, path)
+                next_move_time = pygame.time.get_ticks()
+                status = None
+
+        # Make the AI's next move when it is due
+        if move_list and pygame.time.get_ticks() >= next_move_time:
+            m = move_list.pop(0)
+            move_tile(board, m[0], m[1])
+            moves += 1
+            next_move_time += MOVE_DELAY
+            solved = is_solved(board)
+
+        if solver:
+            progress = solver[2].progress
+            status = "%s: %d expanded, frontier %d" % (solver[0], progress.expanded, progress.frontier)
+        draw_board(screen, board, moves, text_font, cell_font, ai_mode, status,
+                   "Cancel" if solver else "Toggle Mode")
 
         # Check if the puzzle is solved
         if solved:
@@ -174,7 +244,13 @@ def main(size):
             text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
             screen.blit(text, text_rect)
             pygame.display.update()
+        clock.tick(FRAME_RATE)
 
 # Run the main function
 if __name__ == "__main__":
-    main(3)  # Change the argument to set the size of the puzzle (e.g., 3 for a 3x3 puzzle)
+    from optparse import OptionParser
+    parser = OptionParser('USAGE: python eightpuzzle.py [--keep-open]')
+    parser.add_option('--keep-open', action='store_true', dest='keepOpen', default=False,
+                      help='keep the window open when the AI finds no solution, to play on by hand')
+    options, otherjunk = parser.parse_args()
+    main(3, options.keepOpen)  # Change the first argument to set the size of the puzzle (e.g., 3 for a 3x3 puzzle)
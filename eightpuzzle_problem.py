@@ -223,6 +223,228 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         """
         return len(actions)
 
+def manhattanHeuristic(state, problem=None):
+    "The sum over the tiles of their row and column distances from their goal cells."
+    size = state.size
+    total = 0
+    for row in range(size):
+        for col in range(size):
+            tile = state.cells[row][col]
+            if tile:
+                total += abs(row - tile // size) + abs(col - tile % size)
+    return total
+
+# Pattern databases (Culberson and Schaeffer 1998, additive as in Korf and
+# Felner 2002).  The tiles are split into disjoint groups; for each group the
+# table holds, for every placement of those tiles, the fewest moves of those
+# tiles needed to put them in their goal cells, with the other tiles treated
+# as interchangeable.  Moves of other tiles are free, so the tables of the
+# groups can be added and the sum is still admissible (and consistent).
+
+PATTERN_SIZE = 4
+_patternDatabases = {}
+
+def patternGroups(size):
+    "Splits the tiles of a size x size puzzle into groups of up to PATTERN_SIZE."
+    tiles = list(range(1, size * size))
+    return [tuple(tiles[i:i + PATTERN_SIZE]) for i in range(0, len(tiles), PATTERN_SIZE)]
+
+def buildPatternDatabase(size, tiles):
+    """
+    Returns an array with, at index sum(cell(tiles[i]) * cells**i), the
+    fewest moves of these tiles that take them from those cells to their goal
+    cells.  Computed by a breadth first search back from the goal in which
+    moving the blank past other tiles is free.
+    """
+    from collections import deque
+    cells = size * size
+    k = len(tiles)
+    places = cells ** k
+    unseen = 255
+    distance = bytearray([unseen]) * (cells * places)
+    powers = [cells ** i for i in range(k)]
+    goal = sum(tile * powers[i] for i, tile in enumerate(tiles))
+    distance[goal] = 0
+    queue = deque([goal])
+    while queue:
+        state = queue.popleft()
+        blank, placement = divmod(state, places)
+        here = distance[state]
+        occupant = dict(((placement // powers[i]) % cells, i) for i in range(k))
+        row, col = divmod(blank, size)
+        for nextRow, nextCol in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if not (0 <= nextRow < size and 0 <= nextCol < size): continue
+            cell = nextRow * size + nextCol
+            if cell in occupant:
+                # A pattern tile slides into the blank: this move counts
+                nextState = cell * places + placement + (blank - cell) * powers[occupant[cell]]
+                if distance[nextState] > here + 1:
+                    distance[nextState] = here + 1
+                    queue.append(nextState)
+            else:
+                nextState = cell * places + placement
+                if distance[nextState] > here:
+                    distance[nextState] = here
+                    queue.appendleft(nextState)
+    return distance
+
+def loadPatternDatabases(size):
+    """
+    Returns [(tiles, table)] for the puzzle size, from tableFiles.TABLE_DIR
+    if they were built before, otherwise building and saving them.
+    """
+    if size not in _patternDatabases:
+        import tableFiles
+        groups = patternGroups(size)
+        key = 'eightpuzzle-pdb-v2 size=%d groups=%s' % (size, groups)
+        names = ['tiles' + '-'.join(map(str, tiles)) for tiles in groups]
+        def build():
+            return [(name, 'B', ((size * size) ** (len(tiles) + 1),), buildPatternDatabase(size, tiles))
+                    for name, tiles in zip(names, groups)]
+        tables = tableFiles.loadOrBuildTables(tableFiles.tablePath('eightpuzzle-pdb', key), key, build)
+        _patternDatabases[size] = [(tiles, tables.get(name)) for name, tiles in zip(names, groups)]
+    return _patternDatabases[size]
+
+def patternDatabaseHeuristic(state, problem=None):
+    "The sum of the additive pattern database values of the tile groups."
+    size = state.size
+    cellOf = [0] * (size * size)
+    for row in range(size):
+        for col in range(size):
+            cellOf[state.cells[row][col]] = row * size + col
+    cells = size * size
+    total = 0
+    for tiles, table in loadPatternDatabases(size):
+        index, power = 0, 1
+        for tile in tiles:
+            index += cellOf[tile] * power
+            power *= cells
+        total += table[cellOf[0] * power + index]
+    return total
+
+# 3x3 puzzles whose tiles are at most this far from home in all (Manhattan
+# distance) are solved by breadth first search, which is quick at that depth
+BFS_MAX_DISTANCE = 10
+
+def chooseSearch(puzzle):
+    """
+    Returns (name, searchFunction, options) to solve puzzle with: breadth
+    first search for nearly solved 3x3 puzzles, otherwise A* with the
+    pattern database heuristic, which stays fast on deep and larger puzzles.
+    """
+    if puzzle.size == 3 and manhattanHeuristic(puzzle) <= BFS_MAX_DISTANCE:
+        return 'BFS', search.breadthFirstSearch, {}
+    return 'A*', search.aStarSearch, {'heuristic': patternDatabaseHeuristic}
+
+# The full solution table for the 3x3 puzzle.  Only half of the 9! orders of
+# the tiles can be reached from the goal (moves keep the parity of the
+# permutation in step with the blank's distance from its goal cell), and
+# there are few enough of those to store the best move for every one: a
+# byte per permutation, indexed by its rank in lexicographic order (its
+# Lehmer code).  One breadth first search back from the goal fills it in.
+
+TABLE_MOVES = ('up', 'down', 'left', 'right')
+TABLE_SOLVED = 4
+TABLE_UNREACHABLE = 255
+_solutionTable = []
+
+def permutationRank(numbers):
+    "Returns the index of a permutation of 0..n-1 among all of them in lexicographic order."
+    n = len(numbers)
+    rank = 0
+    for i, value in enumerate(numbers):
+        smaller = 0
+        for later in numbers[i + 1:]:
+            if later < value: smaller += 1
+        rank = rank * (n - i) + smaller
+    return rank
+
+def isSolvable(puzzle):
+    """
+    Returns whether puzzle can reach the goal.  Every move swaps the blank
+    with a neighbour, flipping both the parity of the permutation and that
+    of the blank's distance from the top left corner, so the two must match.
+    """
+    numbers = sum(puzzle.cells, [])
+    inversions = 0
+    for i, value in enumerate(numbers):
+        for later in numbers[i + 1:]:
+            if later < value: inversions += 1
+    row, col = puzzle.blankLocation
+    return inversions % 2 == (row + col) % 2
+
+def buildSolutionTable(size=3):
+    """
+    Returns a bytearray with, at the rank of every permutation of the tiles
+    that can reach the goal, the index in TABLE_MOVES of its first move on a
+    shortest path to the goal (TABLE_SOLVED at the goal itself), and
+    TABLE_UNREACHABLE at the other ranks.
+    """
+    from collections import deque
+    from math import factorial
+    cells = size * size
+    table = bytearray([TABLE_UNREACHABLE]) * factorial(cells)
+    goal = tuple(range(cells))
+    table[permutationRank(goal)] = TABLE_SOLVED
+    # Each move of the blank and, as a TABLE_MOVES index, the move that undoes it
+    steps = ((-size, 1), (size, 0), (-1, 3), (1, 2))
+    queue = deque([(goal, 0)])
+    while queue:
+        numbers, blank = queue.popleft()
+        row, col = divmod(blank, size)
+        for (offset, back), legal in zip(steps, (row > 0, row < size - 1, col > 0, col < size - 1)):
+            if not legal: continue
+            cell = blank + offset
+            after = list(numbers)
+            after[blank], after[cell] = after[cell], 0
+            rank = permutationRank(after)
+            if table[rank] == TABLE_UNREACHABLE:
+                table[rank] = back
+                queue.append((tuple(after), cell))
+    return table
+
+def loadSolutionTable():
+    """
+    Returns the 3x3 solution table (see buildSolutionTable), from
+    tableFiles.TABLE_DIR if it was built before, otherwise building and
+    saving it.
+    """
+    if not _solutionTable:
+        import tableFiles
+        from math import factorial
+        key = 'eightpuzzle-solutions-v1 size=3'
+        def build():
+            return [('nextMove', 'B', (factorial(9),), buildSolutionTable(3))]
+        tables = tableFiles.loadOrBuildTables(tableFiles.tablePath('eightpuzzle-solutions', key), key, build)
+        _solutionTable.append(tables.get('nextMove'))
+    return _solutionTable[0]
+
+def solveByTable(puzzle):
+    """
+    Returns a shortest list of moves solving a 3x3 puzzle, by following the
+    solution table: one lookup per move.  Raises ValueError for puzzles of
+    other sizes, and for unsolvable ones without looking anything up.
+    """
+    if puzzle.size != 3:
+        raise ValueError('The solution table is for 3x3 puzzles, not %dx%d' % (puzzle.size, puzzle.size))
+    if not isSolvable(puzzle):
+        raise ValueError('This puzzle cannot be solved')
+    table = loadSolutionTable()
+    numbers = sum(puzzle.cells, [])
+    blank = numbers.index(0)
+    offsets = (-3, 3, -1, 1)
+    path = []
+    while True:
+        move = table[permutationRank(numbers)]
+        if move == TABLE_SOLVED:
+            return path
+        if move == TABLE_UNREACHABLE or len(path) > len(numbers) ** 2:
+            raise ValueError('The solution table is corrupt')
+        cell = blank + offsets[move]
+        numbers[blank], numbers[cell] = numbers[cell], 0
+        blank = cell
+        path.append(TABLE_MOVES[move])
+
 EIGHT_PUZZLE_DATA = [[1, 0, 2, 3, 4, 5, 6, 7, 8],
                      [1, 7, 8, 2, 3, 4, 5, 6, 0],
                      [4, 3, 2, 7, 0, 5, 1, 6, 8],
@@ -264,14 +486,26 @@ def createRandomEightPuzzle(moves=100):
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
     return puzzle
 
+# For puzzleBatch, which solves many instances given as lists of numbers
+def problemFromNumbers(numbers):
+    return EightPuzzleSearchProblem(EightPuzzleState(numbers))
+
+def randomNumbers(moves=100):
+    return sum(createRandomEightPuzzle(int(moves)).cells, [])
+
 if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        # Batch solving: see puzzleBatch.py
+        import puzzleBatch
+        sys.exit(puzzleBatch.main(sys.argv[1:], 'eightpuzzle'))
+
     puzzle = createRandomEightPuzzle(25)
     print('A random puzzle:')
     print(puzzle)
 
-    problem = EightPuzzleSearchProblem(puzzle)
-    path = search.breadthFirstSearch(problem)
-    print('BFS found a path of %d moves: %s' % (len(path), str(path)))
+    path = solveByTable(puzzle)
+    print('The solution table gives a path of %d moves: %s' % (len(path), str(path)))
     curr = puzzle
     i = 1
     for a in path:
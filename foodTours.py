@@ -0,0 +1,237 @@
+# foodTours.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Eating all the food is a travelling salesman problem over the food, with maze
+distances between pellets: find the shortest open tour that starts at Pacman
+and visits every pellet.  Instead of searching over (position, foodGrid)
+states, the solvers here work on the table of distances between pellets.
+
+  heldKarpTour       exact dynamic programming, for up to about 15 pellets
+  nearestNeighborTour, twoOpt, orOpt
+                     a greedy tour improved by local search, for larger boards
+  foodTourSearch     solves a FoodSearchProblem and returns a list of actions
+  mstFoodHeuristic   an admissible and consistent heuristic for A*
+
+A tour is a list of indices into the distance table, starting with 0 (Pacman).
+"""
+
+import distanceCalculator
+
+# Held-Karp takes time 2^n n^2; larger boards use local search instead
+HELD_KARP_LIMIT = 15
+
+def tourDistances(walls, points, neighbors=None):
+    """
+    Returns (distances, fields) for a list of points: distances[i][j] is the
+    maze distance between points i and j (None if unreachable), and fields[i]
+    maps every cell to its distance from point i.
+    """
+    if neighbors is None: neighbors = distanceCalculator.legalNeighbors(walls)
+    fields = [distanceCalculator.bfsDistances(walls, [point], neighbors) for point in points]
+    distances = [[field.get(point) for point in points] for field in fields]
+    return distances, fields
+
+def tourCost(tour, distances):
+    return sum(distances[a][b] for a, b in zip(tour, tour[1:]))
+
+def heldKarpTour(distances):
+    """
+    Returns a shortest open tour from node 0 through every other node.
+
+    best[mask][last] is the length of the shortest path that starts at node 0,
+    visits exactly the nodes in mask (a bitmask over nodes 1..n-1) and ends at
+    last.
+    """
+    n = len(distances)
+    if n <= 2: return list(range(n))
+    inf = float('inf')
+    others = n - 1
+    full = (1 << others) - 1
+    best = [[inf] * others for mask in range(full + 1)]
+    parent = [[-1] * others for mask in range(full + 1)]
+    for i in range(others):
+        best[1 << i][i] = distances[0][i + 1]
+    for mask in range(1, full + 1):
+        row = best[mask]
+        for last in range(others):
+            cost = row[last]
+            if cost == inf: continue
+            fromLast = distances[last + 1]
+            for nxt in range(others):
+                bit = 1 << nxt
+                if mask & bit: continue
+                newCost = cost + fromLast[nxt + 1]
+                if newCost < best[mask | bit][nxt]:
+                    best[mask | bit][nxt] = newCost
+                    parent[mask | bit][nxt] = last
+    last = min(range(others), key=lambda i: best[full][i])
+    tour, mask = [], full
+    while last != -1:
+        tour.append(last + 1)
+        mask, last = mask & ~(1 << last), parent[mask][last]
+    tour.append(0)
+    tour.reverse()
+    return tour
+
+def nearestNeighborTour(distances):
+    "Returns the tour that always goes to the closest unvisited node next."
+    tour = [0]
+    unvisited = set(range(1, len(distances)))
+    while unvisited:
+        here = distances[tour[-1]]
+        nxt = min(unvisited, key=lambda i: (here[i], i))
+        unvisited.remove(nxt)
+        tour.append(nxt)
+    return tour
+
+def twoOpt(tour, distances):
+    """
+    Improves an open tour in place by reversing segments tour[i..j] while that
+    shortens it.  Returns True if anything changed.
+    """
+    improved, changed = True, False
+    n = len(tour)
+    d = distances
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = tour[i - 1], tour[i]
+            for j in range(i + 1, n):
+                c = tour[j]
+                # The tour is open: reversing a suffix only changes one edge
+                e = tour[j + 1] if j + 1 < n else None
+                before = d[a][b] + (d[c][e] if e is not None else 0)
+                after = d[a][c] + (d[b][e] if e is not None else 0)
+                if after < before:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    a, b = tour[i - 1], tour[i]
+                    improved = changed = True
+    return changed
+
+def orOpt(tour, distances, maxSegment=3):
+    """
+    Improves an open tour in place by moving runs of up to maxSegment nodes
+    (in either direction) to a better place.  Returns True if anything changed.
+    """
+    d = distances
+    changed = False
+    improved = True
+    while improved:
+        improved = False
+        n = len(tour)
+        for length in range(1, maxSegment + 1):
+            for i in range(1, n - length + 1):
+                j = i + length - 1
+                first, last = tour[i], tour[j]
+                prev = tour[i - 1]
+                nxt = tour[j + 1] if j + 1 < n else None
+                removed = d[prev][first] + (d[last][nxt] - d[prev][nxt] if nxt is not None else 0)
+                segment = tour[i:j + 1]
+                rest = tour[:i] + tour[j + 1:]
+                bestGain, bestMove = 0, None
+                for k in range(len(rest)):
+                    # Insert between rest[k] and rest[k + 1] (or at the end)
+                    u = rest[k]
+                    v = rest[k + 1] if k + 1 < len(rest) else None
+                    for s, t, reverse in [(first, last, False), (last, first, True)]:
+                        added = d[u][s] + (d[t][v] - d[u][v] if v is not None else 0)
+                        if removed - added > bestGain:
+                            bestGain, bestMove = removed - added, (k, reverse)
+                if bestMove is not None:
+                    k, reverse = bestMove
+                    if reverse: segment.reverse()
+                    tour[:] = rest[:k + 1] + segment + rest[k + 1:]
+                    improved = changed = True
+                    break
+            if improved: break
+    return changed
+
+def improveTour(tour, distances):
+    "Alternates 2-opt and Or-opt until neither improves the tour."
+    while True:
+        twoOpt(tour, distances)
+        if not orOpt(tour, distances): return tour
+
+def solveTour(distances, exactLimit=HELD_KARP_LIMIT):
+    "Returns an optimal tour if there are at most exactLimit pellets, otherwise a good one."
+    if len(distances) - 1 <= exactLimit:
+        return heldKarpTour(distances)
+    return improveTour(nearestNeighborTour(distances), distances)
+
+def foodTourSearch(problem, exactLimit=HELD_KARP_LIMIT):
+    """
+    Returns a list of actions that eats all the food in a FoodSearchProblem,
+    by solving the tour over the pellets and joining shortest paths between
+    them.  The plan is optimal when there are at most exactLimit pellets.
+    Returns [] if some food cannot be reached.
+    """
+    position, foodGrid = problem.getStartState()
+    points = [position] + foodGrid.asList()
+    neighbors = distanceCalculator.legalNeighbors(problem.walls)
+    distances, fields = tourDistances(problem.walls, points, neighbors)
+    if None in distances[0]:
+        return []
+    tour = solveTour(distances, exactLimit)
+    actions = []
+    for here, there in zip(tour, tour[1:]):
+        actions += distanceCalculator.descend(fields[there], neighbors, points[here])
+    return actions
+
+def minimumSpanningTreeCost(nodes, distance):
+    "Prim's algorithm on a complete graph; distance(a, b) gives the edge lengths."
+    if not nodes: return 0
+    nodes = list(nodes)
+    closest = dict((node, distance(nodes[0], node)) for node in nodes[1:])
+    total = 0
+    while closest:
+        node = min(closest, key=closest.get)
+        total += closest.pop(node)
+        for other in closest:
+            d = distance(node, other)
+            if d < closest[other]: closest[other] = d
+    return total
+
+def mstFoodHeuristic(state, problem):
+    """
+    The maze distance to the closest pellet plus the length of a minimum
+    spanning tree over the pellets.
+
+    Admissible: any tour starts with a path to some pellet and then joins all
+    the pellets, which costs at least a spanning tree.  Consistent: a step
+    changes the distance to the closest pellet by at most 1, and eating a
+    pellet lowers the spanning tree by at most the distance from it to the
+    closest remaining pellet.
+
+    Distance tables from each pellet and spanning tree lengths are kept in
+    problem.heuristicInfo.
+    """
+    position, foodGrid = state
+    food = tuple(foodGrid.asList())
+    if not food: return 0
+    info = problem.heuristicInfo
+    if 'foodFields' not in info:
+        info['neighbors'] = distanceCalculator.legalNeighbors(problem.walls)
+        info['foodFields'] = {}
+        info['spanningTrees'] = {}
+    fields = info['foodFields']
+    for pellet in food:
+        if pellet not in fields:
+            fields[pellet] = distanceCalculator.bfsDistances(problem.walls, [pellet], info['neighbors'])
+    inf = float('inf')
+    closest = min(fields[pellet].get(position, inf) for pellet in food)
+    trees = info['spanningTrees']
+    if food not in trees:
+        trees[food] = minimumSpanningTreeCost(food, lambda a, b: fields[a].get(b, inf))
+    return closest + trees[food]
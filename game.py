@@ -216,6 +216,28 @@ class Grid:
         g.data = self.data
         return g
 
+    def copyWithCell(self, x, y, value):
+        """
+        Returns a copy of the grid with grid[x][y] set to value.  Only column
+        x is copied; the other columns are shared with this grid, so this
+        costs O(width + height) instead of a full copy.  Neither grid should
+        be changed in place afterwards.
+        """
+        g = Grid(self.width, self.height)
+        g.data = self.data[:]
+        g.data[x] = g.data[x][:]
+        g.data[x][y] = value
+        return g
+
+    def copyColumns(self):
+        """
+        Returns a copy of the grid that shares its columns with this one, to
+        be replaced (not changed in place) by the new grid's owner.
+        """
+        g = Grid(self.width, self.height)
+        g.data = self.data[:]
+        return g
+
     def count(self, item =True ):
         return sum([x.count(item) for x in self.data])
 
@@ -375,14 +397,25 @@ class GameStateData:
     def __init__( self, prevState = None ):
         """
         Generates a new data packet by copying information from its predecessor.
+
+        The copy is copy-on-write: the food grid, the capsule list and the
+        agent states are shared with prevState, and are only copied by the
+        rules that change them (see getMutableAgentState and eatFood).
+        prevState itself is left alone.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            self.food = prevState.food
+            self._numFood = prevState._numFood
+            self.capsules = prevState.capsules
+            self._capsuleSet = prevState._capsuleSet
+            self.agentStates = prevState.agentStates[:]
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+        # The agent states and food columns copied since beginChanges, which
+        # may be changed in place until endChanges; None outside those calls
+        self._ownedAgents = None
+        self._ownedColumns = None
 
         self._foodEaten = None
         self._foodAdded = None
@@ -395,6 +428,8 @@ class GameStateData:
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
+        state.capsules = self.capsules[:]
+        state.agentStates = self.copyAgentStates( self.agentStates )
         state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
@@ -408,6 +443,57 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def setFood( self, food ):
+        self.food = food
+        self._numFood = food.count()
+
+    def setCapsules( self, capsules ):
+        self.capsules = capsules
+        self._capsuleSet = frozenset(capsules)
+
+    def beginChanges( self ):
+        """
+        Starts changing a newly generated state: until endChanges, each
+        agent state and food column is copied only on its first change.
+        Once the state is handed out it may share them with its own
+        successors, so after endChanges every change copies again.
+        """
+        self._ownedAgents = set()
+        self._ownedColumns = set()
+
+    def endChanges( self ):
+        self._ownedAgents = None
+        self._ownedColumns = None
+
+    def eatFood( self, x, y ):
+        "Removes the food at (x, y), copying the shared grid's columns as needed."
+        if self.food[x][y]:
+            owned = self._ownedColumns
+            if owned is None:
+                self.food = self.food.copyWithCell( x, y, False )
+            else:
+                if x not in owned:
+                    if not owned: self.food = self.food.copyColumns()
+                    self.food[x] = self.food[x][:]
+                    owned.add(x)
+                self.food[x][y] = False
+            self._numFood -= 1
+
+    def eatCapsule( self, position ):
+        if position in self._capsuleSet:
+            self.setCapsules( [c for c in self.capsules if c != position] )
+
+    def getMutableAgentState( self, agentIndex ):
+        """
+        Returns an agent's state for changing, first copying it unless this
+        state already did since beginChanges.
+        """
+        owned = self._ownedAgents
+        if owned is None or agentIndex not in owned:
+            self.agentStates[agentIndex] = self.agentStates[agentIndex].copy()
+            if owned is not None: owned.add(agentIndex)
+        return self.agentStates[agentIndex]
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -488,9 +574,9 @@ class GameStateData:
         """
         Creates an initial game state from a layout array (see layout.py).
         """
-        self.food = layout.food.copy()
+        self.setFood( layout.food.copy() )
         #self.capsules = []
-        self.capsules = layout.capsules[:]
+        self.setCapsules( layout.capsules[:] )
         self.layout = layout
         self.score = 0
         self.scoreChange = 0
@@ -515,7 +601,7 @@ class Game:
     The Game manages the control flow, soliciting actions from agents.
     """
 
-    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False ):
+    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, deepCopyObservations=False ):
         self.agentCrashed = False
         self.agents = agents
         self.display = display
@@ -524,7 +610,11 @@ class Game:
         self.gameOver = False
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
+        # Untrusted agents may change the states they are given; deep copies keep the game safe from them
+        self.deepCopyObservations = deepCopyObservations
         self.moveHistory = []
+        # Told of every move as it is made, e.g. a recording.KeyframeRecorder
+        self.recorder = None
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
@@ -564,12 +654,39 @@ class Game:
         sys.stderr = OLD_STDERR
 
 
+    def _agentMethods(self, agent):
+        """
+        Looks up the optional methods an agent defines once per game, rather
+        than with dir(agent) on every move.  Returns a dictionary of bound
+        methods, with None for the ones the agent lacks.
+        """
+        return dict((name, getattr(agent, name, None))
+                    for name in ['registerInitialState', 'observationFunction', 'getAction', 'final'])
+
+    def _observe(self):
+        "Returns the state to hand an agent: a snapshot, or a deep copy if deepCopyObservations is set."
+        if self.deepCopyObservations:
+            return self.state.deepCopy()
+        return self.state.getObservation()
+
+    def _timedCall(self, agent, function, timeout):
+        """
+        Wraps an agent method in a TimeoutFunction.  Agents that set usesBudget
+        get a Budget slightly shorter than the timeout as agent.budget, so they
+        can stop and return their best answer instead of being interrupted.
+        """
+        if not getattr(agent, 'usesBudget', False):
+            return TimeoutFunction(function, timeout)
+        agent.budget = Budget(timeLimit=0.9 * timeout)
+        return TimeoutFunction(function, timeout, useSignals=False)
+
     def run( self ):
         """
         Main control loop for game play.
         """
         self.display.initialize(self.state.data)
         self.numMoves = 0
+        self.agentMethods = [agent and self._agentMethods(agent) for agent in self.agents]
 
         ###self.display.initialize(self.state.makeObservation(1).data)
         # inform learning agents of the game start
@@ -583,14 +700,14 @@ class Game:
                 self.unmute()
                 self._agentCrash(i, quiet=True)
                 return
-            if ("registerInitialState" in dir(agent)):
+            if self.agentMethods[i]['registerInitialState']:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
+                        timed_func = self._timedCall(agent, agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
                         try:
                             start_time = time.time()
-                            timed_func(self.state.deepCopy())
+                            timed_func(self._observe())
                             time_taken = time.time() - start_time
                             self.totalAgentTimes[i] += time_taken
                         except TimeoutFunctionException:
@@ -604,7 +721,7 @@ class Game:
                         self.unmute()
                         return
                 else:
-                    agent.registerInitialState(self.state.deepCopy())
+                    agent.registerInitialState(self._observe())
                 ## TODO: could this exceed the total time
                 self.unmute()
 
@@ -617,14 +734,14 @@ class Game:
             move_time = 0
             skip_action = False
             # Generate an observation of the state
-            if 'observationFunction' in dir( agent ):
+            if self.agentMethods[agentIndex]['observationFunction']:
                 self.mute(agentIndex)
                 if self.catchExceptions:
                     try:
                         timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
                         try:
                             start_time = time.time()
-                            observation = timed_func(self.state.deepCopy())
+                            observation = timed_func(self._observe())
                         except TimeoutFunctionException:
                             skip_action = True
                         move_time += time.time() - start_time
@@ -634,17 +751,17 @@ class Game:
                         self.unmute()
                         return
                 else:
-                    observation = agent.observationFunction(self.state.deepCopy())
+                    observation = agent.observationFunction(self._observe())
                 self.unmute()
             else:
-                observation = self.state.deepCopy()
+                observation = self._observe()
 
             # Solicit an action
             action = None
             self.mute(agentIndex)
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
+                    timed_func = self._timedCall(agent, agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
                     try:
                         start_time = time.time()
                         if skip_action:
@@ -698,6 +815,7 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor( agentIndex, action )
+            if self.recorder: self.recorder.moveMade( len(self.moveHistory), self.state.data )
 
             # Change the display
             self.display.update( self.state.data )
@@ -716,7 +834,7 @@ class Game:
 
         # inform a learning agent of the game result
         for agentIndex, agent in enumerate(self.agents):
-            if "final" in dir( agent ) :
+            if self.agentMethods[agentIndex]['final']:
                 try:
                     self.mute(agentIndex)
                     agent.final( self.state )
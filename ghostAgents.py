@@ -42,6 +42,11 @@ class RandomGhost( GhostAgent ):
         dist.normalize()
         return dist
 
+# Policies (see DirectionalGhost.getPolicy) for each layout and pair of
+# probabilities, each holding at most POLICY_CACHE_SIZE situations
+POLICY_CACHE_SIZE = 65536
+_policyTables = {}
+
 class DirectionalGhost( GhostAgent ):
     "A ghost that prefers to rush Pacman, or flee when scared."
     def __init__( self, index, prob_attack=0.8, prob_scaredFlee=0.8 ):
@@ -49,7 +54,52 @@ class DirectionalGhost( GhostAgent ):
         self.prob_attack = prob_attack
         self.prob_scaredFlee = prob_scaredFlee
 
+    def getAction( self, state ):
+        dist, choices = self.getPolicy( state )
+        if choices is None:
+            return Directions.STOP
+        # Sampled as util.chooseFromDistribution does, so seeded games replay the same
+        return util.sample( *choices )
+
     def getDistribution( self, state ):
+        return self.getPolicy( state )[0].copy()
+
+    def getPolicy( self, state ):
+        """
+        Returns (distribution, choices) for the ghost's next action, where
+        choices are the probabilities and actions in the order util.sample
+        takes them (None if there are no legal actions).
+
+        On whole squares the distribution only depends on the ghost's square
+        and direction, Pacman's square and whether the ghost is scared, so it
+        is looked up in a table for the layout, filled in as situations come
+        up.  Scared ghosts between squares are computed every time.
+        """
+        ghostState = state.getGhostState( self.index )
+        conf = ghostState.configuration
+        x, y = conf.pos
+        pacmanPosition = state.getPacmanPosition()
+        if x != int(x) or y != int(y) or pacmanPosition[0] != int(pacmanPosition[0]) or pacmanPosition[1] != int(pacmanPosition[1]):
+            return self._makePolicy( self.computeDistribution( state ) )
+        layout = state.data.layout
+        tableKey = (layout.getHash(), self.prob_attack, self.prob_scaredFlee)
+        table = _policyTables.get(tableKey)
+        if table is None:
+            table = _policyTables[tableKey] = util.LRUCache(POLICY_CACHE_SIZE)
+        key = (int(x), int(y), conf.direction, int(pacmanPosition[0]), int(pacmanPosition[1]), ghostState.scaredTimer > 0)
+        policy = table.get(key)
+        if policy is None:
+            policy = self._makePolicy( self.computeDistribution( state ) )
+            table.put(key, policy)
+        return policy
+
+    def _makePolicy( self, dist ):
+        if len(dist) == 0: return dist, None
+        items = sorted(dist.items())
+        return dist, ([p for a, p in items], [a for a, p in items])
+
+    def computeDistribution( self, state ):
+        "Computes the distribution from scratch; see getPolicy."
         # Read variables from state
         ghostState = state.getGhostState( self.index )
         legalActions = state.getLegalActions( self.index )
@@ -15,6 +15,7 @@
 from graphicsUtils import *
 import math, time
 from game import Directions
+import search
 
 ###########################
 #  GRAPHICS DISPLAY CODE  #
@@ -32,6 +33,14 @@ SCORE_COLOR = formatColor(.9, .9, .9)
 PACMAN_OUTLINE_WIDTH = 2
 PACMAN_CAPTURE_OUTLINE_WIDTH = 4
 
+# The expanded-cells overlay: shades of red from bright (expanded first) to
+# dark, and how often it may refresh the window while it is being drawn
+EXPANDED_COLOR_LEVELS = 32
+EXPANDED_COLORS = [formatColor((1.0 - (level + 0.5) / EXPANDED_COLOR_LEVELS) * .5 + .25, 0, 0)
+                   for level in range(EXPANDED_COLOR_LEVELS)]
+EXPANDED_TAG = 'expandedCell'
+MAX_OVERLAY_FPS = 20
+
 GHOST_COLORS = []
 GHOST_COLORS.append(formatColor(.9,0,0)) # Red
 GHOST_COLORS.append(formatColor(0,.3,.9)) # Blue
@@ -161,6 +170,9 @@ class PacmanGraphics:
         self.gridSize = DEFAULT_GRID_SIZE * zoom
         self.capture = capture
         self.frameTime = frameTime
+        self.expandedCellImages = {}
+        self.expandedCellLevels = {}
+        self.overlayRefreshed = 0
 
     def checkNullDisplay(self):
         return False
@@ -185,6 +197,9 @@ class PacmanGraphics:
         self.make_window(self.width, self.height)
         self.infoPane = InfoPane(layout, self.gridSize)
         self.currentState = layout
+        # A new window has none of the old overlay's squares
+        self.expandedCellImages = {}
+        self.expandedCellLevels = {}
 
     def drawDistributions(self, state):
         walls = state.layout.walls
@@ -563,28 +578,62 @@ class PacmanGraphics:
 
     def drawExpandedCells(self, cells):
         """
-        Draws an overlay of expanded grid positions for search agents
+        Draws an overlay of expanded grid positions for search agents,
+        earliest brightest.  Each cell has one square, made the first time
+        it is drawn and recolored or hidden after that, so redrawing a list
+        that has grown only touches the cells whose shade changed.  With a
+        negative frameTime the cells appear in order, refreshed at most
+        MAX_OVERLAY_FPS times a second.
+        """
+        self.showExpandedCells(cells, self.frameTime < 0)
+
+    def streamExpandedCells(self, cells):
+        """
+        Redraws the overlay for cells, a list that a search is still
+        appending to, unless it was redrawn less than 1 / MAX_OVERLAY_FPS
+        seconds ago.  Call it as often as you like; see ExpandedCellsObserver.
         """
-        n = float(len(cells))
-        baseColor = [1.0, 0.0, 0.0]
-        self.clearExpandedCells()
-        self.expandedCells = []
+        if time.time() - self.overlayRefreshed < 1.0 / MAX_OVERLAY_FPS: return
+        self.showExpandedCells(cells, False)
+        refresh()
+        self.overlayRefreshed = time.time()
+
+    def showExpandedCells(self, cells, animate):
+        n = len(cells)
+        previous, shown = self.expandedCellLevels, {}
+        self.overlayRefreshed = time.time()
         for k, cell in enumerate(cells):
-            screenPos = self.to_screen( cell)
-            cellColor = formatColor(*[(n-k) * c * .5 / n + .25 for c in baseColor])
-            block = square(screenPos,
-                     0.5 * self.gridSize,
-                     color = cellColor,
-                     filled = 1, behind=2)
-            self.expandedCells.append(block)
-            if self.frameTime < 0:
+            # Squares drawn later went behind earlier ones, so the first visit shows
+            if cell in shown: continue
+            level = shown[cell] = k * EXPANDED_COLOR_LEVELS // n
+            if previous.pop(cell, None) != level:
+                self.drawExpandedCell(cell, EXPANDED_COLORS[level])
+            if animate and time.time() - self.overlayRefreshed >= 1.0 / MAX_OVERLAY_FPS:
                 refresh()
+                self.overlayRefreshed = time.time()
+        for cell in previous:
+            edit(self.expandedCellImages[cell], ('state', 'hidden'))
+        self.expandedCellLevels = shown
+        if animate: refresh()
+
+    def drawExpandedCell(self, cell, color):
+        image = self.expandedCellImages.get(cell)
+        if image is None:
+            image = square(self.to_screen(cell), 0.5 * self.gridSize, color=color, filled=1, behind=2)
+            addTag(image, EXPANDED_TAG)
+            self.expandedCellImages[cell] = image
+        else:
+            edit(image, ('fill', color), ('outline', color), ('state', 'normal'))
 
     def clearExpandedCells(self):
-        if 'expandedCells' in dir(self) and len(self.expandedCells) > 0:
-            for cell in self.expandedCells:
-                remove_from_screen(cell)
+        if self.expandedCellLevels:
+            # One call hides every pooled square
+            edit(EXPANDED_TAG, ('state', 'hidden'))
+            self.expandedCellLevels = {}
 
+    def expandedCellsObserver(self):
+        "Returns a search observer that draws the overlay while the search runs."
+        return ExpandedCellsObserver(self)
 
     def updateDistributions(self, distributions):
         "Draws an agent's belief distributions"
@@ -608,6 +657,27 @@ class PacmanGraphics:
                 changeColor(image, formatColor(*color))
         refresh()
 
+class ExpandedCellsObserver(search.SearchObserver):
+    """
+    Streams a search problem's _visitedlist to a PacmanGraphics overlay as
+    the search expands nodes, instead of drawing it once at the goal:
+
+      path = search.bfs(problem, observer=display.expandedCellsObserver())
+    """
+
+    def __init__(self, display):
+        self.display = display
+        self.cells = None
+
+    def searchStarted(self, problem, algorithm):
+        self.cells = getattr(problem, '_visitedlist', None)
+
+    def nodeExpanded(self, state):
+        if self.cells: self.display.streamExpandedCells(self.cells)
+
+    def searchFinished(self, path):
+        if self.cells: self.display.showExpandedCells(self.cells, False)
+
 class FirstPersonPacmanGraphics(PacmanGraphics):
     def __init__(self, zoom = 1.0, showGhosts = True, capture = False, frameTime=0):
         PacmanGraphics.__init__(self, zoom, frameTime=frameTime)
@@ -238,6 +238,10 @@ def changeText(id, newText, font=None, size=12, style='normal'):
 def changeColor(id, newColor):
     _canvas.itemconfigure(id, fill=newColor)
 
+def addTag(id, tag):
+    "Tags an item, so that edit(tag, ...) changes it along with the others tagged so."
+    _canvas.addtag_withtag(tag, id)
+
 def line(here, there, color=formatColor(0, 0, 0), width=2):
     x0, y0 = here[0], here[1]
     x1, y1 = there[0], there[1]
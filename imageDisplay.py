@@ -0,0 +1,237 @@
+# imageDisplay.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A display that draws games into image files instead of a window, for
+machines without Tk or an X server:
+
+  python pacman.py -l mediumMaze -p SearchAgent --imageDir frames --imageEvery 5
+
+Frames are drawn into an in-memory RGB buffer and written as PNG (or PPM,
+which is faster to write) with no libraries beyond the standard ones.  The
+walls, food and capsules are kept in a board buffer that is only patched
+when something is eaten, so a frame costs one buffer copy plus the agents.
+
+drawExpandedCells writes a heatmap of a search's expanded cells (earliest
+brightest, as in graphicsDisplay) and keeps it under later frames.
+"""
+
+import os
+import struct
+import zlib
+
+DEFAULT_CELL_SIZE = 12
+BACKGROUND_COLOR = (0, 0, 0)
+WALL_COLOR = (0, 51, 255)
+FOOD_COLOR = (255, 255, 255)
+CAPSULE_COLOR = (255, 255, 255)
+PACMAN_COLOR = (255, 255, 61)
+SCARED_COLOR = (255, 255, 255)
+GHOST_COLORS = [(230, 0, 0), (0, 77, 230), (250, 105, 18), (26, 191, 179), (255, 153, 0), (102, 33, 232)]
+FOOD_SIZE = 0.1
+CAPSULE_SIZE = 0.25
+PACMAN_SIZE = 0.5
+GHOST_SIZE = 0.65
+
+def encodePNG(width, height, pixels, level=1):
+    "Returns a PNG file of an RGB image, given as width * height * 3 bytes from the top row down."
+    stride = width * 3
+    raw = b''.join(b'\0' + pixels[row * stride:(row + 1) * stride] for row in range(height))
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(raw, level)) +
+            chunk(b'IEND', b''))
+
+def encodePPM(width, height, pixels):
+    return b'P6\n%d %d\n255\n' % (width, height) + bytes(pixels)
+
+class Sprite:
+    """
+    A shape rasterized once for a cell size: for each pixel row, the runs of
+    pixels it covers, so drawing it is a few slice assignments.
+    """
+    def __init__(self, cellSize, inside, color):
+        self.cellSize = cellSize
+        self.runs = []
+        center = (cellSize - 1) / 2.0
+        for row in range(cellSize):
+            start = None
+            for column in range(cellSize + 1):
+                covered = column < cellSize and inside((column - center) / cellSize, (row - center) / cellSize)
+                if covered and start is None:
+                    start = column
+                elif not covered and start is not None:
+                    self.runs.append((row, start, bytes(color) * (column - start)))
+                    start = None
+
+def disc(radius):
+    return lambda dx, dy: dx * dx + dy * dy <= radius * radius
+
+def ghostShape(size):
+    "A disc on top of a square skirt, like the ghosts in graphicsDisplay."
+    radius = size / 2.0
+    return lambda dx, dy: abs(dx) <= radius and dy <= radius and (dy >= 0 or dx * dx + dy * dy <= radius * radius)
+
+class PacmanImages:
+    """
+    Implements the display interface of graphicsDisplay.PacmanGraphics
+    (initialize, update, drawExpandedCells, finish), writing frames to
+    outputDir.
+
+      cellSize:   pixels per square
+      frameEvery: write every frameEvery-th update (the first and last
+                  frames are always written); 0 writes only the last
+      format:     'png' or 'ppm'
+    """
+    def __init__(self, outputDir='frames', cellSize=DEFAULT_CELL_SIZE, frameEvery=1, format='png'):
+        if format not in ('png', 'ppm'): raise ValueError('Unknown image format %r' % format)
+        self.outputDir = outputDir
+        self.cellSize = cellSize
+        self.frameEvery = frameEvery
+        self.format = format
+        self.frameNumber = 0
+        self.heatmapNumber = 0
+        self.expandedCells = []
+        self.cellColors = {}
+        self.state = None
+        cs = cellSize
+        self.foodSprite = Sprite(cs, disc(FOOD_SIZE), FOOD_COLOR)
+        self.capsuleSprite = Sprite(cs, disc(CAPSULE_SIZE), CAPSULE_COLOR)
+        self.pacmanSprite = Sprite(cs, disc(PACMAN_SIZE), PACMAN_COLOR)
+        self.ghostSprites = [Sprite(cs, ghostShape(GHOST_SIZE), color) for color in GHOST_COLORS]
+        self.scaredSprite = Sprite(cs, ghostShape(GHOST_SIZE), SCARED_COLOR)
+
+    def checkNullDisplay(self):
+        return False
+
+    def initialize(self, state, isBlue = False):
+        self.width, self.height = state.layout.width, state.layout.height
+        self.pixelWidth, self.pixelHeight = self.width * self.cellSize, self.height * self.cellSize
+        if not os.path.isdir(self.outputDir): os.makedirs(self.outputDir)
+        self.walls = state.layout.walls
+        self.board = bytearray(bytes(BACKGROUND_COLOR) * (self.pixelWidth * self.pixelHeight))
+        self.expandedCells = []
+        self.drawBoard(state)
+        self.updates = 0
+        self.state = state
+        self.lastWritten = None
+        if self.frameEvery:
+            self.writeFrame(state)
+            self.lastWritten = 0
+
+    def drawBoard(self, state):
+        "Redraws the walls, expanded cells, food and capsules into the board buffer."
+        for x in range(self.width):
+            for y in range(self.height):
+                self.drawCell(x, y, state)
+
+    def drawCell(self, x, y, state):
+        if self.walls[x][y]:
+            self.fillCell(self.board, x, y, WALL_COLOR)
+            return
+        self.fillCell(self.board, x, y, self.cellColors.get((x, y), BACKGROUND_COLOR) if self.expandedCells else BACKGROUND_COLOR)
+        if state.food[x][y]:
+            self.blit(self.board, self.foodSprite, x, y)
+        elif (x, y) in state.capsules:
+            self.blit(self.board, self.capsuleSprite, x, y)
+
+    def fillCell(self, pixels, x, y, color):
+        cs = self.cellSize
+        line = bytes(color) * cs
+        top = (self.height - 1 - y) * cs
+        for row in range(cs):
+            start = ((top + row) * self.pixelWidth + x * cs) * 3
+            pixels[start:start + cs * 3] = line
+
+    def blit(self, pixels, sprite, x, y):
+        "Draws a sprite with its square's corner at (x, y), which may be fractional."
+        cs = self.cellSize
+        left = int(round(x * cs))
+        top = int(round((self.height - 1 - y) * cs))
+        for row, column, run in sprite.runs:
+            start = ((top + row) * self.pixelWidth + left + column) * 3
+            pixels[start:start + len(run)] = run
+
+    def update(self, state):
+        if state._foodEaten != None:
+            self.drawCell(state._foodEaten[0], state._foodEaten[1], state)
+        if state._capsuleEaten != None:
+            self.drawCell(state._capsuleEaten[0], state._capsuleEaten[1], state)
+        self.state = state
+        self.updates += 1
+        if self.frameEvery and self.updates % self.frameEvery == 0:
+            self.writeFrame(state)
+            self.lastWritten = self.updates
+
+    def render(self, state):
+        "Returns a frame: the board with the agents drawn on it."
+        pixels = self.board[:]
+        for index, agentState in enumerate(state.agentStates):
+            if agentState.configuration == None: continue
+            x, y = agentState.configuration.getPosition()
+            if agentState.isPacman:
+                sprite = self.pacmanSprite
+            elif agentState.scaredTimer > 0:
+                sprite = self.scaredSprite
+            else:
+                sprite = self.ghostSprites[(index - 1) % len(self.ghostSprites)]
+            self.blit(pixels, sprite, x, y)
+        return pixels
+
+    def writeImage(self, name, pixels):
+        path = os.path.join(self.outputDir, '%s.%s' % (name, self.format))
+        if self.format == 'png':
+            data = encodePNG(self.pixelWidth, self.pixelHeight, pixels)
+        else:
+            data = encodePPM(self.pixelWidth, self.pixelHeight, pixels)
+        f = open(path, 'wb')
+        try: f.write(data)
+        finally: f.close()
+        return path
+
+    def writeFrame(self, state):
+        self.writeImage('frame_%08d' % self.frameNumber, self.render(state))
+        self.frameNumber += 1
+
+    def drawExpandedCells(self, cells):
+        """
+        Writes a heatmap of a search's expanded cells, colored like
+        graphicsDisplay's overlay (red, brightest for the earliest), and
+        keeps them on the board for later frames.
+        """
+        n = float(len(cells))
+        self.cellColors = {}
+        for k, cell in enumerate(cells):
+            red = int(255 * ((n - k) * .5 / n + .25))
+            # As in graphicsDisplay, a cell listed twice keeps its first color
+            self.cellColors.setdefault(cell, (red, 64, 64))
+        self.expandedCells = list(cells)
+        if self.state is None: return # Not initialized with a game yet
+        self.drawBoard(self.state)
+        self.writeImage('expanded_%04d' % self.heatmapNumber, self.board)
+        self.heatmapNumber += 1
+
+    def clearExpandedCells(self):
+        if self.expandedCells and self.state is not None:
+            self.expandedCells = []
+            self.drawBoard(self.state)
+
+    def updateDistributions(self, distributions):
+        pass
+
+    def finish(self):
+        if self.updates != self.lastWritten:
+            self.writeFrame(self.state)
@@ -16,6 +16,7 @@ from util import manhattanDistance
 from game import Grid
 import os
 import random
+import hashlib
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
@@ -62,6 +63,15 @@ class Layout:
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def getHash(self):
+        """
+        Returns a hex digest identifying this layout's text, so that data
+        derived from it can be shared or stored and found again.
+        """
+        if not hasattr(self, '_hash'):
+            self._hash = hashlib.sha1('\n'.join(self.layoutText).encode()).hexdigest()
+        return self._hash
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -91,7 +101,15 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        "Copies the layout's grids and lists, rather than parsing its text again."
+        layout = Layout.__new__(Layout)
+        layout.__dict__.update(self.__dict__)
+        layout.walls = self.walls.deepCopy()
+        layout.food = self.food.deepCopy()
+        layout.capsules = self.capsules[:]
+        layout.agentPositions = self.agentPositions[:]
+        layout.layoutText = self.layoutText[:]
+        return layout
 
     def processLayoutText(self, layoutText):
         """
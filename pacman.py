@@ -100,6 +100,7 @@ class GameState:
 
         # Copy current state
         state = GameState(self)
+        state.data.beginChanges()
 
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
@@ -112,7 +113,7 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
         else:
-            GhostRules.decrementTimer( state.data.agentStates[agentIndex] )
+            GhostRules.decrementTimer( state.data.getMutableAgentState( agentIndex ) )
 
         # Resolve multi-agent effects
         GhostRules.checkDeath( state, agentIndex )
@@ -120,6 +121,7 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
+        state.data.endChanges()
         GameState.explored.add(self)
         GameState.explored.add(state)
         return state
@@ -170,11 +172,13 @@ class GameState:
     def getCapsules(self):
         """
         Returns a list of positions (x,y) of the remaining capsules.
+
+        The list is shared with other states, so do not change it.
         """
         return self.data.capsules
 
     def getNumFood( self ):
-        return self.data.food.count()
+        return self.data._numFood
 
     def getFood(self):
         """
@@ -206,6 +210,9 @@ class GameState:
     def hasWall(self, x, y):
         return self.data.layout.walls[x][y]
 
+    def hasCapsule(self, x, y):
+        return (x, y) in self.data._capsuleSet
+
     def isLose( self ):
         return self.data._lose
 
@@ -231,6 +238,25 @@ class GameState:
         state.data = self.data.deepCopy()
         return state
 
+    def getObservation( self ):
+        """
+        Returns a snapshot of this state for an agent, in time independent of
+        the size of the board: the layout, food, capsules and agent states
+        are shared with this state, and copied only if the rules change them
+        (e.g. in generateSuccessor).  Agents must not change the snapshot's
+        grids, lists or agent states in place; use deepCopy for that.
+        """
+        state = GameState( self )
+        data = state.data
+        data._agentMoved = self.data._agentMoved
+        data._foodEaten = self.data._foodEaten
+        data._foodAdded = self.data._foodAdded
+        data._capsuleEaten = self.data._capsuleEaten
+        data._win = self.data._win
+        data._lose = self.data._lose
+        data.scoreChange = self.data.scoreChange
+        return state
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -271,11 +297,11 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, deepCopyObservations=False):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize( layout, len(ghostAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, deepCopyObservations=deepCopyObservations)
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -342,7 +368,7 @@ class PacmanRules:
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.getMutableAgentState( 0 )
 
         # Update Configuration
         vector = Actions.directionToVector( action, PacmanRules.PACMAN_SPEED )
@@ -361,21 +387,19 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.eatFood( x, y )
             state.data._foodEaten = position
-            # TODO: cache numFood?
             numFood = state.getNumFood()
             if numFood == 0 and not state.data._lose:
                 state.data.scoreChange += 500
                 state.data._win = True
         # Eat capsule
-        if( position in state.getCapsules() ):
-            state.data.capsules.remove( position )
+        if( state.hasCapsule( x, y ) ):
+            state.data.eatCapsule( position )
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.getMutableAgentState( index ).scaredTimer = SCARED_TIME
     consume = staticmethod( consume )
 
 class GhostRules:
@@ -404,7 +428,7 @@ class GhostRules:
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.getMutableAgentState( ghostIndex )
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0: speed /= 2.0
         vector = Actions.directionToVector( action, speed )
@@ -435,10 +459,12 @@ class GhostRules:
 
     def collide( state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
+            ghostState = state.data.getMutableAgentState( agentIndex )
             state.data.scoreChange += 200
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
-            # Added for first-person
+            # Added for first-person; the list may be shared with the previous state
+            state.data._eaten = state.data._eaten[:]
             state.data._eaten[agentIndex] = True
         else:
             if not state.data._win:
@@ -505,14 +531,24 @@ def readCommand( argv ):
                       metavar = 'TYPE', default='RandomGhost')
     parser.add_option('-k', '--numghosts', type='int', dest='numGhosts',
                       help=default('The maximum number of ghosts to use'), default=4)
+    parser.add_option('--imageDir', dest='imageDir',
+                      help='Write frames as images to this directory instead of opening a window', default=None)
+    parser.add_option('--imageEvery', dest='imageEvery', type='int',
+                      help=default('With --imageDir, write every n-th frame (0: only the last)'), default=1)
+    parser.add_option('--imageFormat', dest='imageFormat', type='choice', choices=['png', 'ppm'],
+                      help=default('With --imageDir, the image format: png or ppm'), default='png')
     parser.add_option('-z', '--zoom', type='float', dest='zoom',
                       help=default('Zoom the size of the graphics window'), default=1.0)
     parser.add_option('-f', '--fixRandomSeed', action='store_true', dest='fixRandomSeed',
                       help='Fixes the random seed to always play the same game', default=False)
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
-                      help='Writes game histories to a file (named by the time they were played)', default=False)
+                      help='Writes game histories to a file (named by the time they were played; see recording.py)', default=False)
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A recorded game file to replay (compact or pickled)', default=None)
+    parser.add_option('--replay-from', dest='replayFrom', type='int',
+                      help=default('The move to start a replay at; earlier moves are skipped without display'), default=0)
+    parser.add_option('--replay-speed', dest='replaySpeed', type='float',
+                      help=default('How many times faster than --frameTime to replay'), default=1.0)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -521,6 +557,10 @@ def readCommand( argv ):
                       help=default('Time to delay between frames; <0 means keyboard'), default=0.1)
     parser.add_option('-c', '--catchExceptions', action='store_true', dest='catchExceptions',
                       help='Turns on exception handling and timeouts during games', default=False)
+    parser.add_option('--deepCopyObservations', action='store_true', dest='deepCopyObservations',
+                      help='Give agents deep copies of the state instead of shared snapshots (for agents that change it)', default=False)
+    parser.add_option('--maxExpandedCells', dest='maxExpandedCells', type='int',
+                      help='Draw an even sample of at most this many of a search\'s expanded cells, to bound its memory', default=None)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
 
@@ -537,7 +577,7 @@ def readCommand( argv ):
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
     # Choose a Pacman agent
-    noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics)
+    noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics or options.imageDir)
     pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
     if options.numTraining > 0:
@@ -555,8 +595,16 @@ def readCommand( argv ):
     ghostType = loadAgent(options.ghost, noKeyboard)
     args['ghosts'] = [ghostType( i+1 ) for i in range( options.numGhosts )]
 
+    if options.gameToReplay != None:
+        if options.replaySpeed <= 0: raise Exception('--replay-speed must be positive')
+        options.frameTime /= options.replaySpeed
+
     # Choose a display format
-    if options.quietGraphics:
+    if options.imageDir:
+        import imageDisplay
+        args['display'] = imageDisplay.PacmanImages(options.imageDir, int(imageDisplay.DEFAULT_CELL_SIZE * options.zoom),
+                                                    options.imageEvery, options.imageFormat)
+    elif options.quietGraphics:
         import textDisplay
         args['display'] = textDisplay.NullGraphics()
     elif options.textGraphics:
@@ -570,16 +618,25 @@ def readCommand( argv ):
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['deepCopyObservations'] = options.deepCopyObservations
+    args['maxExpandedCells'] = options.maxExpandedCells
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print('Replaying recorded game %s.' % options.gameToReplay)
+        import recording
+        if recording.isRecording(options.gameToReplay):
+            # Moves are read from the file as the replay goes
+            with recording.RecordingReader(options.gameToReplay) as reader:
+                replayGame(reader.layout, reader, args['display'], numGhosts = reader.numAgents - 1,
+                           startMove = options.replayFrom)
+            sys.exit(0)
         import pickle
         f = open(options.gameToReplay, 'rb')
         try: recorded = pickle.load(f)
         finally: f.close()
         recorded['display'] = args['display']
-        replayGame(**recorded)
+        replayGame(startMove = options.replayFrom, **recorded)
         sys.exit(0)
 
     return args
@@ -607,12 +664,29 @@ def loadAgent(pacman, nographics):
                 return getattr(module, pacman)
     raise Exception('The agent ' + pacman + ' is not specified in any *Agents.py.')
 
-def replayGame( layout, actions, display ):
+def replayGame( layout, actions, display, numGhosts = None, startMove = 0 ):
+    """
+    Replays a list (or RecordingReader) of (agentIndex, action) moves.  With
+    startMove, the moves before it are played without display, starting from
+    the recording's closest keyframe if it has them.
+    """
     import pacmanAgents, ghostAgents
     rules = ClassicGameRules()
-    agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1) for i in range(layout.getNumGhosts())]
+    if numGhosts == None: numGhosts = layout.getNumGhosts()
+    agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1) for i in range(numGhosts)]
     game = rules.newGame( layout, agents[0], agents[1:], display )
     state = game.state
+
+    move = 0
+    if startMove > 0 and hasattr(actions, 'restoreKeyframe'):
+        move = actions.restoreKeyframe(startMove, state)
+    actions = iter(actions)
+    while move < startMove and not game.gameOver:
+        try: action = next(actions)
+        except StopIteration: break
+        state = state.generateSuccessor( *action )
+        rules.process(state, game)
+        move += 1
     display.initialize(state.data)
 
     for action in actions:
@@ -625,34 +699,44 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
-    import __main__
-    __main__.__dict__['_display'] = display
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, deepCopyObservations=False, maxExpandedCells=None ):
+    # Search agents' problems draw what they expanded on displays that can
+    import search
+    observing = 'drawExpandedCells' in dir(display)
+    if observing:
+        search.addExpansionObserver(display)
+        search.setVisitRecording(maxExpandedCells)
 
     rules = ClassicGameRules(timeout)
     games = []
 
-    for i in range( numGames ):
-        beQuiet = i < numTraining
-        if beQuiet:
-                # Suppress output and graphics
-            import textDisplay
-            gameDisplay = textDisplay.NullGraphics()
-            rules.quiet = True
-        else:
-            gameDisplay = display
-            rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
-        game.run()
-        if not beQuiet: games.append(game)
-
-        if record:
-            import time, pickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = open(fname, 'wb')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            pickle.dump(components, f)
-            f.close()
+    try:
+        for i in range( numGames ):
+            beQuiet = i < numTraining
+            if beQuiet:
+                    # Suppress output and graphics
+                import textDisplay
+                gameDisplay = textDisplay.NullGraphics()
+                rules.quiet = True
+            else:
+                gameDisplay = display
+                rules.quiet = False
+            game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions, deepCopyObservations)
+            if record:
+                import recording
+                game.recorder = recording.KeyframeRecorder()
+            game.run()
+            if not beQuiet: games.append(game)
+
+            if record:
+                import time
+                fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
+                recording.writeRecording(fname, layout, game.moveHistory, len(game.agents),
+                                         keyframeInterval=game.recorder.interval, keyframes=game.recorder.keyframes)
+    finally:
+        if observing:
+            search.removeExpansionObserver(display)
+            search.setVisitRecording()
 
     if (numGames-numTraining) > 0:
         scores = [game.state.getScore() for game in games]
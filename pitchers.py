@@ -1,5 +1,9 @@
 # GUI for the pitchers problem. Invokes the problem definition from pitchers_problem.py 
-# and BFS from search.py. You can change the problem instance in line 199.
+# and BFS from search.py. You can change the problem instance at the bottom, or press
+# 0-4 to load one of the puzzles in PITCHERS_PUZZLE_DATA. The search runs in a worker
+# thread, showing its progress, and can be cancelled with the button. There is no
+# informed search for this problem yet, so puzzles with large capacities are slow.
+# The window closes once the solution has been shown, unless run with --keep-open.
 
 import pygame
 import sys
@@ -16,6 +20,13 @@ FONT_SIZE = 30
 PITCHER_WIDTH = 70
 PITCHER_HEIGHT = 300
 ARROW_LENGTH = 30
+MOVE_DELAY = 5000 # Milliseconds each move is shown before it is made
+CLOSE_DELAY = 5000 # Milliseconds the outcome is shown before the window closes
+FRAME_RATE = 30
+CANCEL_RECT = (WIDTH - 130, 10, 120, 40)
+
+# Paths found so far, by puzzle, so that solving a puzzle again is instant
+_solutions = {}
 
 # Function to create a pitcher
 def create_pitcher(capacity):
@@ -146,58 +157,129 @@ def draw_pitchers(screen, pitchers, moves, move_index):
  
     pygame.display.update()
 
-# Main function
-def main(capacities, moves):
+# Function to make a move
+def apply_move(pitchers, move):
+    if move.startswith('f:'):
+        pitcher_index = int(move.split(':')[1])
+        fill_pitcher(pitchers[pitcher_index])
+    elif move.startswith('e:'):
+        pitcher_index = int(move.split(':')[1])
+        empty_pitcher(pitchers[pitcher_index])
+    elif move.startswith('p:'):
+        source_index, target_index = map(int, move.split(':')[1:])
+        pour_pitcher(pitchers[source_index], pitchers[target_index])
+
+# Function to draw a message, and the cancel button while searching
+def draw_status(screen, message, searching):
+    font = pygame.font.SysFont(None, FONT_SIZE)
+    if message:
+        for i, line in enumerate(message.split('\n')):
+            text = font.render(line, True, BLACK)
+            text_rect = text.get_rect(center=(WIDTH // 2, 100 + i * FONT_SIZE))
+            screen.blit(text, text_rect)
+    if searching:
+        button_rect = pygame.Rect(*CANCEL_RECT)
+        pygame.draw.rect(screen, BLACK, button_rect, 1)
+        text = font.render("Cancel", True, BLACK)
+        screen.blit(text, text.get_rect(center=button_rect.center))
+    pygame.display.update()
+
+# Function to start solving a puzzle in the background; None if it has no solution
+def start_solving(puzzle):
+    if cannotBeSolved(puzzle):
+        return None
+    print('Searching for a solution to %s' % str(puzzle).strip())
+    return search.BackgroundSearch(search.breadthFirstSearch, PitchersPuzzleSearchProblem(puzzle))
+
+# Main function; with keep_open the window stays open after the outcome, for the next puzzle
+def main(puzzle, keep_open=False):
     # Initialize the display
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Pitchers Puzzle")
+    clock = pygame.time.Clock()
 
-    # Create the pitchers
-    pitchers = [create_pitcher(capacity) for capacity in capacities]
+    solver = None
+    close_time = None
+    while True:
+        # (Re)start with the puzzle: its pitchers, and its moves if solved before
+        if puzzle is not None:
+            pitchers = [create_pitcher(capacity) for capacity in puzzle.capacities]
+            for pitcher, amount in zip(pitchers, puzzle.contents):
+                pitcher['current'] = amount
+            key = str(puzzle)
+            moves, message = [], None
+            move_index = -1
+            close_time = None
+            if solver: solver.cancel()
+            solver = None
+            if key in _solutions:
+                moves = _solutions[key]
+                next_move_time = pygame.time.get_ticks() + MOVE_DELAY
+            else:
+                solver = start_solving(puzzle)
+                if solver is None: message = "This puzzle has no solution"
+            puzzle = None
 
-    # Main game loop
-    running = True
-    move_index = -1
-
-    while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if solver: solver.cancel()
                 pygame.quit()
                 sys.exit()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if solver and pygame.Rect(*CANCEL_RECT).collidepoint(pygame.mouse.get_pos()):
+                    solver.cancel()
+            elif event.type == pygame.KEYDOWN and event.unicode.isdigit():
+                if int(event.unicode) < len(PITCHERS_PUZZLE_DATA):
+                    puzzle = loadPitchersPuzzle(int(event.unicode))
+
+        # Collect the search's result once it is done
+        if solver and solver.done():
+            if solver.error is not None:
+                # The search itself failed; fail as loudly as a direct call would
+                raise solver.error
+            path = solver.result
+            if path.solved:
+                print('BFS found a path of %d moves in %.1f seconds: %s' % (len(path), solver.elapsed(), str(list(path))))
+                moves = _solutions[key] = list(path)
+                next_move_time = pygame.time.get_ticks() + MOVE_DELAY
+            elif path.reason == 'cancelled':
+                message = "Search cancelled"
+            else:
+                message = "This puzzle has no solution"
+            solver = None
 
-        if move_index < len(moves)-1:
-            draw_pitchers(screen, pitchers, moves, move_index)
+        # Make the next move once it has been shown long enough
+        if move_index < len(moves)-1 and pygame.time.get_ticks() >= next_move_time:
             move_index += 1
-            pygame.time.wait(5000)
-            move = moves[move_index]
-            if move.startswith('f:'):
-                pitcher_index = int(move.split(':')[1])
-                fill_pitcher(pitchers[pitcher_index])
-            elif move.startswith('e:'):
-                pitcher_index = int(move.split(':')[1])
-                empty_pitcher(pitchers[pitcher_index])
-            elif move.startswith('p:'):
-                source_index, target_index = map(int, move.split(':')[1:])
-                pour_pitcher(pitchers[source_index], pitchers[target_index])
-        if move_index >= len(moves)-1:
-            draw_pitchers(screen, pitchers, moves, move_index)
-            pygame.time.wait(2000)
-            running = False
+            apply_move(pitchers, moves[move_index])
+            next_move_time += MOVE_DELAY
+            if move_index >= len(moves)-1:
+                message = "Desired amount achieved!"
+        if moves == [] and solver is None and message is None:
+            message = "Desired amount achieved!"
 
-    # Check if all pitchers have the desired amount
-    font = pygame.font.SysFont(None, FONT_SIZE)
-    text = font.render("Desired amount achieved!", True, BLACK)
-    text_rect = text.get_rect(center=(WIDTH // 2, 100))
-    screen.blit(text, text_rect)
-    pygame.display.update()
-    pygame.time.wait(3000)  # Display message for 3 seconds
+        if solver:
+            message = "BFS: %d expanded, frontier %d\n(no informed search yet; large capacities are slow)" % \
+                (solver.progress.expanded, solver.progress.frontier)
+        draw_pitchers(screen, pitchers, moves, move_index)
+        draw_status(screen, message, solver is not None)
+
+        # Unless keeping the window open, close it a while after the outcome is shown
+        if not keep_open and solver is None and message is not None and move_index >= len(moves)-1:
+            if close_time is None:
+                close_time = pygame.time.get_ticks() + CLOSE_DELAY
+            elif pygame.time.get_ticks() >= close_time:
+                return
+        clock.tick(FRAME_RATE)
 
 # Run the main function
-from pitchers_problem import PitchersState, PitchersPuzzleSearchProblem
+from pitchers_problem import PitchersState, PitchersPuzzleSearchProblem, PITCHERS_PUZZLE_DATA, loadPitchersPuzzle, cannotBeSolved
 import search
 if __name__ == "__main__":
+    from optparse import OptionParser
+    parser = OptionParser('USAGE: python pitchers.py [--keep-open]')
+    parser.add_option('--keep-open', action='store_true', dest='keepOpen', default=False,
+                      help='keep the window open after the solution, to load other puzzles with 0-4')
+    options, otherjunk = parser.parse_args()
     puzzle = PitchersState([4, 5, 3, 0, 0]) #[1, 3, 8, 12, 0, 0, 0]) #[1, 2, 5, 10, 0, 0, 0])
-    problem = PitchersPuzzleSearchProblem(puzzle)
-    path = search.breadthFirstSearch(problem)
-    print('BFS found a path of %d moves: %s' % (len(path), str(path)))
-    main(puzzle.capacities, path)
+    main(puzzle, options.keepOpen)
@@ -9,6 +9,7 @@
 
 import search
 import random
+from math import gcd
 
 # Module Classes
 
@@ -173,6 +174,20 @@ class PitchersPuzzleSearchProblem(search.SearchProblem):
         return len(actions)
 
 
+def cannotBeSolved(state):
+    """
+    Returns True for puzzles that have no solution, found without searching:
+    every amount a pitcher can hold is a multiple of the greatest common
+    divisor of the capacities and contents, and none exceeds the largest
+    capacity.  (False does not promise a solution.)
+    """
+    if state.isGoal():
+        return False
+    divisor = 0
+    for amount in list(state.capacities) + list(state.contents):
+        divisor = gcd(divisor, amount)
+    return state.goal > max(state.capacities) or divisor == 0 or state.goal % divisor != 0
+
 # Below are a few random instances of the pitchers puzzle
 PITCHERS_PUZZLE_DATA = [
     [4, 5, 3, 0, 0],
@@ -193,8 +208,32 @@ def loadPitchersPuzzle(puzzleNumber):
     """
     return PitchersState(PITCHERS_PUZZLE_DATA[puzzleNumber])
 
+def createRandomPitchersPuzzle(pitchers=3, maxCapacity=12):
+    """
+    Returns a puzzle with pitchers empty pitchers of random capacities from
+    1 to maxCapacity, and a random goal no larger than the largest of them.
+    It may have no solution (see cannotBeSolved).
+    """
+    capacities = [random.randint(1, maxCapacity) for i in range(pitchers)]
+    goal = random.randint(1, max(capacities))
+    return PitchersState([goal] + capacities + [0] * pitchers)
+
+# For puzzleBatch, which solves many instances given as lists of numbers
+def problemFromNumbers(numbers):
+    return PitchersPuzzleSearchProblem(PitchersState(numbers))
+
+def randomNumbers(pitchers=3, maxCapacity=12):
+    puzzle = createRandomPitchersPuzzle(int(pitchers), int(maxCapacity))
+    return [puzzle.goal] + list(puzzle.capacities) + list(puzzle.contents)
+
 
 if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        # Batch solving: see puzzleBatch.py
+        import puzzleBatch
+        sys.exit(puzzleBatch.main(sys.argv[1:], 'pitchers'))
+
     puzzle = loadPitchersPuzzle(random.choice(range(len(PITCHERS_PUZZLE_DATA))))
     print('A random puzzle:')
     print(puzzle)
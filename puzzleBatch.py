@@ -0,0 +1,194 @@
+# puzzleBatch.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Solves many eight puzzle or pitchers instances with one search function,
+in a pool of worker processes, to compare search functions and heuristics
+on far more instances than the interactive front ends can:
+
+  python puzzleBatch.py --puzzle eightpuzzle --instances random:1000,moves=40 \
+      --fn aStarSearch --heuristic manhattanHeuristic -j 4 > astar.jsonl
+  python pitchers_problem.py --instances pitchers.txt --fn bfs
+
+(eightpuzzle_problem.py and pitchers_problem.py take the same options.)
+
+Instances are read from a file, one per line as the numbers the puzzle's
+state is built from (separated by spaces or commas; '#' starts a comment),
+or made by a generator spec, random:COUNT[,name=value...], whose values are
+passed to the puzzle's random instance function along with seed.
+Identical instances are solved once.  Results are written as JSON lines in
+the order the instances first appear, each as soon as it and those before it
+are solved: the instance, how many times it occurred, whether it was solved,
+the path length, the nodes expanded and the seconds taken.
+"""
+
+import importlib
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import search
+import util
+
+# Each puzzle's module provides problemFromNumbers(numbers) and
+# randomNumbers(**values) for batches
+PUZZLES = {'eightpuzzle': 'eightpuzzle_problem', 'pitchers': 'pitchers_problem'}
+
+def readInstances(source, module):
+    """
+    Returns the instances (tuples of numbers) named by source: a generator
+    spec (see above) or the name of an instance file.
+    """
+    if source.startswith('random:'):
+        fields = source[len('random:'):].split(',')
+        values = dict(field.split('=', 1) for field in fields[1:])
+        seed = values.pop('seed', None)
+        state = random.getstate()
+        random.seed(seed)
+        try:
+            return [tuple(module.randomNumbers(**values)) for i in range(int(fields[0]))]
+        finally:
+            random.setstate(state)
+    instances = []
+    with open(source) as f:
+        for line in f:
+            numbers = re.findall(r'-?\d+', line.split('#', 1)[0])
+            if numbers: instances.append(tuple(int(n) for n in numbers))
+    return instances
+
+def countInstances(instances):
+    "Returns [(instance, occurrences)] with each distinct instance once, in order of appearance."
+    counts = {}
+    for instance in instances:
+        counts[instance] = counts.get(instance, 0) + 1
+    return list(counts.items())
+
+def solveInstance(task):
+    """
+    Solves one instance and returns its result record.  Runs in the worker
+    processes, so it takes and returns only plain values.
+    """
+    moduleName, instance, count, fn, heuristic, timeLimit = task
+    module = importlib.import_module(moduleName)
+    problem = module.problemFromNumbers(list(instance))
+    options = {'budget': util.Budget(timeLimit)}
+    if heuristic is not None:
+        options['heuristic'] = getattr(module, heuristic, None) or getattr(search, heuristic)
+    start = time.perf_counter()
+    path = getattr(search, fn)(problem, **options)
+    seconds = time.perf_counter() - start
+    record = {'instance': list(instance), 'count': count, 'solved': path.solved,
+              'length': len(path), 'expanded': path.nodes, 'seconds': round(seconds, 6)}
+    if path.reason is not None:
+        record['reason'] = path.reason
+    return record
+
+def solveBatch(puzzle, instances, fn='breadthFirstSearch', heuristic=None, timeLimit=None, processes=None):
+    """
+    Yields a result record (see solveInstance) for every distinct instance
+    of puzzle ('eightpuzzle' or 'pitchers'), in the order the instances
+    first appear.  The solves are spread over processes worker processes
+    (all the machine's processors for None); with 1 they run here.
+
+      fn:        the name of a search function in search.py that takes a budget
+      heuristic: the name of a heuristic in the puzzle's module or search.py
+      timeLimit: seconds allowed per instance; None for no limit
+    """
+    moduleName = PUZZLES[puzzle]
+    module = importlib.import_module(moduleName)
+    function = getattr(search, fn, None)
+    if function is None or 'budget' not in function.__code__.co_varnames:
+        raise AttributeError('%s is not a search function in search.py that takes a budget.' % fn)
+    if heuristic is not None:
+        if 'heuristic' not in function.__code__.co_varnames:
+            raise AttributeError('%s does not take a heuristic.' % fn)
+        if not (hasattr(module, heuristic) or hasattr(search, heuristic)):
+            raise AttributeError('%s is not a heuristic in %s.py or search.py.' % (heuristic, moduleName))
+    tasks = [(moduleName, instance, count, fn, heuristic, timeLimit)
+             for instance, count in countInstances(instances)]
+    if processes == 1:
+        for task in tasks:
+            yield solveInstance(task)
+        return
+    import multiprocessing
+    pool = multiprocessing.Pool(processes)
+    try:
+        # Small chunks keep results streaming out while the rest are solved
+        for record in pool.imap(solveInstance, tasks, chunksize=4):
+            yield record
+    finally:
+        pool.terminate()
+        pool.join()
+
+def readCommand(argv, puzzle=None):
+    from optparse import OptionParser
+    usage = 'USAGE: python %s --instances FILE|random:COUNT[,name=value...] <options>' % \
+            ('puzzleBatch.py --puzzle PUZZLE' if puzzle is None else PUZZLES[puzzle] + '.py')
+    parser = OptionParser(usage)
+    if puzzle is None:
+        parser.add_option('--puzzle', dest='puzzle', type='choice', choices=sorted(PUZZLES),
+                          help='The puzzle to solve: %s' % ' or '.join(sorted(PUZZLES)))
+    parser.add_option('-i', '--instances', dest='instances',
+                      help='An instance file, or a generator spec such as random:1000,seed=1')
+    parser.add_option('-f', '--fn', dest='fn', default='breadthFirstSearch',
+                      help='Search function from search.py [Default: %default]')
+    parser.add_option('--heuristic', dest='heuristic', default=None,
+                      help='Heuristic from the puzzle module or search.py, for informed searches')
+    parser.add_option('--timeLimit', dest='timeLimit', type='float', default=None,
+                      help='Seconds allowed per instance (default: no limit)')
+    parser.add_option('-j', '--processes', dest='processes', type='int', default=None,
+                      help='Worker processes (default: one per processor)')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write the JSON lines to this file instead of standard output')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if puzzle is not None:
+        options.puzzle = puzzle
+    if not options.puzzle or not options.instances:
+        parser.error('Give the instances to solve%s' % ('' if puzzle else ' and the puzzle'))
+    return options
+
+def main(argv, puzzle=None):
+    options = readCommand(argv, puzzle)
+    module = importlib.import_module(PUZZLES[options.puzzle])
+    instances = readInstances(options.instances, module)
+    output = open(options.output, 'w') if options.output else sys.stdout
+    start = time.perf_counter()
+    distinct = solved = 0
+    records = solveBatch(options.puzzle, instances, options.fn, options.heuristic,
+                         options.timeLimit, options.processes)
+    try:
+        for record in records:
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+            distinct += 1
+            solved += record['solved']
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head): stop quietly, and point
+        # stdout at devnull so the flush at exit does not complain again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        records.close() # Stops the worker pool
+        if output is not sys.stdout: output.close()
+    print('%d instances (%d distinct), %d solved, in %.1f seconds' %
+          (len(instances), distinct, solved, time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,429 @@
+# recording.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A compact file format for recorded games (pacman.py -r), which can be replayed
+while it is being read (pacman.py --replay FILE).
+
+Agents move in turn, so a game is one stream of moves and the agent making
+each move is implied by its position.  North, South, East and West are packed
+two bits per move; the rarer Stop moves are listed separately by position.
+The moves are split into chunks with an index at the end of the file, so a
+reader can seek to any move without decoding the ones before it.
+
+  header:    'PACR', version, number of agents, chunk size, number of moves,
+             sha1 of the layout text, and the zlib-compressed layout text
+  chunks:    byte length, number of moves, number of stops, the positions of
+             the stops (each as the gap from the previous one), and the
+             packed moves
+  keyframes: the game state after every KEYFRAME_INTERVAL moves (see
+             packState), so a replay can start from the middle of a game
+             without simulating everything before it
+  index:     the number of chunks and the file offset of each, then the
+             keyframe interval, the number of keyframes and their offsets
+  footer:    the offset of the index, as 8 little-endian bytes
+
+All the integers except the footer are varints (7 bits per byte, low bits
+first).
+
+  python recording.py --convert OLDFILE [-o NEWFILE]   converts a pickled recording
+  python recording.py --info FILE                      describes a recording
+"""
+
+import hashlib
+import struct
+import zlib
+from game import Directions
+
+MAGIC = b'PACR'
+VERSION = 2
+CHUNK_SIZE = 4096
+KEYFRAME_INTERVAL = 1024
+MOVES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+DIRECTIONS = MOVES + [Directions.STOP]
+MOVE_CODES = dict((move, code) for code, move in enumerate(MOVES))
+FOOTER = struct.Struct('<Q')
+
+class RecordingFormatError(Exception):
+    pass
+
+def encodeVarint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def decodeVarint(data, position):
+    "Returns (value, position after it)."
+    value, shift = 0, 0
+    while True:
+        if position >= len(data):
+            raise RecordingFormatError('Truncated recording')
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+def readVarint(f):
+    value, shift = 0, 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise RecordingFormatError('Truncated recording')
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+def encodeSigned(n):
+    return encodeVarint(n * 2 if n >= 0 else -n * 2 - 1)
+
+def decodeSigned(data, position):
+    n, position = decodeVarint(data, position)
+    return (n >> 1 if not n & 1 else -(n >> 1) - 1), position
+
+def encodeChunk(actions):
+    "Returns the bytes of one chunk of actions (direction strings)."
+    stops, packed = [], bytearray((len(actions) + 3) // 4)
+    for i, action in enumerate(actions):
+        if action == Directions.STOP:
+            stops.append(i)
+        elif action in MOVE_CODES:
+            packed[i >> 2] |= MOVE_CODES[action] << ((i & 3) * 2)
+        else:
+            raise RecordingFormatError('Cannot record the action %r' % (action,))
+    body = bytearray(encodeVarint(len(actions)) + encodeVarint(len(stops)))
+    previous = 0
+    for stop in stops:
+        body += encodeVarint(stop - previous)
+        previous = stop
+    body += packed
+    return encodeVarint(len(body)) + bytes(body)
+
+def decodeChunk(body):
+    "Returns the list of actions in a chunk's body."
+    count, position = decodeVarint(body, 0)
+    numStops, position = decodeVarint(body, position)
+    stops, previous = set(), 0
+    for i in range(numStops):
+        gap, position = decodeVarint(body, position)
+        previous += gap
+        stops.add(previous)
+    actions = []
+    for i in range(count):
+        if i in stops:
+            actions.append(Directions.STOP)
+        else:
+            actions.append(MOVES[(body[position + (i >> 2)] >> ((i & 3) * 2)) & 3])
+    return actions
+
+def packState(data):
+    """
+    Returns the bytes of a keyframe for a GameStateData: the score, the food
+    as a bitset over cells (numbered x * height + y), the capsules, and for
+    each agent its position, direction, scared timer and food counts.
+    Positions are stored doubled, as scared ghosts move half a square.
+    """
+    food = data.food
+    width, height = food.width, food.height
+    out = bytearray(encodeSigned(int(data.score)))
+    bits = bytearray((width * height + 7) // 8)
+    for x in range(width):
+        column = food[x]
+        for y in range(height):
+            if column[y]:
+                cell = x * height + y
+                bits[cell >> 3] |= 1 << (cell & 7)
+    out += bits
+    out += encodeVarint(len(data.capsules))
+    for x, y in data.capsules:
+        out += encodeVarint(x * height + y)
+    for agentState in data.agentStates:
+        x, y = agentState.configuration.pos
+        out += encodeVarint(int(round(x * 2))) + encodeVarint(int(round(y * 2)))
+        out += encodeVarint(DIRECTIONS.index(agentState.configuration.direction))
+        out += encodeVarint(agentState.scaredTimer)
+        out += encodeVarint(agentState.numCarrying) + encodeVarint(agentState.numReturned)
+    return bytes(out)
+
+def unpackState(data, packed):
+    """
+    Sets a GameStateData from packState's bytes.  data must be a state of the
+    same game (e.g. its initial state), which supplies the layout and agents.
+    """
+    from game import Configuration
+    food = data.food.copy()
+    width, height = food.width, food.height
+    score, position = decodeSigned(packed, 0)
+    data.score = score
+    for x in range(width):
+        for y in range(height):
+            cell = x * height + y
+            food[x][y] = bool(packed[position + (cell >> 3)] & (1 << (cell & 7)))
+    position += (width * height + 7) // 8
+    data.setFood(food)
+    count, position = decodeVarint(packed, position)
+    capsules = []
+    for i in range(count):
+        cell, position = decodeVarint(packed, position)
+        capsules.append(divmod(cell, height))
+    data.setCapsules(capsules)
+    for agentIndex in range(len(data.agentStates)):
+        agentState = data.getMutableAgentState(agentIndex)
+        values = []
+        for i in range(6):
+            value, position = decodeVarint(packed, position)
+            values.append(value)
+        x, y, direction, agentState.scaredTimer, agentState.numCarrying, agentState.numReturned = values
+        # Whole squares come back as ints, as they were played
+        x = x // 2 if x % 2 == 0 else x / 2.0
+        y = y // 2 if y % 2 == 0 else y / 2.0
+        agentState.configuration = Configuration((x, y), DIRECTIONS[direction])
+    data._eaten = [False for agentState in data.agentStates]
+    data._win = data._lose = False
+
+def gameKeyframes(layout, moveHistory, numAgents, interval=KEYFRAME_INTERVAL):
+    "Replays a game without display and returns the packed state after every interval moves."
+    if not interval: return []
+    import pacman
+    state = pacman.GameState()
+    state.initialize(layout, numAgents - 1)
+    keyframes = []
+    for i, move in enumerate(moveHistory):
+        state = state.generateSuccessor(*move)
+        if (i + 1) % interval == 0 and i + 1 < len(moveHistory):
+            keyframes.append(packState(state.data))
+    return keyframes
+
+class KeyframeRecorder:
+    """
+    Collects a game's keyframes while it is played, so writing the recording
+    needs no replay.  Set it as a Game's recorder before running the game,
+    then pass its keyframes and interval to writeRecording.
+    """
+    def __init__(self, interval=KEYFRAME_INTERVAL):
+        self.interval = interval
+        self.keyframes = []
+
+    def moveMade(self, numMoves, data):
+        "Called by the Game with the number of moves so far and the state's data after the last."
+        if self.interval and numMoves % self.interval == 0:
+            self.keyframes.append(packState(data))
+
+def writeRecording(filename, layout, moveHistory, numAgents=None, chunkSize=CHUNK_SIZE,
+                   keyframeInterval=KEYFRAME_INTERVAL, keyframes=None):
+    """
+    Writes a game to filename.
+
+      layout:      the Layout the game was played on
+      moveHistory: the game's list of (agentIndex, action), as in Game.moveHistory
+      numAgents:   the number of agents in the game (by default, inferred
+                   from moveHistory)
+      keyframes:   the game's keyframes every keyframeInterval moves, e.g.
+                   from a KeyframeRecorder
+
+    Without keyframes they are made by replaying the game, which costs about
+    as much as one undisplayed replay.
+    """
+    if numAgents is None:
+        numAgents = max([agentIndex for agentIndex, action in moveHistory] + [0]) + 1
+    for i, (agentIndex, action) in enumerate(moveHistory):
+        if agentIndex != i % numAgents:
+            raise RecordingFormatError('Move %d was made by agent %d, out of turn' % (i, agentIndex))
+    text = '\n'.join(layout.layoutText).encode()
+    compressed = zlib.compress(text, 9)
+    with open(filename, 'wb') as f:
+        f.write(MAGIC + encodeVarint(VERSION) + encodeVarint(numAgents) + encodeVarint(chunkSize) +
+                encodeVarint(len(moveHistory)) + hashlib.sha1(text).digest() +
+                encodeVarint(len(compressed)) + compressed)
+        offsets = []
+        for start in range(0, len(moveHistory), chunkSize):
+            offsets.append(f.tell())
+            f.write(encodeChunk([action for agentIndex, action in moveHistory[start:start + chunkSize]]))
+        keyframeOffsets = []
+        if keyframes is None:
+            keyframes = gameKeyframes(layout, moveHistory, numAgents, keyframeInterval)
+        elif keyframeInterval:
+            # No keyframe for the end of the game, as gameKeyframes makes them
+            keyframes = keyframes[:(len(moveHistory) - 1) // keyframeInterval]
+        else:
+            keyframes = []
+        for keyframe in keyframes:
+            keyframeOffsets.append(f.tell())
+            f.write(encodeVarint(len(keyframe)) + keyframe)
+        indexOffset = f.tell()
+        f.write(encodeVarint(len(offsets)) + b''.join(encodeVarint(offset) for offset in offsets))
+        f.write(encodeVarint(keyframeInterval) + encodeVarint(len(keyframeOffsets)) +
+                b''.join(encodeVarint(offset) for offset in keyframeOffsets))
+        f.write(FOOTER.pack(indexOffset))
+
+def isRecording(filename):
+    "Returns whether filename is a recording in this format (rather than a pickle)."
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+class RecordingReader:
+    """
+    Reads a recording one chunk at a time.  Iterating gives the moves from
+    the current position on as (agentIndex, action) pairs, the same as the
+    entries of Game.moveHistory, so a reader can be passed to replayGame.
+
+      reader = RecordingReader('recorded-game-1')
+      reader.layout, reader.numAgents, len(reader)
+      reader.seek(500)               # the next move read is move 500
+      for agentIndex, action in reader: ...
+      reader.restoreKeyframe(5000, state)
+    """
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        f = self.file
+        if f.read(len(MAGIC)) != MAGIC:
+            self.file.close()
+            raise RecordingFormatError('%s is not a recording' % filename)
+        version = readVarint(f)
+        if version not in (1, VERSION):
+            self.file.close()
+            raise RecordingFormatError('%s has format version %d, not %d' % (filename, version, VERSION))
+        self.version = version
+        self.numAgents = readVarint(f)
+        self.chunkSize = readVarint(f)
+        self.numMoves = readVarint(f)
+        self.layoutHash = f.read(20).hex()
+        self.compressedLayout = f.read(readVarint(f))
+        self._layout = None
+        self.dataStart = f.tell()
+        self._index = None
+        self.position = 0
+        self._chunk, self._chunkStart = [], 0
+
+    def getLayout(self):
+        "Returns the recorded Layout, checked against the recorded hash."
+        if self._layout is None:
+            import layout
+            text = zlib.decompress(self.compressedLayout).decode()
+            self._layout = layout.Layout(text.split('\n'))
+            if self._layout.getHash() != self.layoutHash:
+                raise RecordingFormatError('The recorded layout does not match its hash')
+        return self._layout
+    layout = property(getLayout)
+
+    def __len__(self):
+        return self.numMoves
+
+    def _chunkOffsets(self):
+        if self._index is None:
+            f = self.file
+            f.seek(-FOOTER.size, 2)
+            f.seek(FOOTER.unpack(f.read(FOOTER.size))[0])
+            self._index = [readVarint(f) for i in range(readVarint(f))]
+            # Version 1 recordings have no keyframes
+            self.keyframeInterval, self._keyframes = 0, []
+            if self.version >= 2:
+                self.keyframeInterval = readVarint(f)
+                self._keyframes = [readVarint(f) for i in range(readVarint(f))]
+        return self._index
+
+    def restoreKeyframe(self, moveIndex, state):
+        """
+        Sets a game's initial state to the latest keyframe at or before
+        moveIndex, and seeks to the move after it.  Returns the number of
+        moves the keyframe covers (0 if there is none, leaving the state
+        alone), from which the caller replays up to moveIndex.
+        """
+        self._chunkOffsets()
+        if not self.keyframeInterval:
+            self.seek(0)
+            return 0
+        keyframe = min(moveIndex // self.keyframeInterval, len(self._keyframes))
+        if keyframe > 0:
+            self.file.seek(self._keyframes[keyframe - 1])
+            unpackState(state.data, self.file.read(readVarint(self.file)))
+        self.seek(keyframe * self.keyframeInterval)
+        return keyframe * self.keyframeInterval
+
+    def seek(self, moveIndex):
+        "Makes moveIndex (0 for the first move) the next move to be read."
+        if not 0 <= moveIndex <= self.numMoves:
+            raise IndexError('Move %d is outside this recording of %d moves' % (moveIndex, self.numMoves))
+        chunk = moveIndex // self.chunkSize
+        if chunk < len(self._chunkOffsets()):
+            self.file.seek(self._index[chunk])
+            self._readChunk(chunk * self.chunkSize)
+        self.position = moveIndex
+
+    def tell(self):
+        return self.position
+
+    def _readChunk(self, start):
+        body = self.file.read(readVarint(self.file))
+        self._chunk, self._chunkStart = decodeChunk(body), start
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position >= self.numMoves:
+            raise StopIteration
+        offset = self.position - self._chunkStart
+        if not 0 <= offset < len(self._chunk):
+            # Seek first: restoreKeyframe may have moved the file since the last chunk
+            chunk = self.position // self.chunkSize
+            self.file.seek(self._chunkOffsets()[chunk])
+            self._readChunk(chunk * self.chunkSize)
+            offset = self.position - self._chunkStart
+        action = self._chunk[offset]
+        agentIndex = self.position % self.numAgents
+        self.position += 1
+        return agentIndex, action
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def convertPickle(pickleFile, outFile):
+    "Converts a recording pickled by older versions of pacman.py -r."
+    import pickle
+    with open(pickleFile, 'rb') as f:
+        recorded = pickle.load(f)
+    writeRecording(outFile, recorded['layout'], recorded['actions'])
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser('USAGE: python recording.py (--convert OLDFILE [-o NEWFILE] | --info FILE)')
+    parser.add_option('--convert', dest='convert', help='a pickled recording to convert')
+    parser.add_option('-o', '--output', dest='output', help='where to write the converted recording (default: OLDFILE.rec)')
+    parser.add_option('--info', dest='info', help='describe a recording')
+    options, otherjunk = parser.parse_args()
+    if options.convert:
+        output = options.output or options.convert + '.rec'
+        convertPickle(options.convert, output)
+        print('Wrote %s' % output)
+    elif options.info:
+        with RecordingReader(options.info) as reader:
+            print('%s: %d moves by %d agents on layout %s' % (options.info, len(reader), reader.numAgents, reader.layoutHash))
+            print(reader.layout)
+    else:
+        parser.error('Nothing to do; see --help')
@@ -18,6 +18,9 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+import time
+import json
+import threading
 
 class SearchProblem:
     """
@@ -62,6 +65,419 @@ class SearchProblem:
         util.raiseNotDefined()
 
 
+class SearchObserver:
+    """
+    Receives events from the search functions in this file.  Every hook is a
+    no-op here; subclass it, override the hooks you care about and pass the
+    instance as the 'observer' argument of a search function.
+
+    When no observer is given the search functions skip all of this
+    bookkeeping, so leaving it out costs nothing.
+    """
+
+    def searchStarted(self, problem, algorithm):
+        "Called once before the start state is pushed."
+        pass
+
+    def nodeExpanded(self, state):
+        "Called when getSuccessors is called on state (which may be a re-expansion)."
+        pass
+
+    def nodeGenerated(self, state):
+        "Called for every successor returned by getSuccessors."
+        pass
+
+    def duplicateSkipped(self, state):
+        """
+        Called when an entry taken off the frontier is dropped because its
+        state was already expanded (or, in anytime searches, has since been
+        reached more cheaply).
+        """
+        pass
+
+    def frontierSize(self, size):
+        "Called after every push with the current size of the frontier."
+        pass
+
+    def heuristicEvaluated(self, state, value):
+        "Called after every call to the heuristic."
+        pass
+
+    def phaseTime(self, phase, seconds):
+        "Called with the time spent in one call to 'goal', 'successors' or 'heuristic'."
+        pass
+
+    def solutionFound(self, path, cost, weight):
+        "Called by anytime searches each time they improve their solution."
+        pass
+
+    def searchFinished(self, path):
+        "Called once with the path the search function is about to return."
+        pass
+
+class SearchStatistics(SearchObserver):
+    """
+    A SearchObserver that counts what a search did, so that algorithms and
+    heuristics can be compared without touching their code:
+
+      stats = SearchStatistics()
+      path = aStarSearch(problem, heuristic, observer=stats)
+      stats.writeJSON('astar.json')
+    """
+
+    PHASES = ('goal', 'successors', 'heuristic')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        "Clears the counts, so that the same object can observe another search."
+        self.algorithm = None
+        self.problem = None
+        self.expanded = 0
+        self.reexpanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.peakFrontier = 0
+        self.heuristicEvaluations = 0
+        self.phaseTimes = dict((phase, 0.0) for phase in self.PHASES)
+        self.totalTime = 0.0
+        self.pathLength = None
+        self.solutions = []
+        self._expandedStates = set()
+        self._startTime = None
+
+    def searchStarted(self, problem, algorithm):
+        self.reset()
+        self.algorithm = algorithm
+        self.problem = problem.__class__.__name__
+        self._startTime = time.perf_counter()
+
+    def nodeExpanded(self, state):
+        self.expanded += 1
+        if state in self._expandedStates:
+            self.reexpanded += 1
+        else:
+            self._expandedStates.add(state)
+
+    def nodeGenerated(self, state):
+        self.generated += 1
+
+    def duplicateSkipped(self, state):
+        self.duplicates += 1
+
+    def frontierSize(self, size):
+        if size > self.peakFrontier:
+            self.peakFrontier = size
+
+    def heuristicEvaluated(self, state, value):
+        self.heuristicEvaluations += 1
+
+    def phaseTime(self, phase, seconds):
+        self.phaseTimes[phase] += seconds
+
+    def solutionFound(self, path, cost, weight):
+        self.solutions.append({'cost': cost, 'weight': weight, 'expanded': self.expanded,
+                               'time': time.perf_counter() - self._startTime})
+
+    def searchFinished(self, path):
+        self.totalTime = time.perf_counter() - self._startTime
+        self.pathLength = len(path)
+        self._expandedStates = set()
+
+    def asDict(self):
+        "Returns the statistics as a dictionary of plain values."
+        phaseTimes = dict(self.phaseTimes)
+        phaseTimes['frontier'] = max(0.0, self.totalTime - sum(self.phaseTimes.values()))
+        return {'algorithm': self.algorithm,
+                'problem': self.problem,
+                'expanded': self.expanded,
+                'reexpanded': self.reexpanded,
+                'generated': self.generated,
+                'duplicates': self.duplicates,
+                'peakFrontier': self.peakFrontier,
+                'heuristicEvaluations': self.heuristicEvaluations,
+                'phaseTimes': phaseTimes,
+                'totalTime': self.totalTime,
+                'pathLength': self.pathLength,
+                'solutions': self.solutions}
+
+    def toJSON(self):
+        return json.dumps(self.asDict(), indent=2, sort_keys=True)
+
+    def writeJSON(self, filename):
+        f = open(filename, 'w')
+        try: f.write(self.toJSON() + '\n')
+        finally: f.close()
+
+    def __str__(self):
+        return ('%s: %d expanded (%d re-expanded), %d generated, %d duplicates, '
+                'peak frontier %d, %d heuristic calls, %.3f seconds' %
+                (self.algorithm, self.expanded, self.reexpanded, self.generated,
+                 self.duplicates, self.peakFrontier, self.heuristicEvaluations,
+                 self.totalTime))
+
+class SearchProgress(SearchObserver):
+    """
+    A SearchObserver that keeps just the number of nodes expanded and the
+    latest frontier size, for another thread (say a GUI) to read while the
+    search runs.  See BackgroundSearch.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.frontier = 0
+
+    def nodeExpanded(self, state):
+        self.expanded += 1
+
+    def frontierSize(self, size):
+        self.frontier = size
+
+class ObserverGroup(SearchObserver):
+    "Passes every event on to each of several observers, in order."
+
+    def __init__(self, observers):
+        self.observers = list(observers)
+
+    def searchStarted(self, problem, algorithm):
+        for observer in self.observers: observer.searchStarted(problem, algorithm)
+
+    def nodeExpanded(self, state):
+        for observer in self.observers: observer.nodeExpanded(state)
+
+    def nodeGenerated(self, state):
+        for observer in self.observers: observer.nodeGenerated(state)
+
+    def duplicateSkipped(self, state):
+        for observer in self.observers: observer.duplicateSkipped(state)
+
+    def frontierSize(self, size):
+        for observer in self.observers: observer.frontierSize(size)
+
+    def heuristicEvaluated(self, state, value):
+        for observer in self.observers: observer.heuristicEvaluated(state, value)
+
+    def phaseTime(self, phase, seconds):
+        for observer in self.observers: observer.phaseTime(phase, seconds)
+
+    def solutionFound(self, path, cost, weight):
+        for observer in self.observers: observer.solutionFound(path, cost, weight)
+
+    def searchFinished(self, path):
+        for observer in self.observers: observer.searchFinished(path)
+
+class VisitRecorder:
+    """
+    Records the states a search problem expands, in the order it first
+    expands them, and shows them to the registered expansion observers when
+    the goal is reached.  Problems get one from visitRecorder(), which
+    returns None when nothing is registered, so that recording costs
+    nothing unless something will draw it.
+
+      limit:       keep at most limit states.  When the record fills up,
+                   every other state in it is dropped and from then on only
+                   every other new state is kept (then every fourth, ...),
+                   so it stays an even sample of the whole search
+      sampleEvery: keep only every sampleEvery-th new state from the start
+
+    With a limit, a state expanded again may be recorded twice; displays
+    draw the first.
+    """
+
+    def __init__(self, observers, limit=None, sampleEvery=1):
+        self.observers = observers
+        self.limit = limit
+        self.stride = sampleEvery
+        self.states = []
+        self.seen = set() if limit is None else None
+        self.count = 0
+
+    def record(self, state):
+        seen = self.seen
+        if seen is not None:
+            if state in seen: return
+            seen.add(state)
+        self.count += 1
+        if self.count % self.stride: return
+        states = self.states
+        states.append(state)
+        if self.limit is not None and len(states) >= self.limit:
+            # In place: observers streaming the list keep seeing it
+            states[:] = states[1::2]
+            self.stride *= 2
+
+    def goalReached(self, state):
+        self.states.append(state)
+        for observer in self.observers:
+            observer.drawExpandedCells(self.states)
+
+_expansionObservers = []
+_visitRecording = {'limit': None, 'sampleEvery': 1}
+
+def addExpansionObserver(observer):
+    """
+    Registers an observer of the states search problems expand: anything
+    with a drawExpandedCells(states) method, such as a graphics display.
+    Problems made after this record their expansions (see VisitRecorder).
+    """
+    if observer not in _expansionObservers:
+        _expansionObservers.append(observer)
+
+def removeExpansionObserver(observer):
+    if observer in _expansionObservers:
+        _expansionObservers.remove(observer)
+
+def expansionObservers():
+    return list(_expansionObservers)
+
+def setVisitRecording(limit=None, sampleEvery=1):
+    "Bounds or samples the records of problems made from now on; see VisitRecorder."
+    _visitRecording['limit'] = limit
+    _visitRecording['sampleEvery'] = sampleEvery
+
+def visitRecorder():
+    "Returns a VisitRecorder for a new problem, or None if no one is observing expansions."
+    if not _expansionObservers: return None
+    return VisitRecorder(list(_expansionObservers), **_visitRecording)
+
+class _ObservedProblem:
+    """
+    Wraps a SearchProblem so that goal tests and successor calls are reported
+    to an observer.  Everything else, including attribute writes, goes
+    straight through to the wrapped problem.
+    """
+
+    def __init__(self, problem, observer):
+        self.__dict__['_problem'] = problem
+        self.__dict__['_observer'] = observer
+
+    def __getattr__(self, name):
+        return getattr(self._problem, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._problem, name, value)
+
+    def isGoalState(self, state):
+        start = time.perf_counter()
+        isGoal = self._problem.isGoalState(state)
+        self._observer.phaseTime('goal', time.perf_counter() - start)
+        return isGoal
+
+    def getSuccessors(self, state):
+        start = time.perf_counter()
+        successors = self._problem.getSuccessors(state)
+        self._observer.phaseTime('successors', time.perf_counter() - start)
+        self._observer.nodeExpanded(state)
+        for successor in successors:
+            self._observer.nodeGenerated(successor[0])
+        return successors
+
+def _observedHeuristic(heuristic, observer):
+    "Wraps a heuristic so that its calls and their cost are reported to observer."
+    def observed(state, problem=None):
+        start = time.perf_counter()
+        value = heuristic(state, problem)
+        observer.phaseTime('heuristic', time.perf_counter() - start)
+        observer.heuristicEvaluated(state, value)
+        return value
+    return observed
+
+def _startObserving(problem, observer, algorithm):
+    "Returns the problem the search should run on when observer is attached."
+    if observer is None:
+        return problem
+    observer.searchStarted(problem, algorithm)
+    return _ObservedProblem(problem, observer)
+
+def _finishObserving(path, observer):
+    if observer is not None:
+        observer.searchFinished(path)
+    return path
+
+class SearchResult(list):
+    """
+    What a search function returns when it is given a util.Budget.  It is the
+    path itself (a list of actions), so it can be used like any other path,
+    with attributes describing how the search ended:
+
+      solved:     True if the path reaches a goal state
+      reason:     None if the search ran to completion, otherwise why the
+                  budget ran out: 'time', 'nodes' or 'cancelled'
+      nodes:      number of states taken off the frontier
+      elapsed:    seconds spent searching
+      statistics: the observer passed to the search function, if any
+
+    When the budget runs out before a goal is reached the path is a partial
+    plan: it leads to the expanded state with the lowest heuristic value, or
+    for uninformed searches to the state expanded last.
+    """
+    def __init__(self, path, solved, reason, nodes, elapsed, statistics=None):
+        list.__init__(self, path)
+        self.solved = solved
+        self.reason = reason
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.statistics = statistics
+
+def _finishSearch(path, solved, observer, budget, budgetStart):
+    """
+    Returns path as a search function's result: a plain list, or a
+    SearchResult if the search ran under a budget.
+    """
+    _finishObserving(path, observer)
+    if budget is None:
+        return path
+    return SearchResult(path, solved, budget.reason, budget.nodes - budgetStart[0],
+                        time.perf_counter() - budgetStart[1], observer)
+
+def _startBudget(budget):
+    "Records where a budget stood when a search started."
+    if budget is None:
+        return None
+    return (budget.nodes, time.perf_counter())
+
+class BackgroundSearch:
+    """
+    Runs a search function in a worker thread, so that a GUI can keep
+    handling events and drawing while it runs:
+
+      search = BackgroundSearch(aStarSearch, problem, heuristic=h)
+      while not search.done():
+          ... show search.progress.expanded and search.progress.frontier,
+              call search.cancel() if asked to ...
+      path = search.result
+
+    The result is a SearchResult (the search runs under a util.Budget so it
+    can be cancelled), or None if the search raised, in which case error
+    holds the exception.  The search function must take observer and budget
+    arguments, as the ones in this file do.
+    """
+
+    def __init__(self, function, problem, **options):
+        self.budget = util.Budget()
+        self.progress = SearchProgress()
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(function, problem, options), daemon=True)
+        self.thread.start()
+
+    def _run(self, function, problem, options):
+        try:
+            self.result = function(problem, observer=self.progress, budget=self.budget, **options)
+        except Exception as e:
+            self.error = e
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    def cancel(self):
+        "Stops the search at its next expansion; result is then an unsolved SearchResult."
+        self.budget.cancel()
+
+    def elapsed(self):
+        return self.budget.elapsed()
+
 def tinyMazeSearch(problem):
     """
     Returns a sequence of moves that solves tinyMaze.  For any other maze, the
@@ -72,7 +488,7 @@ def tinyMazeSearch(problem):
     w = Directions.WEST
     return  [s, s, w, s, w, w, s, w]
 
-def depthFirstSearch(problem):
+def depthFirstSearch(problem, observer=None, budget=None):
     """
     Search the deepest nodes in the search tree first.
 
@@ -85,11 +501,19 @@ def depthFirstSearch(problem):
     print("Start:", problem.getStartState())
     print("Is the start a goal?", problem.isGoalState(problem.getStartState()))
     print("Start's successors:", problem.getSuccessors(problem.getStartState()))
+
+    An optional SearchObserver receives expansion, frontier and timing events.
+    An optional util.Budget is charged once per expansion; if it runs out the
+    search stops and returns a SearchResult (see above).  All the search
+    functions below take the same two arguments.
     """
 
     from util import Stack
     stack = Stack()
     visited = set()
+    problem = _startObserving(problem, observer, 'depthFirstSearch')
+    budgetStart = _startBudget(budget)
+    partial = []
 
     stack.push((problem.getStartState(), []))
 
@@ -97,22 +521,31 @@ def depthFirstSearch(problem):
         state, path = stack.pop()
 
         if state in visited:
+            if observer is not None: observer.duplicateSkipped(state)
             continue
 
+        if budget is not None and not budget.charge():
+            return _finishSearch(partial, False, observer, budget, budgetStart)
+
         visited.add(state)
 
         if problem.isGoalState(state):
-            return path
+            return _finishSearch(path, True, observer, budget, budgetStart)
+        partial = path
 
         for successor, action, stepCost in problem.getSuccessors(state):
             if successor not in visited:
                 stack.push((successor, path + [action]))
-    return []
+                if observer is not None: observer.frontierSize(len(stack))
+    return _finishSearch([], False, observer, budget, budgetStart)
 
-def breadthFirstSearch(problem):
+def breadthFirstSearch(problem, observer=None, budget=None):
     from util import Queue
     queue = Queue()
     visited = set()
+    problem = _startObserving(problem, observer, 'breadthFirstSearch')
+    budgetStart = _startBudget(budget)
+    partial = []
 
     queue.push((problem.getStartState(), []))
 
@@ -120,23 +553,32 @@ def breadthFirstSearch(problem):
         state, path = queue.pop()
 
         if state in visited:
+            if observer is not None: observer.duplicateSkipped(state)
             continue
 
+        if budget is not None and not budget.charge():
+            return _finishSearch(partial, False, observer, budget, budgetStart)
+
         visited.add(state)
 
         if problem.isGoalState(state):
-            return path
+            return _finishSearch(path, True, observer, budget, budgetStart)
+        partial = path
 
         for successor, action, stepCost in problem.getSuccessors(state):
             if successor not in visited:
                 queue.push((successor, path + [action]))
-    return []
+                if observer is not None: observer.frontierSize(len(queue))
+    return _finishSearch([], False, observer, budget, budgetStart)
 
-def uniformCostSearch(problem):
+def uniformCostSearch(problem, observer=None, budget=None):
     from util import PriorityQueue
 
     pq = PriorityQueue()
     visited = set()
+    problem = _startObserving(problem, observer, 'uniformCostSearch')
+    budgetStart = _startBudget(budget)
+    partial = []
 
     pq.push((problem.getStartState(), [], 0), 0)
 
@@ -144,18 +586,24 @@ def uniformCostSearch(problem):
         state, path, cost = pq.pop()
 
         if state in visited:
+            if observer is not None: observer.duplicateSkipped(state)
             continue
 
+        if budget is not None and not budget.charge():
+            return _finishSearch(partial, False, observer, budget, budgetStart)
+
         visited.add(state)
 
         if problem.isGoalState(state):
-            return path
+            return _finishSearch(path, True, observer, budget, budgetStart)
+        partial = path
 
         for successor, action, stepCost in problem.getSuccessors(state):
             if successor not in visited:
                 newCost = cost + stepCost
                 pq.push((successor, path + [action], newCost), newCost)
-    return []
+                if observer is not None: observer.frontierSize(len(pq))
+    return _finishSearch([], False, observer, budget, budgetStart)
 
 def nullHeuristic(state, problem=None):
     """
@@ -164,36 +612,327 @@ def nullHeuristic(state, problem=None):
     """
     return 0
 
-def aStarSearch(problem, heuristic=nullHeuristic):
+class MemoizedHeuristic:
+    """
+    Wraps a heuristic so that its value for each state is computed once and
+    then looked up.  The cache is a util.LRUCache keyed on the state (so
+    states must be hashable, as they already are for graph search) and holds
+    at most maxSize values.  It is emptied whenever the wrapper is called with
+    a different problem, since heuristic values depend on the problem.
+
+      heuristic = MemoizedHeuristic(foodHeuristic, 100000)
+      path = aStarSearch(problem, heuristic)
+      print(heuristic.cache)      # hits, misses and evictions
+    """
+    DEFAULT_SIZE = 100000
+
+    def __init__(self, heuristic, maxSize=DEFAULT_SIZE):
+        self.heuristic = heuristic
+        self.cache = util.LRUCache(maxSize)
+        self.problem = None
+
+    def __call__(self, state, problem=None):
+        if problem is not self.problem:
+            self.cache.clear()
+            self.problem = problem
+        value = self.cache.get(state)
+        if value is None:
+            value = self.heuristic(state, problem)
+            self.cache.put(state, value)
+        return value
+
+def aStarSearch(problem, heuristic=nullHeuristic, observer=None, budget=None):
     from util import PriorityQueue
 
     pq = PriorityQueue()
     visited = set()
+    problem = _startObserving(problem, observer, 'aStarSearch')
+    if observer is not None:
+        heuristic = _observedHeuristic(heuristic, observer)
+    budgetStart = _startBudget(budget)
+    partial, partialH = [], float('inf')
 
     start = problem.getStartState()
-    pq.push((start, [], 0), heuristic(start, problem))
+    h = heuristic(start, problem)
+    pq.push((start, [], 0, h), h)
 
     while not pq.isEmpty():
-        state, path, cost = pq.pop()
+        state, path, cost, h = pq.pop()
 
         if state in visited:
+            if observer is not None: observer.duplicateSkipped(state)
             continue
 
+        if budget is not None and not budget.charge():
+            return _finishSearch(partial, False, observer, budget, budgetStart)
+
         visited.add(state)
 
         if problem.isGoalState(state):
-            return path
+            return _finishSearch(path, True, observer, budget, budgetStart)
+        if h <= partialH:
+            partial, partialH = path, h
 
         for successor, action, stepCost in problem.getSuccessors(state):
             if successor not in visited:
                 newCost = cost + stepCost
-                priority = newCost + heuristic(successor, problem)
-                pq.push((successor, path + [action], newCost), priority)
-    return []
+                h = heuristic(successor, problem)
+                pq.push((successor, path + [action], newCost, h), newCost + h)
+                if observer is not None: observer.frontierSize(len(pq))
+    return _finishSearch([], False, observer, budget, budgetStart)
 
+def anytimeAStarSearch(problem, heuristic=nullHeuristic, weight=3.0, weightStep=0.5,
+                       observer=None, budget=None):
+    """
+    Anytime Repairing A* (ARA*, Likhachev, Gordon and Thrun 2003).
+
+    Starts with a weighted A* search using f = g + weight * h, which finds a
+    solution costing at most weight times the optimum, usually after far
+    fewer expansions than A*.  The weight is then lowered by weightStep and
+    the search is repaired rather than restarted: states whose cost improved
+    after they were expanded are kept aside and re-queued for the next pass.
+    With weight 1 the last pass is plain A*, so if it completes the returned
+    path is optimal (given an admissible heuristic).
+
+    Anytime search is meant to be run under a budget: when it runs out, the
+    best solution found so far is returned as a solved SearchResult, or a
+    partial plan if no goal was reached yet.  Each improved path is also
+    reported to the observer's solutionFound hook as soon as it is found.
+    """
+    import heapq
+    problem = _startObserving(problem, observer, 'anytimeAStarSearch')
+    if observer is not None:
+        heuristic = _observedHeuristic(heuristic, observer)
+    budgetStart = _startBudget(budget)
+    weight = max(1.0, float(weight))
+
+    start = problem.getStartState()
+    hValues = {}
+    def h(state):
+        if state not in hValues:
+            hValues[state] = heuristic(state, problem)
+        return hValues[state]
+
+    g = {start: 0}
+    parent = {start: None}
+    closed, incons = set(), set()
+    heap, counter = [], [0]
+    def push(state):
+        heapq.heappush(heap, (g[state] + weight * h(state), counter[0], state, g[state]))
+        counter[0] += 1
+        if observer is not None: observer.frontierSize(len(heap))
+    push(start)
+
+    bestGoal, bestCost = None, float('inf')
+    bestPath, bestPathCost = [], float('inf')
+    closestState = start
+
+    def improvePath():
+        "Expands states until no open state can lead to a better goal.  Returns False if out of budget."
+        nonlocal bestGoal, bestCost, closestState
+        while heap and heap[0][0] < bestCost:
+            f, count, state, stateG = heapq.heappop(heap)
+            if state in closed or stateG != g[state]:
+                # A stale entry; the state was re-pushed with a lower cost
+                if observer is not None: observer.duplicateSkipped(state)
+                continue
+            if budget is not None and not budget.charge():
+                return False
+            closed.add(state)
+            if problem.isGoalState(state):
+                if g[state] < bestCost:
+                    bestGoal, bestCost = state, g[state]
+                continue
+            if h(state) <= h(closestState):
+                closestState = state
+            for successor, action, stepCost in problem.getSuccessors(state):
+                newCost = g[state] + stepCost
+                if newCost < g.get(successor, float('inf')):
+                    g[successor] = newCost
+                    parent[successor] = (state, action)
+                    if successor in closed:
+                        incons.add(successor)
+                    else:
+                        push(successor)
+        return True
+
+    def extractPath(state):
+        path = []
+        while parent[state] is not None:
+            state, action = parent[state]
+            path.append(action)
+        path.reverse()
+        return path
+
+    while True:
+        completed = improvePath()
+        if bestCost < bestPathCost:
+            bestPath, bestPathCost = extractPath(bestGoal), bestCost
+            if observer is not None: observer.solutionFound(bestPath, bestCost, weight)
+        if not completed or weight <= 1.0:
+            break
+        # Stop if no open or inconsistent state can beat the current solution
+        pending = [entry[2] for entry in heap if entry[2] not in closed and entry[3] == g[entry[2]]]
+        pending.extend(incons)
+        if not pending or bestCost <= min(g[s] + h(s) for s in pending):
+            break
+        # Lower the weight and repair: re-queue open and inconsistent states
+        weight = max(1.0, weight - weightStep)
+        heap = []
+        for state in set(pending):
+            push(state)
+        closed, incons = set(), set()
+
+    if bestGoal is None:
+        return _finishSearch(extractPath(closestState), False, observer, budget, budgetStart)
+    return _finishSearch(bestPath, True, observer, budget, budgetStart)
+
+class DStarLite:
+    """
+    Incremental planner (D* Lite, Koenig and Likhachev 2002) for a sequence
+    of related searches over one state space.  It searches backwards from a
+    set of goal states, so it finds a cheapest path from the start to the
+    closest goal, and keeps its cost-to-goal estimates between plans.  After
+    the start moves, goals are added or removed, or step costs change, the
+    next plan only repairs the part of the search that is affected.
+
+      problem:   supplies getStartState and getSuccessors; isGoalState is
+                 not used, the goals are given explicitly
+      goals:     the initial goal states
+      heuristic: heuristic(a, b) estimates the cost between two states; it
+                 must be consistent (e.g. manhattanDistance for unit costs)
+
+    Moves are assumed to be reversible, as in the position and puzzle
+    problems: the predecessors of a state are its successors.
+    """
+    def __init__(self, problem, goals, heuristic=lambda a, b: 0):
+        import heapq
+        self._heapq = heapq
+        self.problem = problem
+        self.heuristic = heuristic
+        self.start = self.lastStart = problem.getStartState()
+        self.goals = set(goals)
+        self.km = 0
+        self.g, self.rhs = {}, {}
+        self.heap, self.openKeys, self.counter = [], {}, 0
+        self.edges = {}
+        self.expanded = 0
+        for goal in self.goals:
+            self.rhs[goal] = 0
+            self._push(goal)
+
+    def _successors(self, state):
+        "Returns {successor: (action, cost)}, cached until the costs change."
+        if state not in self.edges:
+            self.edges[state] = dict((s, (a, c)) for s, a, c in self.problem.getSuccessors(state))
+        return self.edges[state]
+
+    def _key(self, state):
+        value = min(self.g.get(state, float('inf')), self.rhs.get(state, float('inf')))
+        return (value + self.heuristic(self.start, state) + self.km, value)
+
+    def _push(self, state):
+        key = self._key(state)
+        self.openKeys[state] = key
+        self._heapq.heappush(self.heap, (key, self.counter, state))
+        self.counter += 1
+
+    def _top(self):
+        "Drops stale heap entries and returns the top one, or None."
+        while self.heap:
+            key, count, state = self.heap[0]
+            if self.openKeys.get(state) == key:
+                return self.heap[0]
+            self._heapq.heappop(self.heap)
+        return None
+
+    def _updateState(self, state):
+        if state not in self.goals:
+            successors = self._successors(state)
+            self.rhs[state] = min([cost + self.g.get(s, float('inf')) for s, (a, cost) in successors.items()] or [float('inf')])
+        self.openKeys.pop(state, None)
+        if self.g.get(state, float('inf')) != self.rhs.get(state, float('inf')):
+            self._push(state)
+
+    def computeShortestPath(self, budget=None):
+        """
+        Brings the estimates up to date for the current start.  Returns False
+        if the budget ran out first; computing again later continues from there.
+        """
+        inf = float('inf')
+        while True:
+            top = self._top()
+            start = self.start
+            if top is None or (top[0] >= self._key(start) and self.rhs.get(start, inf) == self.g.get(start, inf)):
+                return True
+            if budget is not None and not budget.charge():
+                return False
+            oldKey, count, state = self._heapq.heappop(self.heap)
+            newKey = self._key(state)
+            if oldKey < newKey:
+                self._push(state)
+                continue
+            del self.openKeys[state]
+            self.expanded += 1
+            if self.g.get(state, inf) > self.rhs.get(state, inf):
+                self.g[state] = self.rhs[state]
+                for predecessor in self._successors(state):
+                    self._updateState(predecessor)
+            else:
+                self.g[state] = inf
+                self._updateState(state)
+                for predecessor in self._successors(state):
+                    self._updateState(predecessor)
+
+    def getPath(self, budget=None):
+        """
+        Returns a cheapest list of actions from the start to the closest goal,
+        or None if no goal is reachable (or the budget ran out).
+        """
+        if not self.computeShortestPath(budget):
+            return None
+        inf = float('inf')
+        state, path = self.start, []
+        if self.g.get(state, inf) == inf:
+            return None
+        while state not in self.goals:
+            successors = self._successors(state)
+            state, (action, cost) = min(successors.items(), key=lambda item: item[1][1] + self.g.get(item[0], inf))
+            path.append(action)
+        return path
+
+    def moveStart(self, state):
+        "Plans from state from now on, e.g. after following part of a plan."
+        self.km += self.heuristic(self.lastStart, state)
+        self.start = self.lastStart = state
+
+    def addGoal(self, state):
+        self.goals.add(state)
+        self.rhs[state] = 0
+        self._updateState(state)
+
+    def removeGoal(self, state):
+        "Stops treating state as a goal, e.g. once that food has been eaten."
+        if state in self.goals:
+            self.goals.remove(state)
+            self._updateState(state)
+
+    def updateCosts(self, states):
+        """
+        Tells the planner that the costs of the steps into these states have
+        changed, e.g. because the problem's cost function now penalizes them.
+        """
+        changed = set()
+        for state in states:
+            for neighbor in self._successors(state):
+                changed.add(neighbor)
+        for state in changed:
+            self.edges.pop(state, None)
+            self._updateState(state)
 
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+arastar = anytimeAStarSearch
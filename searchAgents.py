@@ -39,7 +39,11 @@ from game import Agent
 from game import Actions
 import util
 import time
+import itertools
 import search
+import distanceCalculator
+import foodTours
+import sharedLayouts
 
 class GoWestAgent(Agent):
     "An agent that goes West until it can't."
@@ -69,20 +73,60 @@ class SearchAgent(Agent):
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
 
+    Passing stats collects search.SearchStatistics for the run; use stats=FILE
+    to also write them to FILE as JSON, e.g. -a fn=astar,stats=astar.json
+
+    Passing memo=N caches up to N heuristic values (search.MemoizedHeuristic),
+    or memo=default search.MemoizedHeuristic.DEFAULT_SIZE of them,
+    e.g. -a fn=astar,prob=FoodSearchProblem,heuristic=foodHeuristic,memo=100000
+
+    Passing timeLimit (seconds) and/or maxNodes (expansions) runs the search
+    under a util.Budget.  If it runs out, the best plan found so far is
+    followed: a partial plan for the ordinary searches, or the best complete
+    plan for anytime searches (anytimeAStarSearch or arastar, which also
+    accept a starting weight),
+    e.g. -a fn=arastar,prob=FoodSearchProblem,heuristic=foodHeuristic,timeLimit=5
+
+    Passing live draws the expanded cells while the search runs rather than
+    when it reaches the goal (graphics display only),
+    e.g. -a fn=bfs,live=1
+
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    # Game gives agents that set this a Budget within the startup time limit
+    # (as self.budget) instead of interrupting them with a signal, so only
+    # agents whose search honours the budget may set it
+    usesBudget = False
+
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', stats=None, memo=None,
+                 weight=None, timeLimit=None, maxNodes=None, live=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
         if fn not in dir(search):
             raise AttributeError(fn + ' is not a search function in search.py.')
         func = getattr(search, fn)
+        options = {}
+        if stats is not None:
+            self.statistics = search.SearchStatistics()
+            self.statisticsFile = stats if isinstance(stats, str) else None
+            options['observer'] = self.statistics
+        # The display does not exist yet; registerInitialState asks it for an observer
+        self.live = live is not None and 'observer' in func.__code__.co_varnames
+        if weight is not None:
+            if 'weight' not in func.__code__.co_varnames:
+                raise AttributeError('%s does not take a weight argument.' % fn)
+            options['weight'] = float(weight)
+        self.timeLimit = None if timeLimit is None else float(timeLimit)
+        self.maxNodes = None if maxNodes is None else int(maxNodes)
+        self.takesBudget = self.usesBudget = 'budget' in func.__code__.co_varnames
+        if not self.takesBudget and (self.timeLimit is not None or self.maxNodes is not None):
+            raise AttributeError('%s does not take a budget.' % fn)
         if 'heuristic' not in func.__code__.co_varnames:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = lambda x, **extra: func(x, **dict(options, **extra))
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -90,9 +134,12 @@ class SearchAgent(Agent):
                 heur = getattr(search, heuristic)
             else:
                 raise AttributeError(heuristic + ' is not a function in searchAgents.py or search.py.')
+            if memo is not None:
+                size = search.MemoizedHeuristic.DEFAULT_SIZE if memo == 'default' else int(memo)
+                heur = self.memoizedHeuristic = search.MemoizedHeuristic(heur, size)
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x, **extra: func(x, heuristic=heur, **dict(options, **extra))
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -112,10 +159,67 @@ class SearchAgent(Agent):
         if self.searchFunction == None: raise Exception("No search function provided for SearchAgent")
         starttime = time.time()
         problem = self.searchType(state) # Makes a new search problem
-        self.actions  = self.searchFunction(problem) # Find a path
+        budget = self._searchBudget()
+        extra = {} if budget is None else {'budget': budget}
+        observer = self._liveObserver()
+        if observer is not None: extra['observer'] = observer
+        self.actions  = self.searchFunction(problem, **extra) # Find a path
         totalCost = problem.getCostOfActions(self.actions)
-        print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
+        if getattr(self.actions, 'solved', True):
+            print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
+        else:
+            print('Search stopped (%s) after %.1f seconds; following a partial plan of cost %d' %
+                  (self.actions.reason, time.time() - starttime, totalCost))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if 'memoizedHeuristic' in dir(self): print('Heuristic cache: %s' % self.memoizedHeuristic.cache)
+        if 'statistics' in dir(self):
+            print('Search statistics: %s' % self.statistics)
+            if self.statisticsFile: self.statistics.writeJSON(self.statisticsFile)
+        # The game's budget was for this call only
+        self.budget = None
+
+    def _liveObserver(self):
+        """
+        Returns an observer drawing the search on the display if live was
+        asked for and the display can, along with any statistics observer.
+        """
+        if not getattr(self, 'live', False): return None
+        displays = [o for o in search.expansionObservers() if hasattr(o, 'expandedCellsObserver')]
+        if not displays: return None
+        display = displays[0]
+        if 'statistics' in dir(self):
+            return search.ObserverGroup([self.statistics, display.expandedCellsObserver()])
+        return display.expandedCellsObserver()
+
+    def _searchBudget(self, scale=1):
+        """
+        Returns the budget to search under: the limits given on the command
+        line (times scale), within whatever budget the game gave this agent,
+        or None.
+        """
+        # Subclasses that set searchFunction directly skip __init__'s options
+        if not getattr(self, 'takesBudget', False): return None
+        parent = getattr(self, 'budget', None)
+        timeLimit, maxNodes = getattr(self, 'timeLimit', None), getattr(self, 'maxNodes', None)
+        if timeLimit is None and maxNodes is None: return parent
+        return util.Budget(timeLimit and timeLimit * scale, maxNodes and maxNodes * scale, parent)
+
+    def replan(self, state):
+        """
+        Searches again from state once a partial plan has been followed to
+        its end.  Partial plans need not lead closer to the goal, so every
+        replan gets twice the limits of the one before; the search then
+        finishes eventually, unless the game's own budget runs out first.
+        """
+        while True:
+            self.replanScale = getattr(self, 'replanScale', 1) * 2
+            budget = self._searchBudget(self.replanScale)
+            self.actions = self.searchFunction(self.searchType(state), budget=budget)
+            if len(self.actions) > 0 or getattr(self.actions, 'solved', True): break
+            if budget is self.budget or (budget.parent is not None and budget.parent.exhausted()):
+                raise Exception('Search stopped (%s) before finding a single move' % budget.reason)
+        self.budget = None
+        self.actionIndex = 0
 
     def getAction(self, state):
         """
@@ -126,6 +230,9 @@ class SearchAgent(Agent):
         state: a GameState object (pacman.py)
         """
         if 'actionIndex' not in dir(self): self.actionIndex = 0
+        if self.actionIndex >= len(self.actions) and not getattr(self.actions, 'solved', True):
+            # The budget ran out before the goal; go on from here
+            self.replan(state)
         i = self.actionIndex
         self.actionIndex += 1
         if i < len(self.actions):
@@ -144,6 +251,9 @@ class PositionSearchProblem(search.SearchProblem):
     Note: this search problem is fully specified; you should NOT change it.
     """
 
+    # Set by __init__ when something observes expansions (see search.addExpansionObserver)
+    _recorder = None
+
     def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, visualize=True):
         """
         Stores the start and goal.
@@ -163,6 +273,7 @@ class PositionSearchProblem(search.SearchProblem):
 
         # For display purposes
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+        self._recorder = search.visitRecorder() if visualize else None
 
     def getStartState(self):
         return self.startState
@@ -171,12 +282,8 @@ class PositionSearchProblem(search.SearchProblem):
         isGoal = state == self.goal
 
         # For display purposes only
-        if isGoal and self.visualize:
-            self._visitedlist.append(state)
-            import __main__
-            if '_display' in dir(__main__):
-                if 'drawExpandedCells' in dir(__main__._display): #@UndefinedVariable
-                    __main__._display.drawExpandedCells(self._visitedlist) #@UndefinedVariable
+        if isGoal and self._recorder is not None:
+            self._recorder.goalReached(state)
 
         return isGoal
 
@@ -207,6 +314,8 @@ class PositionSearchProblem(search.SearchProblem):
         if state not in self._visited:
             self._visited[state] = True
             self._visitedlist.append(state)
+        if self._recorder is not None:
+            self._recorder.record(state)
 
         return successors
 
@@ -235,6 +344,7 @@ class StayEastSearchAgent(SearchAgent):
     """
     def __init__(self):
         self.searchFunction = search.uniformCostSearch
+        self.takesBudget = self.usesBudget = True
         costFn = lambda pos: .5 ** pos[0]
         self.searchType = lambda state: PositionSearchProblem(state, costFn, (1, 1), None, False)
 
@@ -247,6 +357,7 @@ class StayWestSearchAgent(SearchAgent):
     """
     def __init__(self):
         self.searchFunction = search.uniformCostSearch
+        self.takesBudget = self.usesBudget = True
         costFn = lambda pos: 2 ** pos[0]
         self.searchType = lambda state: PositionSearchProblem(state, costFn)
 
@@ -288,6 +399,51 @@ class CornersProblem(search.SearchProblem):
         # Please add any code here which you would like to use
         # in initializing the problem
         "*** YOUR CODE HERE ***"
+        # A state is one int: (cell << 4) | visited, where cell = x * height + y
+        # and bit i of visited is set once corners[i] has been reached.
+        height = self.walls.height
+        cornerBits = dict((corner, 1 << i) for i, corner in enumerate(self.corners))
+        neighbors = distanceCalculator.legalNeighbors(self.walls)
+        # moves[cell] lists (action, next cell << 4, corner bit of the next cell)
+        self.moves = [()] * (self.walls.width * height)
+        for (x, y), steps in neighbors.items():
+            self.moves[x * height + y] = tuple((action, (nx * height + ny) << 4, cornerBits.get((nx, ny), 0))
+                                               for action, (nx, ny) in steps)
+        self.start = ((self.startingPosition[0] * height + self.startingPosition[1]) << 4) | \
+                     cornerBits.get(self.startingPosition, 0)
+        self.cornerDistances = [distanceCalculator.bfsDistances(self.walls, [corner], neighbors)
+                                for corner in self.corners]
+        self.heuristicTable = self._tourTable(neighbors)
+
+    def _tourTable(self, neighbors):
+        """
+        Returns a list indexed by state of the length of the shortest path from
+        the state's cell through all the corners it has not visited yet.
+        """
+        inf = float('inf')
+        height = self.walls.height
+        between = [[d.get(corner, inf) for corner in self.corners] for d in self.cornerDistances]
+        # tour[first][mask]: the shortest path from corner first through the
+        # corners in mask (which includes first)
+        tour = [[inf] * 16 for corner in self.corners]
+        for mask in range(1, 16):
+            members = [i for i in range(4) if mask & (1 << i)]
+            for order in itertools.permutations(members):
+                cost = sum(between[a][b] for a, b in zip(order, order[1:]))
+                if cost < tour[order[0]][mask]: tour[order[0]][mask] = cost
+        table = [0] * (self.walls.width * height * 16)
+        for (x, y) in neighbors:
+            toCorner = [d.get((x, y), inf) for d in self.cornerDistances]
+            base = (x * height + y) << 4
+            for visited in range(15):
+                left = 15 & ~visited
+                table[base | visited] = min(toCorner[i] + tour[i][left] for i in range(4) if left & (1 << i))
+        return table
+
+    def unpackState(self, state):
+        "Returns the (position, visited corners bitmask) packed into a state."
+        cell = state >> 4
+        return (cell // self.walls.height, cell % self.walls.height), state & 15
 
     def getStartState(self):
         """
@@ -295,14 +451,14 @@ class CornersProblem(search.SearchProblem):
         space)
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return self.start
 
     def isGoalState(self, state):
         """
         Returns whether this search state is a goal state of the problem.
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return state & 15 == 15
 
     def getSuccessors(self, state):
         """
@@ -316,15 +472,12 @@ class CornersProblem(search.SearchProblem):
         """
 
         successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            # Here's a code snippet for figuring out whether a new position hits a wall:
-            #   x,y = currentPosition
-            #   dx, dy = Actions.directionToVector(action)
-            #   nextx, nexty = int(x + dx), int(y + dy)
-            #   hitsWall = self.walls[nextx][nexty]
-
-            "*** YOUR CODE HERE ***"
+        "*** YOUR CODE HERE ***"
+        # The legal moves out of each cell were found in __init__, in
+        # North, South, East, West order, so there are no wall checks here
+        visited = state & 15
+        for action, nextCell, cornerBit in self.moves[state >> 4]:
+            successors.append((nextCell | visited | cornerBit, action, 1))
 
         self._expanded += 1 # DO NOT CHANGE
         return successors
@@ -360,12 +513,15 @@ def cornersHeuristic(state, problem):
     walls = problem.walls # These are the walls of the maze, as a Grid (game.py)
 
     "*** YOUR CODE HERE ***"
-    return 0 # Default to trivial solution
+    # The exact length of the best tour of the unvisited corners, ignoring
+    # food elsewhere, is precomputed for every state (CornersProblem._tourTable)
+    return problem.heuristicTable[state]
 
 class AStarCornersAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
     def __init__(self):
-        self.searchFunction = lambda prob: search.aStarSearch(prob, cornersHeuristic)
+        self.searchFunction = lambda prob, **extra: search.aStarSearch(prob, cornersHeuristic, **extra)
+        self.takesBudget = self.usesBudget = True
         self.searchType = CornersProblem
 
 class FoodSearchProblem:
@@ -421,7 +577,8 @@ class FoodSearchProblem:
 class AStarFoodSearchAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
     def __init__(self):
-        self.searchFunction = lambda prob: search.aStarSearch(prob, foodHeuristic)
+        self.searchFunction = lambda prob, **extra: search.aStarSearch(prob, foodHeuristic, **extra)
+        self.takesBudget = self.usesBudget = True
         self.searchType = FoodSearchProblem
 
 def foodHeuristic(state, problem):
@@ -454,14 +611,31 @@ def foodHeuristic(state, problem):
     """
     position, foodGrid = state
     "*** YOUR CODE HERE ***"
-    return 0
+    # Closest pellet plus a spanning tree over the pellets (foodTours.py)
+    return foodTours.mstFoodHeuristic(state, problem)
+
+class FoodTourSearchAgent(SearchAgent):
+    """
+    A SearchAgent for FoodSearchProblem that solves the tour over the pellets
+    directly (foodTours.py): exactly for up to exactLimit pellets, otherwise
+    with 2-opt and Or-opt local search, e.g.
+    python pacman.py -l bigSearch -p FoodTourSearchAgent -a exactLimit=12 -z .5
+    """
+    def __init__(self, exactLimit=foodTours.HELD_KARP_LIMIT):
+        exactLimit = int(exactLimit)
+        self.searchFunction = lambda prob: foodTours.foodTourSearch(prob, exactLimit)
+        self.searchType = FoodSearchProblem
 
 class ClosestDotSearchAgent(SearchAgent):
     "Search for all food using a sequence of searches"
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', **options):
+        SearchAgent.__init__(self, fn, prob, heuristic, **options)
+        self.usesBudget = False # findPathToClosestDot never sees a budget
+
     def registerInitialState(self, state):
         self.actions = []
         currentState = state
-        while(currentState.getFood().count() > 0):
+        while(currentState.getNumFood() > 0):
             nextPathSegment = self.findPathToClosestDot(currentState) # The missing piece
             self.actions += nextPathSegment
             for action in nextPathSegment:
@@ -478,14 +652,21 @@ class ClosestDotSearchAgent(SearchAgent):
         Returns a path (a list of actions) to the closest dot, starting from
         gameState.
         """
-        # Here are some useful elements of the startState
         startPosition = gameState.getPacmanPosition()
         food = gameState.getFood()
         walls = gameState.getWalls()
-        problem = AnyFoodSearchProblem(gameState)
-
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        # One flood fill from all the food answers every call; later calls only
+        # repair the field around the food eaten since (distanceCalculator.py)
+        field = getattr(self, 'foodField', None)
+        if field is None or field.walls is not walls:
+            field = self.foodField = distanceCalculator.FoodDistanceField(walls, food)
+        else:
+            field.syncFood(food)
+        path = field.getPath(startPosition)
+        if path is None:
+            # No food is reachable; let a search say so
+            return search.bfs(AnyFoodSearchProblem(gameState))
+        return path
 
 class AnyFoodSearchProblem(PositionSearchProblem):
     """
@@ -515,13 +696,69 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
     def isGoalState(self, state):
         """
-        The state is Pacman's position. Fill this in with a goal test that will
-        complete the problem definition.
+        The state is Pacman's position; any square with food is a goal.
         """
         x,y = state
+        return self.food[x][y]
 
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+class ReplanningClosestDotAgent(SearchAgent):
+    """
+    Eats all the food by repeatedly going to the closest dot, like the
+    ClosestDotSearchAgent, but plans with a single search.DStarLite planner:
+    after each dot is eaten the planner only repairs its previous search
+    instead of starting a new one.
+
+    costFn picks the step costs: unit (the default), or stayEast and stayWest
+    as in the StayEastSearchAgent and StayWestSearchAgent, e.g.
+    python pacman.py -l bigSearch -p ReplanningClosestDotAgent -a costFn=stayWest -z .5
+    """
+    # The planner stops when the game's budget runs out
+    usesBudget = True
+
+    COST_FUNCTIONS = {
+        'unit': None,
+        'stayEast': lambda pos: .5 ** pos[0],
+        'stayWest': lambda pos: 2 ** pos[0],
+    }
+
+    def __init__(self, costFn='unit'):
+        if costFn not in self.COST_FUNCTIONS:
+            raise AttributeError(costFn + ' is not one of: ' + ', '.join(sorted(self.COST_FUNCTIONS)))
+        self.costFn = costFn
+
+    def registerInitialState(self, state):
+        starttime = time.time()
+        costFn = self.COST_FUNCTIONS[self.costFn]
+        if costFn is None:
+            problem = PositionSearchProblem(state, warn=False, visualize=False)
+            heuristic = util.manhattanDistance
+        else:
+            # Steps may cost less than 1, so manhattan distance could overestimate
+            problem = PositionSearchProblem(state, costFn, warn=False, visualize=False)
+            heuristic = lambda a, b: 0
+        planner = search.DStarLite(problem, state.getFood().asList(), heuristic)
+        self.actions = []
+        budget = getattr(self, 'budget', None)
+        while planner.goals:
+            segment = planner.getPath(budget)
+            if segment is None:
+                # Keep the plan so far either way; it still eats some of the food
+                if budget is not None and budget.exhausted():
+                    print('Planning stopped (%s) with %d food left' % (budget.reason, len(planner.goals)))
+                else:
+                    print('No path to the remaining food')
+                break
+            x, y = planner.start
+            for action in segment:
+                dx, dy = Actions.directionToVector(action)
+                x, y = int(x + dx), int(y + dy)
+                # Any food on the way is eaten too
+                planner.removeGoal((x, y))
+            planner.moveStart((x, y))
+            self.actions += segment
+        self.actionIndex = 0
+        print('Path found with cost %d in %.1f seconds' % (problem.getCostOfActions(self.actions), time.time() - starttime))
+        print('Search nodes expanded: %d' % problem._expanded)
 
 def mazeDistance(point1, point2, gameState):
     """
@@ -538,5 +775,10 @@ def mazeDistance(point1, point2, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
+    # Look the distance up if this layout's tables have been built (sharedLayouts.py)
+    tables = sharedLayouts.findTables(gameState.data.layout)
+    if tables is not None:
+        distance = tables.distance(point1, point2)
+        if distance is not None: return distance
     prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
     return len(search.bfs(prob))
@@ -12,6 +12,7 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+import os
 import sys
 import re
 import testClasses
@@ -821,3 +822,1008 @@ class CornerHeuristicPacman(testClasses.TestCase):
         handle.close()
         return True
 
+
+
+# The tests below check the support code the search agents and the other
+# front ends rely on, rather than anything students write.
+
+def layoutState(layoutText, numGhosts=0):
+    lay = layout.Layout([l.strip() for l in layoutText.split('\n')])
+    gameState = pacman.GameState()
+    gameState.initialize(lay, numGhosts)
+    return gameState
+
+class BudgetTest(testClasses.TestCase):
+    """
+    Runs a search function without a budget, which must give a plain list,
+    and with util.Budgets, which must give search.SearchResults: solved with
+    the same path when the budget is ample, and stopped for the right reason
+    when it runs out of nodes, time, or is cancelled through its parent.
+    """
+
+    def __init__(self, question, testDict):
+        super(BudgetTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+        self.fn = testDict['fn']
+        self.maxNodes = int(testDict['maxNodes'])
+
+    def search(self, search, searchAgents, **options):
+        problem = searchAgents.PositionSearchProblem(layoutState(self.layoutText), warn=False, visualize=False)
+        return getattr(search, self.fn)(problem, **options)
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import util
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        gold_length = int(solutionDict['solution_length'])
+
+        plain = self.search(search, searchAgents)
+        if type(plain) != type([]):
+            self.addMessage('Without a budget the result must be a plain list. (Instead, it is %s)' % type(plain))
+            return self.testFail(grades)
+        if len(plain) != gold_length:
+            self.addMessage('Path of length %d found, instead of %d' % (len(plain), gold_length))
+            return self.testFail(grades)
+
+        ample = self.search(search, searchAgents, budget=util.Budget())
+        if not isinstance(ample, search.SearchResult) or not ample.solved or ample.reason is not None:
+            self.addMessage('With an ample budget the result must be a solved SearchResult')
+            return self.testFail(grades)
+        if list(ample) != plain:
+            self.addMessage('The budget changed the path found: %s instead of %s' % (list(ample), plain))
+            return self.testFail(grades)
+
+        parent = util.Budget()
+        parent.cancel()
+        for reason, budget in [('nodes', util.Budget(maxNodes=self.maxNodes)),
+                               ('time', util.Budget(timeLimit=0)),
+                               ('cancelled', util.Budget(parent=parent))]:
+            result = self.search(search, searchAgents, budget=budget)
+            if not isinstance(result, search.SearchResult) or result.solved or result.reason != reason:
+                self.addMessage('A budget stopped for %r must give an unsolved SearchResult with that reason' % reason)
+                return self.testFail(grades)
+            # The node that finds the budget spent is counted too
+            if reason == 'nodes' and result.nodes > self.maxNodes + 1:
+                self.addMessage('%d nodes expanded with a budget of %d' % (result.nodes, self.maxNodes))
+                return self.testFail(grades)
+
+        self.addMessage('%s on %s, stopped after %d nodes' % (self.fn, self.layoutName, self.maxNodes))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        path = self.search(moduleDict['search'], moduleDict['searchAgents'])
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('solution_length: "%d"\n' % len(path))
+        handle.close()
+        return True
+
+class CornersStateTest(testClasses.TestCase):
+    """
+    Follows a shortest corners tour through CornersProblem.getSuccessors,
+    checking that every packed state unpacks to the position reached and
+    the corners visited so far.
+    """
+
+    def __init__(self, question, testDict):
+        super(CornersStateTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+
+    def execute(self, grades, moduleDict, solutionDict):
+        from game import Actions
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        gold_length = int(solutionDict['solution_length'])
+        problem = searchAgents.CornersProblem(layoutState(self.layoutText))
+        path = search.bfs(problem)
+        if len(path) != gold_length:
+            self.addMessage('Tour of length %d found, instead of %d' % (len(path), gold_length))
+            return self.testFail(grades)
+
+        state = problem.getStartState()
+        position, visited = problem.unpackState(state)
+        for step, action in enumerate([None] + path):
+            if action is not None:
+                successors = dict((a, s) for s, a, cost in problem.getSuccessors(state))
+                state = successors[action]
+                dx, dy = Actions.directionToVector(action)
+                position = (position[0] + int(dx), position[1] + int(dy))
+                if position in problem.corners:
+                    visited |= 1 << problem.corners.index(position)
+            if type(state) != int:
+                self.addMessage('States must be packed into ints. (Instead, one is %s)' % type(state))
+                return self.testFail(grades)
+            if problem.unpackState(state) != (position, visited):
+                self.addMessage('After %d steps the state unpacks to %s, not %s' %
+                                (step, problem.unpackState(state), (position, visited)))
+                return self.testFail(grades)
+            if problem.isGoalState(state) != (visited == 15):
+                self.addMessage('After %d steps isGoalState is wrong for corners %s' % (step, bin(visited)))
+                return self.testFail(grades)
+
+        self.addMessage('pacman layout:\t\t%s' % self.layoutName)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        problem = moduleDict['searchAgents'].CornersProblem(layoutState(self.layoutText))
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('solution_length: "%d"\n' % len(moduleDict['search'].bfs(problem)))
+        handle.close()
+        return True
+
+class AliasSamplerTest(testClasses.TestCase):
+    """
+    Draws many samples with util.AliasSampler and checks each value comes up
+    about as often as its probability says, and that util.aliasSampler
+    reuses the sampler for an equal distribution.
+    """
+
+    def __init__(self, question, testDict):
+        super(AliasSamplerTest, self).__init__(question, testDict)
+        self.distribution = [float(p) for p in testDict['distribution'].split()]
+        self.values = testDict['values'].split()
+        self.samples = int(testDict['samples'])
+        self.tolerance = float(testDict['tolerance'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import random
+        import util
+        random.seed(int(solutionDict['seed']))
+        sampler = util.AliasSampler(self.distribution, self.values)
+        total = sum(self.distribution)
+        for name, samples in [('nSample', sampler.nSample(self.samples)),
+                              ('sample', [sampler.sample() for i in range(self.samples)])]:
+            for value, p in zip(self.values, self.distribution):
+                frequency = samples.count(value) / float(self.samples)
+                if p == 0 and frequency > 0 or abs(frequency - p / total) > self.tolerance:
+                    self.addMessage('%s drew %s with frequency %.3f, not %.3f' % (name, value, frequency, p / total))
+                    return self.testFail(grades)
+
+        counter = util.Counter(dict(zip(self.values, self.distribution)))
+        if util.aliasSampler(counter) is not util.aliasSampler(counter.copy()):
+            self.addMessage('aliasSampler built a second sampler for an equal distribution')
+            return self.testFail(grades)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('seed: "188"\n')
+        handle.close()
+        return True
+
+class CopyOnWriteTest(testClasses.TestCase):
+    """
+    Plays random moves for every agent, checking that generating a successor
+    never changes the state it came from, however the successor and the
+    parent are changed afterwards, and that the cached food and capsule
+    counts stay right.
+    """
+
+    def __init__(self, question, testDict):
+        super(CopyOnWriteTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+        self.numGhosts = int(testDict['numGhosts'])
+        self.moves = int(testDict['moves'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import random
+        random.seed(int(solutionDict['seed']))
+        state = layoutState(self.layoutText, self.numGhosts)
+        numAgents = state.getNumAgents()
+        history = []
+        for move in range(self.moves):
+            if state.isWin() or state.isLose(): break
+            agentIndex = move % numAgents
+            action = random.choice(state.getLegalActions(agentIndex))
+            history.append((state, state.deepCopy()))
+            successor = state.generateSuccessor(agentIndex, action)
+            # Writes to the parent after the fact must not reach the successor
+            before = [agentState.scaredTimer for agentState in successor.data.agentStates]
+            for index in range(numAgents):
+                state.data.getMutableAgentState(index).scaredTimer += 1
+            if [agentState.scaredTimer for agentState in successor.data.agentStates] != before:
+                self.addMessage('Changing a state after move %d changed its successor' % move)
+                return self.testFail(grades)
+            for index in range(numAgents):
+                state.data.getMutableAgentState(index).scaredTimer -= 1
+            state = successor
+            if state.getNumFood() != state.getFood().count() or set(state.getCapsules()) != state.data._capsuleSet:
+                self.addMessage('The cached food or capsules are wrong after move %d' % move)
+                return self.testFail(grades)
+        for move, (parent, copy) in enumerate(history):
+            if not parent.data == copy.data or parent.getNumFood() != copy.getNumFood():
+                self.addMessage('The state before move %d changed after its successors were generated' % move)
+                return self.testFail(grades)
+
+        self.addMessage('%d moves on %s' % (len(history), self.layoutName))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('seed: "188"\n')
+        handle.close()
+        return True
+
+class KeyframeTest(testClasses.TestCase):
+    """
+    Plays a game with a recording.KeyframeRecorder, writes the recording,
+    and checks its keyframes: that they match replaying the game, and that
+    starting a replay from any of them reaches the same states as replaying
+    from the start.
+    """
+
+    def __init__(self, question, testDict):
+        super(KeyframeTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+        self.numGhosts = int(testDict['numGhosts'])
+        self.interval = int(testDict['keyframeInterval'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import itertools
+        import random
+        import tempfile
+        import ghostAgents
+        import pacmanAgents
+        import recording
+        import textDisplay
+        random.seed(int(solutionDict['seed']))
+        start = layoutState(self.layoutText, self.numGhosts)
+        lay = start.data.layout
+        rules = pacman.ClassicGameRules()
+        ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(self.numGhosts)]
+        game = rules.newGame(lay, pacmanAgents.GreedyAgent(), ghosts, textDisplay.NullGraphics(), True)
+        game.recorder = recording.KeyframeRecorder(self.interval)
+        game.run()
+        moves, numAgents = game.moveHistory, len(game.agents)
+
+        replayed = recording.gameKeyframes(lay, moves, numAgents, self.interval)
+        if game.recorder.keyframes[:len(replayed)] != replayed:
+            self.addMessage('The keyframes recorded during the game differ from those of a replay')
+            return self.testFail(grades)
+
+        handle, filename = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            # Chunks smaller than the keyframe interval, so replays cross them
+            recording.writeRecording(filename, lay, moves, numAgents, chunkSize=max(1, self.interval // 3),
+                                     keyframeInterval=self.interval, keyframes=game.recorder.keyframes)
+            reader = recording.RecordingReader(filename)
+            try:
+                if list(reader) != moves:
+                    self.addMessage('The recording does not give back the moves played')
+                    return self.testFail(grades)
+                states = [start]
+                for agentIndex, action in moves[:-1]:
+                    states.append(states[-1].generateSuccessor(agentIndex, action))
+                # Read the moves after each keyframe from the reader, between restores
+                for moveIndex in range(0, len(moves), max(1, self.interval // 2)):
+                    state = start.deepCopy()
+                    restored = reader.restoreKeyframe(moveIndex, state)
+                    for agentIndex, action in itertools.islice(reader, moveIndex - restored):
+                        state = state.generateSuccessor(agentIndex, action)
+                    if reader.tell() != moveIndex:
+                        self.addMessage('After replaying to move %d the reader is at move %d' % (moveIndex, reader.tell()))
+                        return self.testFail(grades)
+                    if recording.packState(state.data) != recording.packState(states[moveIndex].data):
+                        self.addMessage('Replaying from the keyframe before move %d gives a different state' % moveIndex)
+                        return self.testFail(grades)
+            finally:
+                reader.close()
+        finally:
+            os.unlink(filename)
+
+        self.addMessage('%d moves, %d keyframes on %s' % (len(moves), len(replayed), self.layoutName))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('seed: "188"\n')
+        handle.close()
+        return True
+
+class SolutionTableTest(testClasses.TestCase):
+    """
+    Checks eightpuzzle_problem.isSolvable and solveByTable on some 3x3
+    puzzles against the optimal path lengths found by A* search.
+    """
+
+    def __init__(self, question, testDict):
+        super(SolutionTableTest, self).__init__(question, testDict)
+        self.puzzles = [[int(n) for n in line.split()] for line in testDict['puzzles'].split('\n') if line.strip()]
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import eightpuzzle_problem
+        lengths = [int(n) for n in solutionDict['lengths'].split()]
+        for numbers, length in zip(self.puzzles, lengths):
+            puzzle = eightpuzzle_problem.EightPuzzleState(numbers)
+            if eightpuzzle_problem.isSolvable(puzzle) != (length >= 0):
+                self.addMessage('isSolvable is wrong for %s' % numbers)
+                return self.testFail(grades)
+            if length < 0:
+                try:
+                    eightpuzzle_problem.solveByTable(puzzle)
+                except ValueError:
+                    continue
+                self.addMessage('solveByTable solved the unsolvable %s' % numbers)
+                return self.testFail(grades)
+            path = eightpuzzle_problem.solveByTable(puzzle)
+            for move in path:
+                puzzle = puzzle.result(move)
+            if not puzzle.isGoal() or len(path) != length:
+                self.addMessage('solveByTable gave %s for %s, not a path of length %d to the goal' % (path, numbers, length))
+                return self.testFail(grades)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        import eightpuzzle_problem
+        search = moduleDict['search']
+        lengths = []
+        for numbers in self.puzzles:
+            puzzle = eightpuzzle_problem.EightPuzzleState(numbers)
+            if eightpuzzle_problem.isSolvable(puzzle):
+                problem = eightpuzzle_problem.EightPuzzleSearchProblem(puzzle)
+                lengths.append(len(search.astar(problem, eightpuzzle_problem.manhattanHeuristic)))
+            else:
+                lengths.append(-1)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('# -1 marks the puzzles that cannot be solved.\n')
+        handle.write('lengths: "%s"\n' % ' '.join(str(n) for n in lengths))
+        handle.close()
+        return True
+
+class AnytimeAStarTest(testClasses.TestCase):
+    """
+    Runs search.anytimeAStarSearch on a PositionSearchProblem, checking that
+    every path it reports reaches the goal, costs less than the one before
+    and at most weight times the optimum, and that the last one is optimal.
+    """
+
+    def __init__(self, question, testDict):
+        super(AnytimeAStarTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+        self.weight = float(testDict['weight'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        gold_cost = int(solutionDict['solution_cost'])
+        problem = searchAgents.PositionSearchProblem(layoutState(self.layoutText), warn=False, visualize=False)
+
+        class Observer(search.SearchObserver):
+            def __init__(self):
+                self.found = []
+            def solutionFound(self, path, cost, weight):
+                self.found.append((list(path), cost, weight))
+
+        observer = Observer()
+        path = search.anytimeAStarSearch(problem, searchAgents.manhattanHeuristic,
+                                         weight=self.weight, observer=observer)
+        if type(path) != type([]):
+            self.addMessage('Without a budget the result must be a plain list. (Instead, it is %s)' % type(path))
+            return self.testFail(grades)
+        if not observer.found:
+            self.addMessage('No path was reported to the observer')
+            return self.testFail(grades)
+
+        lastCost = None
+        for found, cost, weight in observer.found:
+            if not checkSolution(problem, found) or problem.getCostOfActions(found) != cost:
+                self.addMessage('A path reported with cost %s does not reach the goal at that cost' % cost)
+                return self.testFail(grades)
+            if weight > self.weight or cost > weight * gold_cost:
+                self.addMessage('A path of cost %s was reported with weight %s, but the optimum is %d' % (cost, weight, gold_cost))
+                return self.testFail(grades)
+            if lastCost is not None and cost >= lastCost:
+                self.addMessage('A path of cost %s was reported after one of cost %s' % (cost, lastCost))
+                return self.testFail(grades)
+            lastCost = cost
+        if path != observer.found[-1][0] or problem.getCostOfActions(path) != gold_cost:
+            self.addMessage('The path returned costs %d, instead of the optimal %d' % (problem.getCostOfActions(path), gold_cost))
+            return self.testFail(grades)
+
+        self.addMessage('pacman layout:\t\t%s' % self.layoutName)
+        self.addMessage('path costs reported:\t%s' % ' '.join(str(cost) for found, cost, weight in observer.found))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        problem = searchAgents.PositionSearchProblem(layoutState(self.layoutText), warn=False, visualize=False)
+        path = search.astar(problem, searchAgents.manhattanHeuristic)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('solution_cost: "%d"\n' % problem.getCostOfActions(path))
+        handle.close()
+        return True
+
+class DStarLiteTest(testClasses.TestCase):
+    """
+    Plans with search.DStarLite on a PositionSearchProblem, then raises the
+    cost of some cells and moves the start elsewhere, checking
+    after each change that the repaired plan costs the same as a fresh
+    uniform cost search.
+    """
+
+    def __init__(self, question, testDict):
+        super(DStarLiteTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+        self.penalties = {}
+        for line in testDict['penalties'].split('\n'):
+            if line.strip():
+                x, y, cost = [int(n) for n in line.split()]
+                self.penalties[(x, y)] = cost
+        self.moveTo = tuple(int(n) for n in testDict['moveTo'].split())
+
+    def plans(self, search, searchAgents, planner):
+        """
+        Yields (label, problem, path) after each change, where problem starts
+        where the planner does and path is its plan, or a fresh search's plan
+        if planner is None.
+        """
+        costs = {}
+        gameState = layoutState(self.layoutText)
+        goal = gameState.getFood().asList()[0]
+        def makeProblem(start=None):
+            return searchAgents.PositionSearchProblem(gameState, lambda xy: costs.get(xy, 1), goal,
+                                                      start, warn=False, visualize=False)
+        def plan(problem):
+            if planner is None:
+                return search.ucs(problem)
+            return planner.getPath()
+
+        problem = makeProblem()
+        if planner is not None:
+            planner = planner(problem, [goal], lambda a, b: abs(a[0] - b[0]) + abs(a[1] - b[1]))
+        path = plan(problem)
+        yield 'first plan', problem, path
+
+        costs.update(self.penalties)
+        if planner is not None:
+            planner.updateCosts(list(self.penalties.keys()))
+        path = plan(problem)
+        yield 'plan after updateCosts', problem, path
+
+        problem = makeProblem(self.moveTo)
+        if planner is not None:
+            planner.moveStart(self.moveTo)
+        yield 'plan after moveStart', problem, plan(problem)
+
+    def execute(self, grades, moduleDict, solutionDict):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        gold_costs = [int(n) for n in solutionDict['solution_costs'].split()]
+        for (label, problem, path), gold_cost in zip(self.plans(search, searchAgents, search.DStarLite), gold_costs):
+            if path is None or not checkSolution(problem, path):
+                self.addMessage('The %s does not reach the goal' % label)
+                return self.testFail(grades)
+            cost = problem.getCostOfActions(path)
+            if cost != gold_cost:
+                self.addMessage('The %s costs %d, but a fresh search finds one costing %d' % (label, cost, gold_cost))
+                return self.testFail(grades)
+        self.addMessage('pacman layout:\t\t%s' % self.layoutName)
+        self.addMessage('plan costs:\t\t%s' % ' '.join(str(cost) for cost in gold_costs))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        costs = [problem.getCostOfActions(path) for label, problem, path
+                 in self.plans(moduleDict['search'], moduleDict['searchAgents'], None)]
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('solution_costs: "%s"\n' % ' '.join(str(cost) for cost in costs))
+        handle.close()
+        return True
+
+class FoodDistanceFieldTest(testClasses.TestCase):
+    """
+    Eats the food in a layout one dot at a time, always walking to the
+    closest one, and checks after each removeFood that the distances in a
+    distanceCalculator.FoodDistanceField match a fresh breadth first search.
+    """
+
+    def __init__(self, question, testDict):
+        super(FoodDistanceFieldTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+
+    def tour(self, field):
+        """
+        Walks from pacman's position to the closest food until none is left,
+        yielding the remaining food after each dot.  Uses the field's path if
+        one is given, else a fresh breadth first search each time.
+        """
+        import distanceCalculator
+        gameState = layoutState(self.layoutText)
+        walls, food = gameState.getWalls(), set(gameState.getFood().asList())
+        position = gameState.getPacmanPosition()
+        while food:
+            if field is None:
+                distances = distanceCalculator.bfsDistances(walls, food)
+                path = distanceCalculator.descend(distances, distanceCalculator.legalNeighbors(walls), position)
+            else:
+                path = field.getPath(position)
+            for action in path:
+                position = Actions.getSuccessor(position, action)
+            position = (int(position[0]), int(position[1]))
+            food.discard(position)
+            if field is not None:
+                field.removeFood(position)
+            yield len(path), food
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import distanceCalculator
+        gold_length = int(solutionDict['tour_length'])
+        gameState = layoutState(self.layoutText)
+        walls = gameState.getWalls()
+        field = distanceCalculator.FoodDistanceField(walls, gameState.getFood())
+        length = 0
+        for steps, food in self.tour(field):
+            length += steps
+            distances = distanceCalculator.bfsDistances(walls, food)
+            if field.distance != distances:
+                wrong = [cell for cell in distances if field.getDistance(cell) != distances[cell]]
+                self.addMessage('With %d food left the distances are wrong at %s' % (len(food), sorted(wrong)[:5]))
+                return self.testFail(grades)
+            for cell in distances:
+                closest = field.getClosestFood(cell)
+                if closest not in food or distanceCalculator.bfsDistances(walls, [closest])[cell] != distances[cell]:
+                    self.addMessage('With %d food left the closest food to %s is not %s' % (len(food), cell, closest))
+                    return self.testFail(grades)
+        if length != gold_length:
+            self.addMessage('Closest dot tour of length %d found, instead of %d' % (length, gold_length))
+            return self.testFail(grades)
+        self.addMessage('pacman layout:\t\t%s' % self.layoutName)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('tour_length: "%d"\n' % sum(steps for steps, food in self.tour(None)))
+        handle.close()
+        return True
+
+class FoodTourTest(testClasses.TestCase):
+    """
+    Picks random cells of a layout as Pacman and pellets, and checks the
+    solvers in foodTours on them: heldKarpTour must find the optimal tour
+    (found by brute force when writing the solution), twoOpt and orOpt must
+    give tours no longer than the ones they start from, and
+    mstFoodHeuristic must not overestimate the optimum.
+    """
+
+    def __init__(self, question, testDict):
+        super(FoodTourTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+        self.seed = int(testDict['seed'])
+        self.instances = int(testDict['instances'])
+        self.pellets = int(testDict['pellets'])
+
+    def instanceList(self, foodTours):
+        "Returns (points, distances) for each instance; points[0] is Pacman."
+        import random
+        generator = random.Random(self.seed)
+        walls = layoutState(self.layoutText).getWalls()
+        cells = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        instances = []
+        for i in range(self.instances):
+            points = generator.sample(cells, self.pellets + 1)
+            instances.append((points, foodTours.tourDistances(walls, points)[0]))
+        return instances
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import random
+        import foodTours
+        import game
+        searchAgents = moduleDict['searchAgents']
+        gold_costs = [int(n) for n in solutionDict['tour_costs'].split()]
+        gameState = layoutState(self.layoutText)
+        problem = searchAgents.FoodSearchProblem(gameState)
+        generator = random.Random(self.seed)
+        for (points, distances), gold_cost in zip(self.instanceList(foodTours), gold_costs):
+            def isTour(tour):
+                return tour[0] == 0 and sorted(tour) == list(range(len(points)))
+
+            tour = foodTours.heldKarpTour(distances)
+            if not isTour(tour) or foodTours.tourCost(tour, distances) != gold_cost:
+                self.addMessage('heldKarpTour gave %s for %s, not a tour of length %d' % (tour, points, gold_cost))
+                return self.testFail(grades)
+
+            greedy = foodTours.nearestNeighborTour(distances)
+            shuffled = [0] + generator.sample(range(1, len(points)), len(points) - 1)
+            for start in [greedy, shuffled]:
+                for name, improve in [('twoOpt', foodTours.twoOpt), ('orOpt', foodTours.orOpt)]:
+                    tour = list(start)
+                    before = foodTours.tourCost(tour, distances)
+                    changed = improve(tour, distances)
+                    after = foodTours.tourCost(tour, distances)
+                    if not isTour(tour) or after > before or after < gold_cost:
+                        self.addMessage('%s turned %s into %s for %s' % (name, start, tour, points))
+                        return self.testFail(grades)
+                    if changed != (after < before) or improve(tour, distances):
+                        self.addMessage('%s did not report correctly whether it improved %s' % (name, start))
+                        return self.testFail(grades)
+
+            food = game.Grid(gameState.getWalls().width, gameState.getWalls().height)
+            for x, y in points[1:]:
+                food[x][y] = True
+            h = foodTours.mstFoodHeuristic((points[0], food), problem)
+            if h > gold_cost:
+                self.addMessage('mstFoodHeuristic gave %d for %s, but the optimal tour is %d' % (h, points, gold_cost))
+                return self.testFail(grades)
+
+        self.addMessage('%d instances of %d pellets on %s' % (self.instances, self.pellets, self.layoutName))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        import itertools
+        import foodTours
+        costs = []
+        for points, distances in self.instanceList(foodTours):
+            costs.append(min(foodTours.tourCost((0,) + order, distances)
+                             for order in itertools.permutations(range(1, len(points)))))
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('# The optimal tours were found by trying every order.\n')
+        handle.write('tour_costs: "%s"\n' % ' '.join(str(cost) for cost in costs))
+        handle.close()
+        return True
+
+class LRUCacheTest(testClasses.TestCase):
+    """
+    Runs a script of put and get operations on a util.LRUCache, checking
+    what each get returns and which keys are left, oldest first, with the
+    hit, miss and eviction counts.
+    """
+
+    def __init__(self, question, testDict):
+        super(LRUCacheTest, self).__init__(question, testDict)
+        self.maxSize = int(testDict['maxSize'])
+        self.operations = [line.split() for line in testDict['operations'].split('\n') if line.strip()]
+
+    def run(self):
+        import util
+        cache = util.LRUCache(self.maxSize)
+        results = []
+        for operation in self.operations:
+            if operation[0] == 'put':
+                cache.put(operation[1], operation[2])
+            else:
+                results.append(str(cache.get(operation[1])))
+        return {'results': ' '.join(results),
+                'keys': ' '.join(cache.entries),
+                'counts': '%d %d %d' % (cache.hits, cache.misses, cache.evictions)}
+
+    def execute(self, grades, moduleDict, solutionDict):
+        found = self.run()
+        for name, what in [('results', 'get returned'), ('keys', 'the keys left are'),
+                           ('counts', 'the hits, misses and evictions are')]:
+            if found[name] != solutionDict[name]:
+                self.addMessage('After the script %s %s, not %s' % (what, found[name], solutionDict[name]))
+                return self.testFail(grades)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        found = self.run()
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('# The keys are listed from least to most recently used.\n')
+        for name in ['results', 'keys', 'counts']:
+            handle.write('%s: "%s"\n' % (name, found[name]))
+        handle.close()
+        return True
+
+class MemoizedHeuristicTest(testClasses.TestCase):
+    """
+    Runs A* on two PositionSearchProblems with different goals through one
+    search.MemoizedHeuristic, checking that the paths are optimal, that the
+    wrapped heuristic is called once per state while nothing is evicted,
+    and that values for the first goal are not reused for the second.
+    """
+
+    def __init__(self, question, testDict):
+        super(MemoizedHeuristicTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+        self.goals = [tuple(int(n) for n in goal.split()) for goal in testDict['goals'].split(',')]
+        self.maxSize = int(testDict['maxSize'])
+
+    def problems(self, searchAgents):
+        gameState = layoutState(self.layoutText)
+        return [searchAgents.PositionSearchProblem(gameState, goal=goal, warn=False, visualize=False)
+                for goal in self.goals]
+
+    def execute(self, grades, moduleDict, solutionDict):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        gold_lengths = [int(n) for n in solutionDict['solution_lengths'].split()]
+        for maxSize in [None, self.maxSize]:
+            calls = []
+            def heuristic(state, problem):
+                calls.append(state)
+                return searchAgents.manhattanHeuristic(state, problem)
+            if maxSize is None:
+                memoized = search.MemoizedHeuristic(heuristic)
+            else:
+                memoized = search.MemoizedHeuristic(heuristic, maxSize)
+            for problem, gold_length in zip(self.problems(searchAgents), gold_lengths):
+                del calls[:]
+                path = search.astar(problem, memoized)
+                if len(path) != gold_length or not checkSolution(problem, path):
+                    self.addMessage('Path of length %d found to %s, instead of %d' % (len(path), problem.goal, gold_length))
+                    return self.testFail(grades)
+                for state, value in memoized.cache.entries.items():
+                    if value != searchAgents.manhattanHeuristic(state, problem):
+                        self.addMessage('The memoized value for %s is stale for the goal %s' % (state, problem.goal))
+                        return self.testFail(grades)
+                if memoized.cache.evictions == 0 and len(calls) != len(set(calls)):
+                    self.addMessage('The heuristic was called %d times for %d states' % (len(calls), len(set(calls))))
+                    return self.testFail(grades)
+                if len(memoized.cache) > memoized.cache.maxSize:
+                    self.addMessage('The cache holds %d values, more than %d' % (len(memoized.cache), memoized.cache.maxSize))
+                    return self.testFail(grades)
+            if maxSize is not None and memoized.cache.evictions == 0:
+                self.addMessage('A cache of %d values never evicted anything' % maxSize)
+                return self.testFail(grades)
+        self.addMessage('pacman layout:\t\t%s' % self.layoutName)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        search = moduleDict['search']
+        searchAgents = moduleDict['searchAgents']
+        lengths = [len(search.astar(problem, searchAgents.manhattanHeuristic))
+                   for problem in self.problems(searchAgents)]
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('solution_lengths: "%s"\n' % ' '.join(str(n) for n in lengths))
+        handle.close()
+        return True
+
+class TableFileTest(testClasses.TestCase):
+    """
+    Writes a table file with tableFiles.writeTables and reads it back,
+    checks that every truncation and some corruptions of it raise
+    TableFormatError, and that close() works while a view into the file is
+    still in use.
+    """
+
+    def __init__(self, question, testDict):
+        super(TableFileTest, self).__init__(question, testDict)
+        self.key = testDict['key']
+        self.sections = []
+        for line in testDict['sections'].split('\n'):
+            if line.strip():
+                name, typecode, shape, values = line.split(None, 3)
+                values = [float(v) if typecode in 'fd' else int(v) for v in values.split()]
+                self.sections.append((name, typecode, tuple(int(n) for n in shape.split('x')), values))
+
+    def arrays(self):
+        "Returns the sections for tableFiles, with their values in arrays."
+        import array
+        return [(name, typecode, shape, array.array(typecode, values))
+                for name, typecode, shape, values in self.sections]
+
+    def write(self, tableFiles, path):
+        tableFiles.writeTables(path, self.key, self.arrays())
+        return os.path.getsize(path)
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import shutil
+        import tempfile
+        import tableFiles
+        directory = tempfile.mkdtemp()
+        try:
+            return self.check(grades, tableFiles, os.path.join(directory, 'test.tbl'), int(solutionDict['file_size']))
+        finally:
+            shutil.rmtree(directory)
+
+    def check(self, grades, tableFiles, path, gold_size):
+        size = self.write(tableFiles, path)
+        if size != gold_size:
+            self.addMessage('The table file is %d bytes, not %d' % (size, gold_size))
+            return self.testFail(grades)
+        tables = tableFiles.openTables(path, self.key)
+        for name, typecode, shape, values in self.sections:
+            if tables.getShape(name) != shape or tables.get(name).tolist() != values:
+                self.addMessage('Section %s reads back as %s %s' % (name, tables.getShape(name), tables.get(name).tolist()))
+                return self.testFail(grades)
+        # Hold on to part of a section, as a numpy array from getArray would
+        name = self.sections[0][0]
+        part = tables.get(name)[1:]
+        try:
+            tables.close()
+        except BufferError:
+            self.addMessage('close() failed while a view into the file was still in use')
+            return self.testFail(grades)
+        if part.tolist() != self.sections[0][3][1:]:
+            self.addMessage('A view kept past close() no longer reads the file')
+            return self.testFail(grades)
+        part.release()
+
+        handle = open(path, 'rb')
+        original = handle.read()
+        handle.close()
+        corruptions = [('truncated to %d bytes' % n, original[:n]) for n in range(len(original))]
+        magic, version, count, flags, digest = tableFiles.HEADER.unpack_from(original, 0)
+        for label, header in [('with the wrong magic', (b'LBTP', version, count, flags, digest)),
+                              ('with a newer version', (magic, version + 1, count, flags, digest)),
+                              ('with the other byte order', (magic, version, count, flags ^ tableFiles.BIG_ENDIAN, digest)),
+                              ('with another key', (magic, version, count, flags, tableFiles.keyDigest(self.key + '!'))),
+                              ('with too many sections', (magic, version, count + 100, flags, digest))]:
+            corruptions.append((label, tableFiles.HEADER.pack(*header) + original[tableFiles.HEADER.size:]))
+        for label, data in corruptions:
+            handle = open(path, 'wb')
+            handle.write(data)
+            handle.close()
+            try:
+                tableFiles.openTables(path, self.key).close()
+            except tableFiles.TableFormatError:
+                continue
+            except Exception as e:
+                self.addMessage('Opening a file %s raised %r, not TableFormatError' % (label, e))
+                return self.testFail(grades)
+            self.addMessage('A file %s was opened without complaint' % label)
+            return self.testFail(grades)
+
+        # loadOrBuildTables replaces the corrupt file
+        tables = tableFiles.loadOrBuildTables(path, self.key, lambda: self.arrays()[:1])
+        if list(tables.sections) != [name] or os.path.getsize(path) == len(data):
+            self.addMessage('loadOrBuildTables did not rebuild a corrupt file')
+            tables.close()
+            return self.testFail(grades)
+        tables.close()
+        self.addMessage('%d truncations and %d corruptions rejected' % (len(original), len(corruptions) - len(original)))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        import shutil
+        import tempfile
+        import tableFiles
+        directory = tempfile.mkdtemp()
+        try:
+            size = self.write(tableFiles, os.path.join(directory, 'test.tbl'))
+        finally:
+            shutil.rmtree(directory)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('file_size: "%d"\n' % size)
+        handle.close()
+        return True
+
+class SharedLayoutTablesTest(testClasses.TestCase):
+    """
+    Builds the sharedLayouts tables for a layout and checks them against the
+    layout itself: walls, legal actions, and maze distances from a breadth
+    first search.  Also checks that pickling shares the tables by hash, and
+    that only the process that built shared tables removes their file.
+    """
+
+    def __init__(self, question, testDict):
+        super(SharedLayoutTablesTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import distanceCalculator
+        import sharedLayouts
+        gold_open = int(solutionDict['open_cells'])
+        lay = layout.Layout([l.strip() for l in self.layoutText.split('\n')])
+        tables = sharedLayouts.getTables(lay)
+        try:
+            problem = self.check(distanceCalculator, sharedLayouts, lay, tables, gold_open)
+        finally:
+            tables.close()
+        if problem is None and os.path.exists(sharedLayouts.sharedPath(lay.getHash())):
+            problem = 'Closing the tables left their shared file behind'
+        if problem is not None:
+            self.addMessage(problem)
+            return self.testFail(grades)
+        self.addMessage('pacman layout:\t\t%s' % self.layoutName)
+        return self.testPass(grades)
+
+    def check(self, distanceCalculator, sharedLayouts, lay, tables, gold_open):
+        "Returns what is wrong with the tables, or None."
+        import pickle
+        walls = lay.walls
+        if tables.numOpen != gold_open:
+            return 'The tables have %d open cells, not %d' % (tables.numOpen, gold_open)
+        neighbors = distanceCalculator.legalNeighbors(walls)
+        cells = [(x, y) for x in range(walls.width) for y in range(walls.height)]
+        for cell in cells:
+            if tables.isWall(cell) != walls[cell[0]][cell[1]]:
+                return 'isWall is wrong at %s' % (cell,)
+            if walls[cell[0]][cell[1]]: continue
+            if sorted(tables.getLegalActions(cell)) != sorted(action for action, neighbor in neighbors[cell]):
+                return 'getLegalActions is wrong at %s' % (cell,)
+            distances = distanceCalculator.bfsDistances(walls, [cell], neighbors)
+            for other in cells:
+                if not walls[other[0]][other[1]] and tables.distance(cell, other) != distances.get(other):
+                    return 'The distance from %s to %s is %s, not %s' % \
+                        (cell, other, tables.distance(cell, other), distances.get(other))
+
+        if pickle.loads(pickle.dumps(tables)) is not tables:
+            return 'Unpickling the tables in the same process gave a second copy'
+        attached = sharedLayouts.attachShared(lay.getHash())
+        sameDistances = attached.distances.tolist() == tables.distances.tolist()
+        attached.close()
+        if not sameDistances or not os.path.exists(tables.tables.path):
+            return 'Attaching to the shared tables and closing them again did not leave them as they were'
+        return None
+
+    def writeSolution(self, moduleDict, filePath):
+        lay = layout.Layout([l.strip() for l in self.layoutText.split('\n')])
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('open_cells: "%d"\n' % (lay.width * lay.height - lay.walls.count()))
+        handle.close()
+        return True
+
+class FindTablesTest(testClasses.TestCase):
+    """
+    Checks that sharedLayouts.findTables finds tables saved for a layout
+    after it looked for them once and found none, as long as the layout is
+    loaded again, and that mazeDistance then agrees with them.
+    """
+
+    def __init__(self, question, testDict):
+        super(FindTablesTest, self).__init__(question, testDict)
+        self.layoutText = testDict['layout']
+        self.layoutName = testDict['layoutName']
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import shutil
+        import tempfile
+        import tableFiles
+        import sharedLayouts
+        searchAgents = moduleDict['searchAgents']
+        point1, point2 = [tuple(int(n) for n in point.split()) for point in solutionDict['points'].split(',')]
+        gold_distance = int(solutionDict['distance'])
+        tableDir = tableFiles.TABLE_DIR
+        tableFiles.TABLE_DIR = tempfile.mkdtemp()
+        try:
+            lay = layout.Layout([l.strip() for l in self.layoutText.split('\n')])
+            if sharedLayouts.findTables(lay) is not None:
+                self.addMessage('findTables found tables before any were saved')
+                return self.testFail(grades)
+            # Saved as another process would, without telling this one
+            layoutHash = lay.getHash()
+            tableFiles.writeTables(tableFiles.tablePath('layout', layoutHash), layoutHash,
+                                   sharedLayouts.buildLayoutSections(lay.walls))
+            gameState = layoutState(self.layoutText)
+            tables = sharedLayouts.findTables(gameState.data.layout)
+            if tables is None:
+                self.addMessage('findTables did not find the tables saved after it first looked')
+                return self.testFail(grades)
+            distances = (tables.distance(point1, point2), searchAgents.mazeDistance(point1, point2, gameState))
+            tables.close()
+            if distances != (gold_distance, gold_distance):
+                self.addMessage('The tables and mazeDistance give %s from %s to %s, not %d' %
+                                (distances, point1, point2, gold_distance))
+                return self.testFail(grades)
+        finally:
+            shutil.rmtree(tableFiles.TABLE_DIR)
+            tableFiles.TABLE_DIR = tableDir
+        self.addMessage('pacman layout:\t\t%s' % self.layoutName)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        searchAgents = moduleDict['searchAgents']
+        gameState = layoutState(self.layoutText)
+        point1, point2 = gameState.getPacmanPosition(), gameState.getFood().asList()[0]
+        problem = searchAgents.PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
+        handle = open(filePath, 'w')
+        handle.write('# This is the solution file for %s.\n' % self.path)
+        handle.write('points: "%d %d, %d %d"\n' % (point1 + point2))
+        handle.write('distance: "%d"\n' % len(moduleDict['search'].bfs(problem)))
+        handle.close()
+        return True
@@ -0,0 +1,261 @@
+# sharedLayouts.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Read-only tables derived from a layout's walls, kept in shared memory so that
+worker processes running games or searches on the same layout map one copy
+instead of each rebuilding (or unpickling) their own.
+
+  tables = sharedLayouts.getTables(layout)    # builds, or attaches if built
+  tables.distance((1, 1), (5, 3))
+  pool.map(work, [tables] * n)                # pickles as just the layout hash
+
+The tables are a table file (see tableFiles.py) under SHARED_DIR (/dev/shm,
+which is memory, where it exists), memory-mapped read-only by every process
+that attaches, so attaching is zero-copy.  The process that built a file
+removes it when it calls close() or exits.  loadLayoutTables keeps the same
+tables on disk instead, for later runs.
+
+Cells are numbered x * height + y.  The tables are:
+
+  walls:      a bitset over cells, 1 for walls
+  adjacency:  one byte per cell, bits for the legal North, South, East and
+              West moves (see MOVES)
+  openIndex:  for each cell, its index among the open cells, or -1; its
+              shape is the layout's (width, height)
+  openCells:  the cell number of each open cell
+  distances:  maze distances between all pairs of open cells, as unsigned
+              16-bit ints (UNREACHABLE if there is no path)
+"""
+
+import array
+import atexit
+import os
+import tempfile
+import weakref
+import tableFiles
+from game import Directions, Actions
+
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+MOVES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+UNREACHABLE = 0xFFFF
+SECTIONS = ['walls', 'adjacency', 'openIndex', 'openCells', 'distances']
+
+_tables = {}
+# Layout objects findTables found no saved tables for, with their hashes.  Kept
+# per object rather than per hash, so loading the layout again looks on disk
+# again, e.g. after another process has saved its tables.
+_missing = weakref.WeakKeyDictionary()
+
+def buildLayoutSections(walls):
+    "Computes the tables for a walls Grid, as sections for tableFiles."
+    width, height = walls.width, walls.height
+    openCells = array.array('i', [x * height + y for x in range(width) for y in range(height) if not walls[x][y]])
+    wallBits = array.array('B', bytes((width * height + 7) // 8))
+    adjacency = array.array('B', bytes(width * height))
+    openIndex = array.array('i', [-1]) * (width * height)
+    for x in range(width):
+        for y in range(height):
+            if walls[x][y]:
+                cell = x * height + y
+                wallBits[cell >> 3] |= 1 << (cell & 7)
+    for i, cell in enumerate(openCells):
+        openIndex[cell] = i
+    deltas = []
+    for action in MOVES:
+        dx, dy = Actions.directionToVector(action)
+        deltas.append((int(dx), int(dy)))
+    steps = []
+    for cell in openCells:
+        x, y = divmod(cell, height)
+        mask, moves = 0, []
+        for bit, (dx, dy) in enumerate(deltas):
+            nextx, nexty = x + dx, y + dy
+            if 0 <= nextx < width and 0 <= nexty < height and not walls[nextx][nexty]:
+                mask |= 1 << bit
+                moves.append(openIndex[nextx * height + nexty])
+        adjacency[cell] = mask
+        steps.append(moves)
+    # One breadth first search per open cell, over open cell indices
+    numOpen = len(openCells)
+    distances = array.array('H')
+    for source in range(numOpen):
+        row = [UNREACHABLE] * numOpen
+        row[source] = 0
+        frontier, distance = [source], 0
+        while frontier:
+            distance += 1
+            nextFrontier = []
+            for i in frontier:
+                for j in steps[i]:
+                    if row[j] == UNREACHABLE:
+                        row[j] = distance
+                        nextFrontier.append(j)
+            frontier = nextFrontier
+        distances.extend(row)
+    return [('walls', 'B', (len(wallBits),), wallBits),
+            ('adjacency', 'B', (width, height), adjacency),
+            ('openIndex', 'i', (width, height), openIndex),
+            ('openCells', 'i', (numOpen,), openCells),
+            ('distances', 'H', (numOpen, numOpen), distances)]
+
+class LayoutTables:
+    """
+    The tables for one layout, over a tableFiles.TableFile.  Use getTables or
+    loadLayoutTables rather than constructing this directly.
+    """
+    def __init__(self, tables, layoutHash, owner=False):
+        self.tables = tables
+        self.layoutHash = layoutHash
+        # Only the building process removes a shared file, not children it forks
+        self.owner = owner
+        self.ownerPid = os.getpid()
+        self.width, self.height = tables.getShape('openIndex')
+        self.numOpen = tables.getShape('openCells')[0]
+        for name in SECTIONS:
+            setattr(self, name, tables.get(name))
+
+    def __reduce__(self):
+        return (getTablesByHash, (self.layoutHash,))
+
+    def isWall(self, position):
+        x, y = position
+        cell = x * self.height + y
+        return bool(self.walls[cell >> 3] & (1 << (cell & 7)))
+
+    def getLegalActions(self, position):
+        x, y = position
+        mask = self.adjacency[x * self.height + y]
+        return [action for bit, action in enumerate(MOVES) if mask & (1 << bit)]
+
+    def distance(self, point1, point2):
+        "Returns the maze distance between two open positions, or None if there is no path."
+        i = self.openIndex[point1[0] * self.height + point1[1]]
+        j = self.openIndex[point2[0] * self.height + point2[1]]
+        if i < 0 or j < 0: raise ValueError('Not an open position: %s' % str(point1 if i < 0 else point2))
+        d = self.distances[i * self.numOpen + j]
+        return None if d == UNREACHABLE else d
+
+    def close(self):
+        "Unmaps the tables, and removes them if this process built and shared them."
+        if self.tables is None: return
+        for name in SECTIONS:
+            delattr(self, name)
+        self.tables.close()
+        if self.owner and os.getpid() == self.ownerPid:
+            try: os.unlink(self.tables.path)
+            except FileNotFoundError: pass
+        self.tables = None
+        if _tables.get(self.layoutHash) is self:
+            del _tables[self.layoutHash]
+
+    def __del__(self):
+        if getattr(self, 'tables', None) is not None:
+            self.close()
+
+def sharedPath(layoutHash):
+    return tableFiles.tablePath('shared-layout', layoutHash, SHARED_DIR)
+
+def createShared(layout):
+    """
+    Builds the tables for a layout and shares them.  Raises FileExistsError
+    if another process shared them first.
+    """
+    layoutHash = layout.getHash()
+    path = sharedPath(layoutHash)
+    tableFiles.writeTables(path, layoutHash, buildLayoutSections(layout.walls), exclusive=True)
+    return LayoutTables(tableFiles.openTables(path, layoutHash), layoutHash, owner=True)
+
+def attachShared(layoutHash):
+    """
+    Maps tables another process shared, read-only.  Raises FileNotFoundError
+    if there are none for this layout.
+    """
+    return LayoutTables(tableFiles.openTables(sharedPath(layoutHash), layoutHash), layoutHash)
+
+def getTablesByHash(layoutHash):
+    "Returns this process's tables for a layout hash, attaching to shared ones if needed."
+    if layoutHash not in _tables:
+        _tables[layoutHash] = attachShared(layoutHash)
+    return _tables[layoutHash]
+
+def getTables(layout):
+    """
+    Returns the shared tables for a layout: this process's copy if it has
+    one, otherwise another process's, otherwise newly built ones.
+    """
+    layoutHash = layout.getHash()
+    if layoutHash not in _tables:
+        try:
+            _tables[layoutHash] = attachShared(layoutHash)
+        except FileNotFoundError:
+            try:
+                _tables[layoutHash] = createShared(layout)
+            except FileExistsError:
+                # Another process built them at the same time
+                _tables[layoutHash] = attachShared(layoutHash)
+    return _tables[layoutHash]
+
+def loadLayoutTables(layout, build=True):
+    """
+    Returns the tables for a layout saved in tableFiles.TABLE_DIR, building
+    and saving them first if needed and build is set (otherwise None).
+    """
+    layoutHash = layout.getHash()
+    path = tableFiles.tablePath('layout', layoutHash)
+    if not build:
+        try: return LayoutTables(tableFiles.openTables(path, layoutHash), layoutHash)
+        except (FileNotFoundError, tableFiles.TableFormatError): return None
+    tables = tableFiles.loadOrBuildTables(path, layoutHash, lambda: buildLayoutSections(layout.walls))
+    for lay, missingHash in list(_missing.items()):
+        if missingHash == layoutHash: del _missing[lay]
+    return LayoutTables(tables, layoutHash)
+
+def findTables(layout):
+    """
+    Returns tables for a layout if they are already at hand, in this process
+    or saved on disk, without building any.  Returns None otherwise, and
+    remembers that for this layout object, so later calls with it (e.g.
+    every mazeDistance in a run) skip the disk.
+    """
+    layoutHash = layout.getHash()
+    if layoutHash in _tables: return _tables[layoutHash]
+    if layout in _missing: return None
+    tables = loadLayoutTables(layout, build=False)
+    if tables is None:
+        _missing[layout] = layoutHash
+        return None
+    _tables[layoutHash] = tables
+    return tables
+
+def closeAll():
+    for tables in list(_tables.values()):
+        tables.close()
+
+atexit.register(closeAll)
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    import layout
+    parser = OptionParser('USAGE: python sharedLayouts.py -l LAYOUT [-l LAYOUT ...]\n'
+                          'Builds and saves the distance tables for layouts, for mazeDistance and others')
+    parser.add_option('-l', '--layout', dest='layouts', action='append', default=[], help='a layout to build tables for')
+    options, otherjunk = parser.parse_args()
+    if not options.layouts:
+        parser.error('Give at least one layout')
+    for name in options.layouts:
+        lay = layout.getLayout(name)
+        if lay is None: raise Exception('The layout ' + name + ' cannot be found')
+        tables = loadLayoutTables(lay)
+        print('%s: %d open cells in %s' % (name, tables.numOpen, tables.tables.path))
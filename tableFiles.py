@@ -0,0 +1,241 @@
+# tableFiles.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A file format for large precomputed tables (maze distances, pattern
+databases) that are expensive to build: build once, save, and memory-map on
+later runs instead of rebuilding or reading them into memory.
+
+A table file holds named flat arrays ("sections"):
+
+  header:   magic 'PTBL', format version, number of sections, flags (byte
+            order), and the sha1 digest of the key the tables were built for
+            (e.g. a layout hash), so stale files are detected
+  sections: per section its name, array typecode, shape (up to 4 dims),
+            offset and size
+  body:     the arrays, each 8-byte aligned
+
+Reading does not copy: TableFile.get(name) is a memoryview over the mapped
+file, and TableFile.getArray(name) a numpy array over it if numpy is
+installed.  Files are written to a temporary name and renamed into place, so
+concurrent builders never leave a half-written table behind.
+
+  python tableFiles.py --info FILE     prints what a table file holds
+"""
+
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b'PTBL'
+VERSION = 1
+# magic, version, number of sections, flags, key digest
+HEADER = struct.Struct('<4sHHI20s')
+# name, typecode, number of dimensions, shape, offset, size in bytes
+SECTION = struct.Struct('<16scB6x4IQQ')
+BIG_ENDIAN = 1
+TYPECODES = {'b': 1, 'B': 1, 'h': 2, 'H': 2, 'i': 4, 'I': 4, 'q': 8, 'Q': 8, 'f': 4, 'd': 8}
+NUMPY_TYPES = {'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4',
+               'q': 'i8', 'Q': 'u8', 'f': 'f4', 'd': 'f8'}
+
+TABLE_DIR = os.environ.get('PACMAN_TABLE_DIR') or \
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+
+class TableFormatError(Exception):
+    "Raised for files that are not table files, or not ones this code can map."
+    pass
+
+def keyDigest(key):
+    return hashlib.sha1(key.encode()).digest()
+
+def tablePath(kind, key, directory=None):
+    "Returns the standard file name for a kind of table built for key."
+    return os.path.join(directory or TABLE_DIR, '%s-%s.tbl' % (kind, hashlib.sha1(key.encode()).hexdigest()[:20]))
+
+def encodeTables(key, sections):
+    """
+    Returns the bytes of a table file.
+
+      key:      a string naming what the tables were built from
+      sections: a list of (name, typecode, shape, data), where data is an
+                array.array, numpy array or other buffer of that typecode
+    """
+    entries, bodies = [], []
+    offset = HEADER.size + SECTION.size * len(sections)
+    for name, typecode, shape, data in sections:
+        if typecode not in TYPECODES or array.array(typecode).itemsize != TYPECODES[typecode]:
+            raise TableFormatError('Unsupported typecode %r' % typecode)
+        if len(shape) > 4:
+            raise TableFormatError('Section %s has more than 4 dimensions' % name)
+        body = memoryview(data).cast('B')
+        count = 1
+        for n in shape: count *= n
+        if len(body) != count * TYPECODES[typecode]:
+            raise TableFormatError('Section %s does not match its shape %s' % (name, shape))
+        offset = (offset + 7) & ~7
+        entries.append((name, typecode, shape, offset, len(body)))
+        bodies.append((offset, body))
+        offset += len(body)
+    encoded = bytearray(offset)
+    flags = BIG_ENDIAN if sys.byteorder == 'big' else 0
+    HEADER.pack_into(encoded, 0, MAGIC, VERSION, len(sections), flags, keyDigest(key))
+    for i, (name, typecode, shape, start, size) in enumerate(entries):
+        dims = list(shape) + [0] * (4 - len(shape))
+        SECTION.pack_into(encoded, HEADER.size + i * SECTION.size, name.encode(), typecode.encode(),
+                          len(shape), dims[0], dims[1], dims[2], dims[3], start, size)
+    for start, body in bodies:
+        encoded[start:start + len(body)] = body
+    return encoded
+
+def writeTables(path, key, sections, exclusive=False):
+    """
+    Writes a table file atomically: readers see either the old file or the
+    complete new one.  With exclusive, an existing file is left alone and
+    FileExistsError is raised instead.
+    """
+    encoded = encodeTables(key, sections)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.building-', suffix='.tbl')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp makes the file private; tables are meant to be shared
+        os.chmod(temporary, 0o644)
+        if exclusive:
+            os.link(temporary, path)
+        else:
+            os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary): os.unlink(temporary)
+
+class TableFile:
+    """
+    The tables in a table file (or in memory, for tables that could not be
+    saved).  Use openTables or loadOrBuildTables to get one.
+    """
+    def __init__(self, buffer, path=None, key=None):
+        self.buffer = buffer
+        self.path = path
+        if len(buffer) < HEADER.size:
+            raise TableFormatError('%s is too short to be a table file' % path)
+        magic, version, count, flags, digest = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise TableFormatError('%s is not a table file' % path)
+        if version != VERSION:
+            raise TableFormatError('%s has format version %d, not %d' % (path, version, VERSION))
+        if (flags & BIG_ENDIAN) != (sys.byteorder == 'big'):
+            raise TableFormatError('%s was written on a machine with the other byte order' % path)
+        if key is not None and digest != keyDigest(key):
+            raise TableFormatError('%s was built for a different key than %r' % (path, key))
+        if HEADER.size + count * SECTION.size > len(buffer):
+            raise TableFormatError('%s is truncated' % path)
+        self.digest = digest
+        self.sections = {}
+        for i in range(count):
+            name, typecode, ndim, d0, d1, d2, d3, offset, size = SECTION.unpack_from(buffer, HEADER.size + i * SECTION.size)
+            if offset + size > len(buffer):
+                raise TableFormatError('%s is truncated' % path)
+            name = name.rstrip(b'\0').decode()
+            self.sections[name] = (typecode.decode(), (d0, d1, d2, d3)[:ndim], offset, size)
+        self._views = []
+
+    def getShape(self, name):
+        return self.sections[name][1]
+
+    def get(self, name):
+        "Returns a section as a flat memoryview over the file, without copying."
+        typecode, shape, offset, size = self.sections[name]
+        view = memoryview(self.buffer)[offset:offset + size].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def getArray(self, name):
+        "Returns a section as a numpy array of its shape, without copying.  Requires numpy."
+        if numpy is None:
+            raise ImportError('getArray needs numpy; use get for a memoryview')
+        typecode, shape, offset, size = self.sections[name]
+        count = size // TYPECODES[typecode]
+        return numpy.frombuffer(self.buffer, NUMPY_TYPES[typecode], count, offset).reshape(shape)
+
+    def close(self):
+        """
+        Releases the views handed out by get and unmaps the file.  Arrays from
+        getArray (or slices of views) that are still in use keep the mapping
+        alive until the last of them is freed.
+        """
+        for view in self._views:
+            view.release()
+        self._views = []
+        if isinstance(self.buffer, mmap.mmap):
+            try:
+                self.buffer.close()
+            except BufferError:
+                pass
+
+def openTables(path, key=None):
+    """
+    Maps a table file read-only.  Raises TableFormatError if it is not a
+    usable table file, or was built for a key other than key.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise TableFormatError('%s is empty' % path)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return TableFile(buffer, path, key)
+    except TableFormatError:
+        buffer.close()
+        raise
+
+def loadOrBuildTables(path, key, build):
+    """
+    Returns the tables in path if they were built for key, otherwise calls
+    build() for a list of sections (see encodeTables), saves them to path and
+    returns them.  If they cannot be saved they are returned from memory.
+    """
+    try:
+        return openTables(path, key)
+    except (FileNotFoundError, TableFormatError):
+        pass
+    sections = build()
+    try:
+        writeTables(path, key, sections)
+        return openTables(path, key)
+    except OSError as e:
+        print('Could not save tables to %s (%s); keeping them in memory' % (path, e), file=sys.stderr)
+        return TableFile(encodeTables(key, sections), None, key)
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+    parser = OptionParser('USAGE: python tableFiles.py --info FILE')
+    parser.add_option('--info', dest='info', help='print the header and sections of a table file')
+    options, otherjunk = parser.parse_args()
+    if not options.info:
+        parser.error('Nothing to do; see --help')
+    tables = openTables(options.info)
+    print('%s: key digest %s' % (options.info, tables.digest.hex()))
+    for name, (typecode, shape, offset, size) in tables.sections.items():
+        print('  %-16s %s %-20s %10d bytes at %d' % (name, typecode, shape, size, offset))
@@ -29,6 +29,7 @@
 import sys
 import inspect
 import heapq, random
+import collections
 
 
 class FixedRandom:
@@ -147,6 +148,9 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
     def __init__(self):
@@ -167,6 +171,9 @@ class Queue:
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 class PriorityQueue:
     """
       Implements a priority queue data structure. Each inserted item
@@ -190,6 +197,9 @@ class PriorityQueue:
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
     def update(self, item, priority):
         # If item already in priority queue with higher priority, update its priority and rebuild the heap.
         # If item already in priority queue with equal or lower priority, do nothing.
@@ -222,6 +232,60 @@ class PriorityQueueWithFunction(PriorityQueue):
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
 
+class LRUCache:
+    """
+    A mapping that holds at most maxSize entries.  When it is full, storing a
+    new key evicts the least recently used one.  Lookups through get() are
+    counted, so the hit rate of the cache can be reported.
+    """
+    def __init__(self, maxSize):
+        if maxSize < 1: raise ValueError('LRUCache needs room for at least one entry')
+        self.maxSize = maxSize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        "Returns the value stored for key, or default, and marks key as recently used"
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        "Stores value under key, evicting the least recently used entry if full"
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+        elif len(entries) >= self.maxSize:
+            entries.popitem(last=False)
+            self.evictions += 1
+        entries[key] = value
+
+    def clear(self):
+        self.entries.clear()
+
+    def hitRate(self):
+        "Returns the fraction of get() calls that found their key"
+        lookups = self.hits + self.misses
+        if lookups == 0: return 0.0
+        return self.hits / float(lookups)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return '%d hits, %d misses (%.1f%% hit rate), %d evictions, %d/%d entries' % \
+            (self.hits, self.misses, 100 * self.hitRate(), self.evictions, len(self), self.maxSize)
+
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs( xy1[0] - xy2[0] ) + abs( xy1[1] - xy2[1] )
@@ -472,21 +536,83 @@ def normalize(vectorOrCounter):
         if s == 0: return vector
         return [el / s for el in vector]
 
-def nSample(distribution, values, n):
-    if sum(distribution) != 1:
-        distribution = normalize(distribution)
-    rand = [random.random() for i in range(n)]
-    rand.sort()
-    samples = []
-    samplePos, distPos, cdf = 0,0, distribution[0]
-    while samplePos < n:
-        if rand[samplePos] < cdf:
-            samplePos += 1
-            samples.append(values[distPos])
+class AliasSampler:
+    """
+    Samples from a fixed discrete distribution in O(1) time per sample, with
+    Walker's alias method: the n outcomes are split into n equally likely
+    columns, each holding at most two outcomes, so a sample is one random
+    column and one biased coin flip.  Building the tables takes O(n).
+
+    Use aliasSampler to get a cached one for a distribution.
+    """
+    def __init__(self, distribution, values):
+        n = len(distribution)
+        if n == 0: raise ValueError('Cannot sample from an empty distribution')
+        total = float(sum(distribution))
+        scaled = [p * n / total for p in distribution]
+        self.values = list(values)
+        self.threshold = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.threshold[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            if scaled[more] < 1.0: small.append(more)
+            else: large.append(more)
+        # Whatever is left is 1 up to rounding error
+
+    def sample(self):
+        r = random.random() * len(self.values)
+        column = int(r)
+        if r - column < self.threshold[column]:
+            return self.values[column]
+        return self.values[self.alias[column]]
+
+    def nSample(self, n):
+        values, threshold, alias, size = self.values, self.threshold, self.alias, len(self.values)
+        rand = random.random
+        samples = []
+        for i in range(n):
+            r = rand() * size
+            column = int(r)
+            samples.append(values[column] if r - column < threshold[column] else values[alias[column]])
+        return samples
+
+# Samplers by distribution, for the distributions used most recently
+ALIAS_CACHE_SIZE = 4096
+_aliasSamplers = LRUCache(ALIAS_CACHE_SIZE)
+
+def aliasSampler(distribution, values = None):
+    """
+    Returns an AliasSampler for a Counter, or a list of probabilities and a
+    list of values, reusing the one built for an equal distribution before.
+    Code that samples the same few distributions over and over thus builds
+    each sampler once.
+    """
+    if isinstance(distribution, dict):
+        key = tuple(distribution.items())
+    else:
+        key = (tuple(distribution), tuple(values))
+    sampler = _aliasSamplers.get(key)
+    if sampler is None:
+        if isinstance(distribution, dict):
+            sampler = AliasSampler([p for v, p in key], [v for v, p in key])
         else:
-            distPos += 1
-            cdf += distribution[distPos]
-    return samples
+            sampler = AliasSampler(distribution, values)
+        _aliasSamplers.put(key, sampler)
+    return sampler
+
+def nSample(distribution, values, n):
+    """
+    Returns a list of n independent samples from a distribution, given as a
+    list of probabilities and a list of values, or as a Counter (values None).
+    The samples come from an AliasSampler, so for a given random seed they
+    differ from those of the original cumulative-distribution version.
+    """
+    return aliasSampler(distribution, values).nSample(n)
 
 def sample(distribution, values = None):
     if type(distribution) == Counter:
@@ -607,15 +733,24 @@ def pause():
 #
 import signal
 import time
+import threading
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
     pass
 
 
 class TimeoutFunction:
-    def __init__(self, function, timeout):
+    """
+    Calls function, raising TimeoutFunctionException if it runs for longer
+    than timeout seconds.  In the main thread SIGALRM interrupts the call;
+    otherwise, or when useSignals is False, the time taken is checked after
+    the call returns.  Functions that watch a Budget themselves should be
+    called with useSignals=False so they are never interrupted mid-way.
+    """
+    def __init__(self, function, timeout, useSignals=True):
         self.timeout = timeout
         self.function = function
+        self.useSignals = useSignals
 
     def handle_timeout(self, signum, frame):
         raise TimeoutFunctionException()
@@ -624,7 +759,9 @@ class TimeoutFunction:
         # If we have SIGALRM signal, use it to cause an exception if and
         # when this function runs too long.  Otherwise check the time taken
         # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
+        # Signal handlers can only be installed from the main thread.
+        if self.useSignals and hasattr(signal, 'SIGALRM') and \
+                threading.current_thread() is threading.main_thread():
             old = signal.signal(signal.SIGALRM, self.handle_timeout)
             signal.alarm(self.timeout)
             try:
@@ -640,6 +777,62 @@ class TimeoutFunction:
                 self.handle_timeout(None, None)
         return result
 
+class Budget:
+    """
+    Limits on how much work a computation may do, checked cooperatively by
+    the computation itself rather than enforced with signals, so it works in
+    any thread and the computation can stop cleanly and keep its progress.
+
+      timeLimit: seconds from construction, or None for no limit
+      maxNodes:  number of charge() calls allowed, or None for no limit
+      parent:    another Budget; this one is exhausted whenever parent is
+
+    The search functions in search.py call charge() once per expansion.
+    cancel() may be called from any thread to stop the computation early.
+    After the budget runs out, reason is 'time', 'nodes' or 'cancelled'.
+    """
+    def __init__(self, timeLimit=None, maxNodes=None, parent=None):
+        self.start = time.perf_counter()
+        self.deadline = None if timeLimit is None else self.start + timeLimit
+        self.maxNodes = maxNodes
+        self.parent = parent
+        self.nodes = 0
+        self.reason = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        "Asks the computation using this budget to stop.  Safe to call from any thread."
+        self._cancelled.set()
+
+    def charge(self, nodes=1):
+        "Records nodes units of work.  Returns False once the budget is exhausted."
+        self.nodes += nodes
+        return not self.exhausted()
+
+    def exhausted(self):
+        if self.reason is not None:
+            return True
+        if self._cancelled.is_set():
+            self.reason = 'cancelled'
+        elif self.maxNodes is not None and self.nodes > self.maxNodes:
+            self.reason = 'nodes'
+        elif self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.reason = 'time'
+        elif self.parent is not None and self.parent.exhausted():
+            self.reason = self.parent.reason
+        return self.reason is not None
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def timeLeft(self):
+        "Returns the seconds left before the deadline, or None if there is none"
+        times = []
+        if self.deadline is not None: times.append(self.deadline - time.perf_counter())
+        if self.parent is not None and self.parent.timeLeft() is not None: times.append(self.parent.timeLeft())
+        if not times: return None
+        return max(0.0, min(times))
+
 
 
 _ORIGINAL_STDOUT = None